@@ -0,0 +1,392 @@
+import argparse
+from collections import Counter
+from copy import copy
+from genetics.genome import Genome
+from genetics.population import Population
+import json
+from multiprocessing import Pool
+import numpy as np
+import pickle
+from players import GreedyPlayer, NetworkPlayer, NTuplePlayer, OrderedPlayer, RandomPlayer
+from queue import Queue
+import time
+
+
+BASELINES = {'random': RandomPlayer, 'ordered': OrderedPlayer, 'greedy': GreedyPlayer}
+GAMES_PER_CHUNK = 50
+LATENCY_BINS = np.geomspace(1e-7, 1e3, 1001)  # Log-spaced bin edges in seconds, from 0.1 microseconds to 1000 seconds.
+_players = {}  # Players loaded by this process, keyed by their spec.
+
+
+def load_player(spec):
+    """Build a player from a baseline name or the path of a pickled network, genome, population, or n-tuple player.
+
+    Parameters
+    ----------
+    spec : str
+        One of the keys of BASELINES, or the path of a pickled NetworkPlayer, Genome, Population, or NTuplePlayer. The
+        best network of a population is used.
+
+    Returns
+    -------
+    Player
+        A player with no games played.
+    """
+    if spec in BASELINES:
+        return BASELINES[spec]()
+    with open(spec, 'rb') as f:
+        obj = pickle.load(f)
+    if isinstance(obj, Population):
+        obj = obj.get_sorted_networks(include_elites=True)[0]
+    if isinstance(obj, Genome):
+        return NetworkPlayer(genome=obj)
+    if isinstance(obj, NTuplePlayer):
+        return NTuplePlayer(obj.network)
+    return NetworkPlayer(genome=obj.genome)
+
+
+def play_chunk(spec, seeds, batched=False):
+    """Play a chunk of games with a single player, timing every game and move.
+
+    Parameters
+    ----------
+    spec : str
+        The player spec, as accepted by `load_player`.
+    seeds : Sequence[int]
+        The seed of each game. In batched mode, only the first is used to seed the whole batch.
+    batched : bool
+        Whether to play the games in lockstep with `play_batched_games`, in which case no latencies are recorded.
+
+    Returns
+    -------
+    dict
+        The spec, seeds, scores, highest tiles, and the histograms of game and move latencies over LATENCY_BINS.
+    """
+    if spec not in _players:
+        _players[spec] = load_player(spec)
+    scores, highest_tiles, game_seconds, move_seconds = [], [], [], []
+
+    def fresh_player():
+        """Copy the loaded player so that no state, such as OrderedPlayer's previous action, carries between games."""
+        player = copy(_players[spec])
+        player.scores, player.highest_tiles = scores, highest_tiles
+        return player
+
+    if batched:
+        fresh_player().play_batched_games(len(seeds), rng=np.random.default_rng(seeds[0]))
+    else:
+        for seed in seeds:
+            player = fresh_player()
+            choose_action = player._choose_action
+
+            def timed_choose_action(game):
+                """Choose the player's action and record how long it took."""
+                start = time.perf_counter()
+                action = choose_action(game)
+                move_seconds.append(time.perf_counter() - start)
+                return action
+
+            player._choose_action = timed_choose_action
+            np.random.seed(seed)
+            start = time.perf_counter()
+            player.play_game(False)
+            game_seconds.append(time.perf_counter() - start)
+    return {
+        'spec': spec,
+        'seeds': list(seeds),
+        'scores': [int(score) for score in scores],
+        'highest_tiles': [int(tile) for tile in highest_tiles],
+        'game_latencies': np.histogram(game_seconds, LATENCY_BINS)[0],
+        'move_latencies': np.histogram(move_seconds, LATENCY_BINS)[0],
+    }
+
+
+def _percentiles(histogram, q):
+    """Estimate percentiles from a latency histogram over LATENCY_BINS, interpolating geometrically within a bin.
+
+    Parameters
+    ----------
+    histogram : ndarray
+        The count in each bin.
+    q : Sequence[float]
+        The percentiles from 0 to 100.
+
+    Returns
+    -------
+    List[float]
+        The estimated latencies in seconds, or NaN if the histogram is empty.
+    """
+    total = histogram.sum()
+    if not total:
+        return [np.nan] * len(q)
+    cumulative = np.concatenate([[0], np.cumsum(histogram)])
+    results = []
+    for p in q:
+        target = p / 100 * total
+        i = min(max(np.searchsorted(cumulative, target) - 1, 0), len(histogram) - 1)
+        fraction = (target - cumulative[i]) / histogram[i] if histogram[i] else 0
+        results.append(float(LATENCY_BINS[i] * (LATENCY_BINS[i + 1] / LATENCY_BINS[i]) ** fraction))
+    return results
+
+
+class Evaluation:
+    """The streaming results of a single player in an evaluation run.
+
+    Attributes
+    ----------
+    spec : str
+        The player spec.
+    player : Player
+        A player holding every result so far, so its `print_summary` can be used.
+    seeds : List[int]
+        The seed of every game so far, in the same order as the player's scores.
+    game_latencies : ndarray
+        The histogram of game durations over LATENCY_BINS.
+    move_latencies : ndarray
+        The histogram of move decision times over LATENCY_BINS.
+    """
+
+    def __init__(self, spec):
+        """Starts with no results.
+
+        Parameters
+        ----------
+        spec : str
+            The player spec.
+        """
+        self.spec = spec
+        self.player = load_player(spec)
+        self.seeds = []
+        self.game_latencies = np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64)
+        self.move_latencies = np.zeros(len(LATENCY_BINS) - 1, dtype=np.int64)
+
+    def add(self, result):
+        """Merge the result of a chunk.
+
+        Parameters
+        ----------
+        result : dict
+            The result of `play_chunk`.
+        """
+        self.seeds.extend(result['seeds'])
+        self.player.scores.extend(result['scores'])
+        self.player.highest_tiles.extend(result['highest_tiles'])
+        self.game_latencies += result['game_latencies']
+        self.move_latencies += result['move_latencies']
+
+    def get_scores_by_seed(self):
+        """Get the score of every game keyed by its seed.
+
+        Returns
+        -------
+        dict
+            The scores keyed by seed.
+        """
+        return dict(zip(self.seeds, self.player.scores))
+
+    def summary(self, z=1.96):
+        """Summarize the results.
+
+        Parameters
+        ----------
+        z : float
+            The number of standard errors in each half of the confidence intervals.
+
+        Returns
+        -------
+        dict
+            The geometric mean score and highest tile with confidence intervals, the highest tile distribution in
+            percent, and the game and move latency percentiles in seconds.
+        """
+        n = self.player.get_num_games_played()
+        log_scores = np.log(self.player.scores)
+        half_width = z * np.std(log_scores, ddof=1) / np.sqrt(n) if n > 1 else np.nan
+        tiles = Counter(self.player.highest_tiles)
+        game_p50, game_p90, game_p99 = _percentiles(self.game_latencies, [50, 90, 99])
+        move_p50, move_p90, move_p99 = _percentiles(self.move_latencies, [50, 90, 99])
+        return {
+            'player': self.spec,
+            'games': n,
+            'average_score': float(self.player.get_avg_score()),
+            'average_score_ci': [float(np.exp(np.mean(log_scores) - half_width)),
+                                 float(np.exp(np.mean(log_scores) + half_width))],
+            'log_score_std': float(np.std(log_scores)),
+            'average_tile': float(self.player.get_avg_highest_tile()),
+            'highest_tiles': {str(t): round(100 * c / n, 1) for t, c in sorted(tiles.items())},
+            'game_latency': {'p50': game_p50, 'p90': game_p90, 'p99': game_p99},
+            'move_latency': {'p50': move_p50, 'p90': move_p90, 'p99': move_p99},
+        }
+
+
+def compare(first, second, z=1.96):
+    """Compare two players on the seeds they both played.
+
+    Parameters
+    ----------
+    first : Evaluation
+        The first player's results.
+    second : Evaluation
+        The second player's results.
+    z : float
+        The number of standard errors in each half of the confidence interval.
+
+    Returns
+    -------
+    dict
+        The number of shared games, the ratio of the first player's geometric mean score to the second's with a
+        confidence interval from the paired log-score differences, and the fraction of shared games the first won.
+    """
+    a, b = first.get_scores_by_seed(), second.get_scores_by_seed()
+    seeds = sorted(set(a) & set(b))
+    differences = np.log([a[s] for s in seeds]) - np.log([b[s] for s in seeds])
+    mean = np.mean(differences) if seeds else np.nan
+    half_width = z * np.std(differences, ddof=1) / np.sqrt(len(seeds)) if len(seeds) > 1 else np.nan
+    return {
+        'players': [first.spec, second.spec],
+        'shared_games': len(seeds),
+        'score_ratio': float(np.exp(mean)),
+        'score_ratio_ci': [float(np.exp(mean - half_width)), float(np.exp(mean + half_width))],
+        'win_rate': float(np.mean(differences > 0)) if seeds else np.nan,
+    }
+
+
+def evaluate(specs, games=None, time_budget=None, workers=1, seed=0, batched=False, games_per_chunk=GAMES_PER_CHUNK,
+             report_interval=10.):
+    """Play games with several players on shared seeds, in parallel, aggregating the results as they arrive.
+
+    Games are handed out in rounds of one chunk per player, so every player plays the same seeds. With a time budget,
+    no new round starts once the budget is spent, but rounds already started are finished.
+
+    Parameters
+    ----------
+    specs : List[str]
+        The player specs, as accepted by `load_player`.
+    games : Optional[int]
+        The number of games each player should play.
+    time_budget : Optional[float]
+        The number of seconds to keep starting new rounds. At least one of games and time_budget must be given.
+    workers : int
+        The number of worker processes. Games are played in this process if 1.
+    seed : int
+        The seed of the first game. Game i is played with seed + i.
+    batched : bool
+        Whether to play each chunk in lockstep with `play_batched_games`.
+    games_per_chunk : int
+        The number of games in each chunk.
+    report_interval : float
+        The number of seconds between progress reports.
+
+    Returns
+    -------
+    List[Evaluation]
+        The results of each player.
+    """
+    if games is None and time_budget is None:
+        raise ValueError('At least one of games and time_budget must be given.')
+    evaluations = {spec: Evaluation(spec) for spec in specs}
+    start = time.perf_counter()
+    next_report = start + report_interval
+
+    def rounds():
+        """Yield the seeds of each round until the game count or time budget is reached."""
+        first = seed
+        while games is None or first < seed + games:
+            if time_budget is not None and time.perf_counter() - start > time_budget:
+                return
+            last = first + games_per_chunk if games is None else min(first + games_per_chunk, seed + games)
+            yield list(range(first, last))
+            first = last
+
+    def report():
+        """Print the running geometric mean score of every player."""
+        print(f'{time.perf_counter() - start:.0f}s:', ', '.join(
+            f'{e.spec} {e.player.get_avg_score():.0f} ({e.player.get_num_games_played()} games)'
+            for e in evaluations.values()))
+
+    if workers == 1:
+        for seeds in rounds():
+            for spec in specs:
+                evaluations[spec].add(play_chunk(spec, seeds, batched))
+            if time.perf_counter() > next_report:
+                report()
+                next_report += report_interval
+        return list(evaluations.values())
+
+    results = Queue()
+    outstanding = 0
+    with Pool(workers) as pool:
+        for seeds in rounds():
+            for spec in specs:
+                pool.apply_async(play_chunk, (spec, seeds, batched), callback=results.put,
+                                 error_callback=results.put)
+                outstanding += 1
+            while outstanding >= 2 * workers * len(specs) or (outstanding and not results.empty()):
+                result = results.get()
+                outstanding -= 1
+                if isinstance(result, Exception):
+                    raise result
+                evaluations[result['spec']].add(result)
+                if time.perf_counter() > next_report:
+                    report()
+                    next_report += report_interval
+        while outstanding:
+            result = results.get()
+            outstanding -= 1
+            if isinstance(result, Exception):
+                raise result
+            evaluations[result['spec']].add(result)
+    return list(evaluations.values())
+
+
+def main(argv=None):
+    """Run the command-line interface.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        The command-line arguments. Read from sys.argv if None.
+
+    Returns
+    -------
+    dict
+        The results that were written as JSON.
+    """
+    parser = argparse.ArgumentParser(description='Evaluate players on shared seeds and report their statistics.')
+    parser.add_argument('players', nargs='+',
+                        help=f'Players to evaluate: {", ".join(BASELINES)}, or the path of a pickled network, genome, '
+                             'or population.')
+    parser.add_argument('--games', type=int, help='The number of games each player plays.')
+    parser.add_argument('--time-budget', type=float, help='The number of seconds to keep starting new games.')
+    parser.add_argument('--workers', type=int, default=1, help='The number of worker processes.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the first game.')
+    parser.add_argument('--batched', action='store_true', help='Play each chunk of games in lockstep.')
+    parser.add_argument('--games-per-chunk', type=int, default=GAMES_PER_CHUNK, help='The games in each job.')
+    parser.add_argument('--report-interval', type=float, default=10., help='Seconds between progress reports.')
+    parser.add_argument('--output', help='The path to write the JSON results to.')
+    args = parser.parse_args(argv)
+    if args.games is None and args.time_budget is None:
+        parser.error('at least one of --games and --time-budget is required')
+
+    start = time.perf_counter()
+    evaluations = evaluate(args.players, args.games, args.time_budget, args.workers, args.seed, args.batched,
+                           args.games_per_chunk, args.report_interval)
+    for e in evaluations:
+        print(f'\n{e.spec}')
+        e.player.print_summary()
+    results = {
+        'seconds': time.perf_counter() - start,
+        'seed': args.seed,
+        'batched': args.batched,
+        'players': [e.summary() for e in evaluations],
+        'comparisons': [compare(a, b) for i, a in enumerate(evaluations) for b in evaluations[i + 1:]],
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == '__main__':
+    main()
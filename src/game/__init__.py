@@ -1,2 +1,2 @@
 from game.action import Action, DIRECTIONS
-from game.game import Game
+from game.game import BOARD_SHAPE, Game
@@ -0,0 +1,524 @@
+from abc import ABC, abstractmethod
+import argparse
+from game.action import DIRECTIONS
+from game.game import Game
+from game.sessions import GAME_OVER, SessionStore
+from game.trajectory import decode_spawns
+from game.vectorized import GameBatch, legal_moves_mask, move_boards, score_moves
+import json
+import numpy as np
+
+
+MAX_TILE = 15  # The highest log2 tile that every engine must accept.
+SPAWN_Z = 4.  # The number of standard errors the spawn frequencies may stray from the rules before they fail.
+ENGINES = {}  # The registered alternative engines, keyed by name.
+
+
+class Engine(ABC):
+    """A game engine to be checked against `Game`.
+
+    An engine moves many boards at once. Engines that can also spawn tiles implement `add_tiles`.
+
+    Attributes
+    ----------
+    max_tile : int
+        The highest log2 tile the engine accepts, which is MAX_TILE unless a merge of two such tiles cannot be stored.
+    """
+    max_tile = MAX_TILE
+
+    @abstractmethod
+    def move(self, boards, direction):
+        """Simulate a move on many boards without adding new tiles.
+
+        Parameters
+        ----------
+        boards : ndarray
+            An integer array of boards with shape (n, 4, 4) and log2 tile values up to MAX_TILE.
+        direction : int
+            The index of the direction in DIRECTIONS.
+
+        Returns
+        -------
+        new_boards : ndarray
+            The boards after the move, with shape (n, 4, 4).
+        points_earned : ndarray
+            The points earned by each move, with shape (n,).
+        move_was_legal : ndarray
+            Whether or not each move changed its board, with shape (n,).
+        """
+        pass
+
+    def is_game_over(self, boards):
+        """Determine which boards have no legal moves.
+
+        Parameters
+        ----------
+        boards : ndarray
+            An integer array of boards with shape (n, 4, 4).
+
+        Returns
+        -------
+        ndarray
+            A boolean array with shape (n,).
+        """
+        return ~np.stack([self.move(boards, d)[2] for d in range(4)], axis=1).any(axis=1)
+
+    def add_tiles(self, boards, rng):
+        """Add a 2 or 4 tile to a random empty position of every board.
+
+        Parameters
+        ----------
+        boards : ndarray
+            An integer array of boards with shape (n, 4, 4), each with at least one empty position.
+        rng : Generator
+            The source of new tiles.
+
+        Returns
+        -------
+        ndarray
+            The boards with the new tiles.
+        """
+        raise NotImplementedError(f'{type(self).__name__} cannot spawn tiles.')
+
+
+def register_engine(name):
+    """Register an engine class under a name, so that the harness checks it.
+
+    Parameters
+    ----------
+    name : str
+        The name of the engine.
+
+    Returns
+    -------
+    Callable[[type], type]
+        A class decorator that registers an instance of the class.
+    """
+    def decorator(cls):
+        ENGINES[name] = cls()
+        return cls
+    return decorator
+
+
+class ReferenceEngine(Engine):
+    """The rules of `Game`, applied to one board at a time."""
+
+    @staticmethod
+    def _game(board):
+        """Wrap a board in a game without spawning any tiles.
+
+        Parameters
+        ----------
+        board : ndarray
+            The board.
+
+        Returns
+        -------
+        Game
+            The game.
+        """
+        game = Game.__new__(Game)
+        game.board = np.array(board, dtype=int)
+        game.game_over = False
+        return game
+
+    def move(self, boards, direction):
+        results = [self._game(b)._move(DIRECTIONS[direction]) for b in boards]
+        return (np.array([r[1] for r in results]).reshape(-1, 4, 4), np.array([r[2] for r in results], dtype=np.int64),
+                np.array([r[0] for r in results], dtype=bool))
+
+    def is_game_over(self, boards):
+        return np.array([b.all() and not self._game(b).get_legal_moves() for b in boards], dtype=bool)
+
+    def add_tiles(self, boards, rng):
+        np.random.seed(rng.integers(2 ** 32))  # Game draws its tiles from the global generator.
+        new_boards = []
+        for b in boards:
+            game = self._game(b)
+            game._add_tile()
+            new_boards.append(game.board)
+        return np.array(new_boards)
+
+
+@register_engine('vectorized')
+class VectorizedEngine(Engine):
+    """The precomputed row tables of `move_boards` and `legal_moves_mask`, and the spawns of `GameBatch`."""
+
+    def move(self, boards, direction):
+        return move_boards(boards, direction)
+
+    def is_game_over(self, boards):
+        return ~legal_moves_mask(boards).any(axis=1)
+
+    def add_tiles(self, boards, rng):
+        batch = GameBatch(len(boards), rng, boards)
+        batch.add_tiles(np.ones(len(batch), dtype=bool))
+        return batch.boards
+
+
+@register_engine('score_moves')
+class ScoreMovesEngine(VectorizedEngine):
+    """The points and legality of `score_moves`, which skips building the new boards."""
+
+    def move(self, boards, direction):
+        points, legal = score_moves(boards)
+        return move_boards(boards, direction)[0], points[:, direction], legal[:, direction]
+
+
+@register_engine('sessions')
+class SessionsEngine(Engine):
+    """The moves, game over flags, and per-game xorshift64* spawns of a `SessionStore`.
+
+    Every call loads the boards into the slots of a new store. A move made by the store is followed by a spawn, which
+    is read back from each game's last spawn and removed, so the boards, points, and legality are those of the move.
+    Boards are packed at 4 bits per cell, so boards with a tile of MAX_TILE, whose merge could not be stored, are not
+    accepted.
+    """
+    max_tile = MAX_TILE - 1
+
+    @staticmethod
+    def _open(boards, seeds=None):
+        """Load boards into a new store.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The boards with shape (n, 4, 4).
+        seeds : Optional[ndarray]
+            The seed of each game's generator. Fixed if None.
+
+        Returns
+        -------
+        store : SessionStore
+            The store.
+        slots : ndarray
+            The slot of each board.
+        """
+        store = SessionStore(max(len(boards), 1), seed=0)
+        slots = store.open(len(boards), seeds)
+        store._store_boards(slots, np.asarray(boards, dtype=int))
+        return store, slots
+
+    def move(self, boards, direction):
+        store, slots = self._open(boards)
+        store.move(slots, direction)
+        legal = store.num_moves[slots] > 0
+        new_boards = store.get_boards(slots).reshape(-1, 16)
+        positions, _ = decode_spawns(store.last_spawns[slots[legal]])
+        new_boards[np.flatnonzero(legal), positions] = 0
+        return new_boards.reshape(-1, 4, 4), store.scores[slots].astype(np.int64), legal
+
+    def is_game_over(self, boards):
+        store, slots = self._open(boards)
+        store._flag_game_over(slots, store.get_boards(slots))
+        return (store.flags[slots] & GAME_OVER) != 0
+
+    def add_tiles(self, boards, rng):
+        store, slots = self._open(boards, rng.integers(1, 2 ** 63, len(boards)))
+        new_boards = np.array(boards, dtype=int)
+        store._add_tiles(slots, new_boards)
+        return new_boards
+
+
+def random_boards(num_boards, rng):
+    """Generate boards with random tiles and a random number of empty positions.
+
+    Every board has at least one tile, since empty boards never occur in play and `Game` does not consider them over.
+
+    Parameters
+    ----------
+    num_boards : int
+        The number of boards.
+    rng : Generator
+        The source of randomness.
+
+    Returns
+    -------
+    ndarray
+        The boards with shape (num_boards, 4, 4).
+    """
+    high = rng.integers(2, MAX_TILE + 1, (num_boards, 1, 1))
+    fill = rng.random((num_boards, 1, 1))
+    boards = (rng.integers(1, high, (num_boards, 4, 4)) * (rng.random((num_boards, 4, 4)) < fill)).astype(int)
+    boards[:, 3, 3] = np.where(boards.any(axis=(1, 2)), boards[:, 3, 3], 1)
+    return boards
+
+
+def adversarial_boards(rng):
+    """Generate boards built to catch common mistakes in slide and merge rules.
+
+    These include every row of up to four tiles drawn from two neighbouring values with gaps, such as [2, 2, 2, 2],
+    [2, 0, 2, 2], and [4, 2, 2, 0], so that chained merges, merges across gaps, and merge order are covered, along with
+    the same rows at the highest tile, full boards without merges, and full boards with a single merge.
+
+    Parameters
+    ----------
+    rng : Generator
+        The source of randomness for the placement of rows.
+
+    Returns
+    -------
+    ndarray
+        The boards with shape (n, 4, 4).
+    """
+    boards = []
+    for low in (1, MAX_TILE - 1):
+        cells = np.array([0, low, low + 1])
+        rows = np.stack(np.meshgrid(cells, cells, cells, cells, indexing='ij'), axis=-1).reshape(-1, 4)[1:]
+        for r, row in enumerate(rows):
+            board = np.zeros((4, 4), dtype=int)
+            board[r % 4] = row
+            boards.append(board)
+            boards.append(board.T.copy())
+    checkerboard = 1 + (np.add.outer(np.arange(4), np.arange(4)) % 2)
+    for _ in range(100):
+        board = checkerboard * rng.integers(1, 8)
+        boards.append(board)
+        board = board.copy()
+        i, j = rng.integers(0, 3, 2)
+        board[i, j] = board[i, j + 1] if rng.random() < 0.5 else board[i + 1, j]
+        boards.append(board)
+    return np.array(boards)
+
+
+def compare_moves(engine, boards, reference=None):
+    """Compare an engine's successor boards, points, and legality for every direction, and its game over detection.
+
+    Parameters
+    ----------
+    engine : Engine
+        The engine to check.
+    boards : ndarray
+        The boards with shape (n, 4, 4). Boards with a tile above the engine's `max_tile` are skipped.
+    reference : Optional[Engine]
+        The engine that is correct by definition. A ReferenceEngine if None.
+
+    Returns
+    -------
+    List[dict]
+        The board, direction (None for game over), field, and the expected and actual values of every mismatch.
+    """
+    reference = ReferenceEngine() if reference is None else reference
+    boards = np.asarray(boards, dtype=int).reshape(-1, 4, 4)
+    boards = boards[boards.max(axis=(1, 2)) <= engine.max_tile]
+    mismatches = []
+    for d in range(4):
+        expected, actual = reference.move(boards, d), engine.move(boards, d)
+        for field, e, a in zip(('board', 'points', 'legal'), expected, actual):
+            wrong = (e != a).reshape(len(boards), -1).any(axis=1)
+            for i in np.flatnonzero(wrong):
+                mismatches.append({'board': boards[i], 'direction': d, 'field': field, 'expected': e[i],
+                                   'actual': a[i]})
+    expected, actual = reference.is_game_over(boards), engine.is_game_over(boards)
+    for i in np.flatnonzero(expected != actual):
+        mismatches.append({'board': boards[i], 'direction': None, 'field': 'game_over', 'expected': expected[i],
+                           'actual': actual[i]})
+    return mismatches
+
+
+def shrink(engine, board, direction=None, reference=None):
+    """Shrink a board with a mismatch to a minimal one that still has a mismatch in the same direction.
+
+    All tiles above 2 are halved together, or single tiles are removed or lowered, for as long as the mismatch remains,
+    so no tile of the result can be removed or lowered without the mismatch disappearing.
+
+    Parameters
+    ----------
+    engine : Engine
+        The engine with the mismatch.
+    board : ndarray
+        The board with the mismatch.
+    direction : Optional[int]
+        The direction of the mismatch, or None for a game over mismatch.
+    reference : Optional[Engine]
+        The engine that is correct by definition. A ReferenceEngine if None.
+
+    Returns
+    -------
+    ndarray
+        The minimal board.
+    """
+    def fails(b):
+        return any(m['direction'] == direction for m in compare_moves(engine, b, reference))
+
+    board = np.array(board, dtype=int)
+    changed = True
+    while changed:
+        changed = False
+        lowered = board - (board > 1)
+        if np.any(lowered != board) and fails(lowered):
+            board, changed = lowered, True
+            continue
+        for position in zip(*np.nonzero(board)):
+            for value in range(board[position]):  # Try removing the tile first, then each lower value.
+                candidate = board.copy()
+                candidate[position] = value
+                if fails(candidate):
+                    board, changed = candidate, True
+                    break
+    return board
+
+
+def compare_games(engine, num_games, seed=0, reference=None):
+    """Play full games with the reference rules and the engine in lockstep, sharing the same spawns.
+
+    Each move is chosen at random among the reference's legal moves, made by both engines from the same board, and
+    followed by the reference's new tile. A game stops at its first mismatch.
+
+    Parameters
+    ----------
+    engine : Engine
+        The engine to check.
+    num_games : int
+        The number of games.
+    seed : int
+        The seed of the first game. Game i uses seed + i.
+    reference : Optional[Engine]
+        The engine that is correct by definition. A ReferenceEngine if None.
+
+    Returns
+    -------
+    moves : int
+        The number of moves compared.
+    mismatches : List[dict]
+        The board, direction, field, and the expected and actual values of the first mismatch of every game.
+    """
+    reference = ReferenceEngine() if reference is None else reference
+    moves, mismatches = 0, []
+    for i in range(num_games):
+        rng = np.random.default_rng(seed + i)
+        board = reference.add_tiles(reference.add_tiles(np.zeros((1, 4, 4), dtype=int), rng), rng)
+        while True:
+            expected_over, actual_over = reference.is_game_over(board)[0], engine.is_game_over(board)[0]
+            if expected_over != actual_over:
+                mismatches.append({'board': board[0], 'direction': None, 'field': 'game_over',
+                                   'expected': expected_over, 'actual': actual_over})
+                break
+            if expected_over:
+                break
+            legal = [d for d in range(4) if reference.move(board, d)[2][0]]
+            d = legal[rng.integers(len(legal))]
+            expected, actual = reference.move(board, d), engine.move(board, d)
+            moves += 1
+            wrong = [(f, e, a) for f, e, a in zip(('board', 'points', 'legal'), expected, actual)
+                     if np.any(e != a)]
+            if wrong:
+                field, e, a = wrong[0]
+                mismatches.append({'board': board[0], 'direction': d, 'field': field, 'expected': e[0],
+                                   'actual': a[0]})
+                break
+            board = reference.add_tiles(expected[0], rng)
+    return moves, mismatches
+
+
+def check_spawns(engine, num_boards, seed=0):
+    """Check that an engine spawns 2 and 4 tiles with the 90/10 split, uniformly over the empty positions.
+
+    Parameters
+    ----------
+    engine : Engine
+        The engine to check.
+    num_boards : int
+        The number of spawns sampled.
+    seed : int
+        The seed of the boards and spawns.
+
+    Returns
+    -------
+    dict
+        The fraction of 4 tiles, the largest deviation of any position from its expected frequency in standard errors,
+        whether every spawn added exactly one 2 or 4 tile to an empty position, and whether the frequencies are within
+        SPAWN_Z standard errors of the rules.
+    """
+    rng = np.random.default_rng(seed)
+    boards = random_boards(num_boards, rng)
+    boards[:, 0, 0] = 0  # Every board needs an empty position.
+    new_boards = engine.add_tiles(boards, rng)
+    added = (new_boards != boards).reshape(num_boards, 16)
+    valid = bool(np.all(added.sum(axis=1) == 1))
+    flat_new, flat_old = new_boards.reshape(num_boards, 16), boards.reshape(num_boards, 16)
+    valid &= bool(np.all(flat_old[added] == 0)) and bool(np.all(np.isin(flat_new[added], (1, 2))))
+    fours = np.mean(flat_new[added] == 2) if valid else np.nan
+    four_z = abs(fours - 0.1) / np.sqrt(0.1 * 0.9 / num_boards)
+    empty = flat_old == 0
+    expected = (empty / empty.sum(axis=1, keepdims=True)).sum(axis=0)  # Expected spawns in each position.
+    variance = (empty / empty.sum(axis=1, keepdims=True) * (1 - empty / empty.sum(axis=1, keepdims=True))).sum(axis=0)
+    position_z = np.max(np.abs(added.sum(axis=0) - expected) / np.sqrt(variance)) if valid else np.nan
+    return {'four_fraction': fours, 'four_z': four_z, 'position_z': position_z, 'valid': valid,
+            'passed': valid and four_z < SPAWN_Z and position_z < SPAWN_Z}
+
+
+def run(engines=None, num_boards=10000, num_games=20, seed=0):
+    """Check engines on random boards, adversarial boards, full games, and spawns, shrinking every mismatch.
+
+    Parameters
+    ----------
+    engines : Optional[Dict[str, Engine]]
+        The engines to check. Every registered engine if None.
+    num_boards : int
+        The number of random boards, and of spawns sampled.
+    num_games : int
+        The number of full games.
+    seed : int
+        The seed of the boards and games.
+
+    Returns
+    -------
+    dict
+        For each engine, the number of boards it accepts and game moves compared, its mismatches with their shrunk
+        boards, and the spawn check if the engine can spawn tiles.
+    """
+    engines = ENGINES if engines is None else engines
+    rng = np.random.default_rng(seed)
+    boards = np.concatenate([random_boards(num_boards, rng), adversarial_boards(rng)])
+    reference = ReferenceEngine()
+    report = {}
+    for name, engine in engines.items():
+        mismatches = compare_moves(engine, boards, reference)
+        moves, game_mismatches = compare_games(engine, num_games, seed, reference)
+        mismatches += game_mismatches
+        for m in mismatches:
+            m['shrunk'] = shrink(engine, m['board'], m['direction'], reference)
+        accepted = np.sum(boards.max(axis=(1, 2)) <= engine.max_tile)
+        report[name] = {'boards': int(accepted), 'game_moves': moves, 'mismatches': mismatches}
+        try:
+            report[name]['spawns'] = check_spawns(engine, num_boards, seed)
+        except NotImplementedError:
+            pass
+    return report
+
+
+def main(argv=None):
+    """Check the registered engines from the command line and print a JSON report.
+
+    Parameters
+    ----------
+    argv : Optional[List[str]]
+        The command line arguments. Taken from sys.argv if None.
+
+    Returns
+    -------
+    int
+        The number of engines that failed, to use as the exit status.
+    """
+    parser = argparse.ArgumentParser(description='Check alternative game engines against the reference rules.')
+    parser.add_argument('engines', nargs='*', help='Registered engine names. All of them if none are given.')
+    parser.add_argument('--boards', type=int, default=10000, help='The number of random boards.')
+    parser.add_argument('--games', type=int, default=20, help='The number of full games.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of the boards and games.')
+    args = parser.parse_args(argv)
+    engines = {name: ENGINES[name] for name in args.engines} if args.engines else None
+    report = run(engines, args.boards, args.games, args.seed)
+    failures = 0
+    for name, result in report.items():
+        failed = bool(result['mismatches']) or not result.get('spawns', {'passed': True})['passed']
+        failures += failed
+        result['mismatches'] = [{k: v.tolist() if isinstance(v, np.ndarray) else v for k, v in m.items()}
+                                for m in result['mismatches'][:10]]
+        result['passed'] = not failed
+    print(json.dumps(report, indent=2, default=lambda x: x.item()))
+    return failures
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -3,33 +3,73 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 
+BOARD_SHAPE = (4, 4)
+MIN_BOARD_SIZE, MAX_BOARD_SIZE = 3, 6
+
+
+def check_board_shape(shape):
+    """Validate the number of rows and columns of a board.
+
+    Parameters
+    ----------
+    shape : Tuple[int, int]
+        The number of rows and columns.
+
+    Returns
+    -------
+    Tuple[int, int]
+        The shape as a tuple of ints.
+
+    Raises
+    ------
+    ValueError
+        If the shape does not have two sides from MIN_BOARD_SIZE to MAX_BOARD_SIZE.
+    """
+    shape = tuple(int(s) for s in shape)
+    if len(shape) != 2 or not all(MIN_BOARD_SIZE <= s <= MAX_BOARD_SIZE for s in shape):
+        raise ValueError(f'A board needs {MIN_BOARD_SIZE} to {MAX_BOARD_SIZE} rows and columns, not {shape}.')
+    return shape
+
+
 class Game:
     """A single game of 2048.
 
-    A game consists of a 4x4 board of tiles with integer values representing the log2 of the tile's value. The tiles
-    can be shifted up, down, left, or right, and when two tiles of the same value touch, they merge and their value is
-    doubled. If the board is full and there are no legal moves, the game ends.
+    A game consists of a board of tiles, 4x4 unless another shape is given, with integer values representing the
+    log2 of the tile's value. The tiles can be shifted up, down, left, or right, and when two tiles of the same
+    value touch, they merge and their value is doubled. If the board is full and there are no legal moves, the game
+    ends.
 
     Attributes
     ----------
     board : ndarray
-        A 4x4 integer array of the log2 tile value at each board position.
+        An integer array with the board's shape of the log2 tile value at each board position.
     score : int
         The current score.
     highest_tile : int
         The highest-value tile on the board.
     game_over : bool
         Whether or not the game is over.
+    last_spawn : Tuple[int, int]
+        The flat board position and log2 value of the most recently added tile.
+    num_moves : int
+        The number of legal moves made.
     """
 
-    def __init__(self):
-        """Sets up the game state with two random tiles."""
-        self.board = np.zeros((4, 4), dtype=int)
+    def __init__(self, shape=BOARD_SHAPE):
+        """Sets up the game state with two random tiles.
+
+        Parameters
+        ----------
+        shape : Tuple[int, int]
+            The number of rows and columns of the board.
+        """
+        self.board = np.zeros(check_board_shape(shape), dtype=int)
         self._add_tile()
         self._add_tile()
         self.score = 0
         self.highest_tile = 2 ** np.max(self.board)
         self.game_over = False
+        self.num_moves = 0
 
     def get_legal_moves(self):
         """Determine the legal moves in the current game state.
@@ -62,6 +102,7 @@ class Game:
             self._add_tile()
             self.highest_tile = 2 ** np.max(self.board)
             self.score += points_earned
+            self.num_moves += 1
             if self.board.all() and not self.get_legal_moves():
                 self.game_over = True
 
@@ -115,9 +156,9 @@ class Game:
         board : ndarray
             The board to slide in-place.
         """
-        for row in range(4):
+        for row in range(board.shape[0]):
             new_row = [i for i in board[row, :] if i != 0]
-            new_row = new_row + [0] * (4 - len(new_row))
+            new_row = new_row + [0] * (board.shape[1] - len(new_row))
             board[row, :] = np.array(new_row)
 
     @staticmethod
@@ -135,8 +176,8 @@ class Game:
             The points earned during the merge.
         """
         points_earned = 0
-        for i in range(4):
-            for j in range(3):
+        for i in range(board.shape[0]):
+            for j in range(board.shape[1] - 1):
                 if board[i, j] == board[i, j+1] != 0:
                     board[i, j] = board[i, j] + 1
                     board[i, j+1] = 0
@@ -150,11 +191,12 @@ class Game:
             val = 2
         else:
             val = 1
-        board = self.board.reshape(16)
-        valid_pos = [i for i in range(16) if not board[i]]
+        board = self.board.reshape(-1)
+        valid_pos = [i for i in range(len(board)) if not board[i]]
         pos = np.random.choice(valid_pos)
         board[pos] = val
-        self.board = board.reshape((4, 4))
+        self.board = board.reshape(self.board.shape)
+        self.last_spawn = (pos, val)
 
     def display_board(self, axes=None):
         """Displays the board as a matplotlib figure.
@@ -0,0 +1,303 @@
+from game.game import BOARD_SHAPE
+from game.trajectory import TrajectoryReader
+from matplotlib.animation import PillowWriter
+import matplotlib.pyplot as plt
+from multiprocessing import Pool
+import numpy as np
+import os
+import sys
+import time
+
+
+MAX_FPS = 30
+CELL_WIDTH = 6  # Characters per cell, enough for 65536 with a space on each side.
+EXPORT_FPS = 10
+
+
+class TerminalRenderer:
+    """Draws games in a terminal with ANSI escape codes, at a capped frame rate, rewriting only the cells that changed.
+
+    Moves made faster than the frame rate allows are not drawn, but the next frame always shows the latest board, so
+    rendering never slows a game down to display speed.
+
+    Attributes
+    ----------
+    stream : TextIO
+        Where the frames are written.
+    max_fps : float
+        The largest number of frames drawn per second. Every move is drawn if None.
+    frames : int
+        The number of frames drawn.
+    skipped : int
+        The number of updates not drawn because of the frame rate cap.
+    cells_drawn : int
+        The number of cells rewritten in all frames.
+    """
+
+    def __init__(self, stream=None, max_fps=MAX_FPS, clock=time.monotonic):
+        """Sets up the renderer without drawing anything.
+
+        Parameters
+        ----------
+        stream : Optional[TextIO]
+            Where the frames are written. Standard output if None.
+        max_fps : Optional[float]
+            The largest number of frames drawn per second. Every move is drawn if None.
+        clock : Callable[[], float]
+            The source of the current time in seconds.
+        """
+        self.stream = sys.stdout if stream is None else stream
+        self.max_fps = max_fps
+        self.frames = 0
+        self.skipped = 0
+        self.cells_drawn = 0
+        self._clock = clock
+        self._last_frame = -np.inf
+        self._board = None  # The board as last drawn.
+        self._score = None  # The score as last drawn.
+
+    @staticmethod
+    def _cell(row, column, value):
+        """Draw a single cell.
+
+        Parameters
+        ----------
+        row : int
+            The board row.
+        column : int
+            The board column.
+        value : int
+            The log2 tile value.
+
+        Returns
+        -------
+        str
+            The escape code that moves the cursor to the cell, followed by the cell's text.
+        """
+        text = str(2 ** int(value)) if value else '.'
+        return f'\x1b[{row + 2};{column * CELL_WIDTH + 1}H{text:>{CELL_WIDTH}}'
+
+    def start(self, game):
+        """Clear the screen and draw the whole board.
+
+        Parameters
+        ----------
+        game : Game
+            The game to draw.
+        """
+        self._board = None
+        self._score = None
+        self.stream.write('\x1b[2J')
+        self._draw(game)
+
+    def update(self, game, force=False):
+        """Draw the latest state of a game if the frame rate cap allows it.
+
+        Parameters
+        ----------
+        game : Game
+            The game to draw.
+        force : bool
+            Whether to draw even if the previous frame was too recent.
+
+        Returns
+        -------
+        bool
+            Whether a frame was drawn.
+        """
+        if not force and self.max_fps is not None and self._clock() - self._last_frame < 1 / self.max_fps:
+            self.skipped += 1
+            return False
+        self._draw(game)
+        return True
+
+    def finish(self, game):
+        """Draw the final state of a game and move the cursor below it.
+
+        Parameters
+        ----------
+        game : Game
+            The finished game.
+        """
+        self._draw(game)
+        self.stream.write(f'\x1b[{game.board.shape[0] + 2};1HGame Over. Final score was {game.score}. '
+                          f'Highest tile was {game.highest_tile}.\n')
+        self.stream.flush()
+
+    def _draw(self, game):
+        """Write one frame with the score and every cell that differs from the last frame.
+
+        Parameters
+        ----------
+        game : Game
+            The game to draw.
+        """
+        parts = []
+        if game.score != self._score:
+            parts.append(f'\x1b[1;1HScore = {game.score}\x1b[K')
+            self._score = game.score
+        changed = np.ones(game.board.shape, dtype=bool) if self._board is None else game.board != self._board
+        for row, column in zip(*np.nonzero(changed)):
+            parts.append(self._cell(row, column, game.board[row, column]))
+        self._board = game.board.copy()
+        self.cells_drawn += int(changed.sum())
+        self.frames += 1
+        self._last_frame = self._clock()
+        self.stream.write(''.join(parts))
+        self.stream.flush()
+
+
+def _use_agg():
+    """Switch a worker process to a non-interactive backend, since exports never need a display."""
+    plt.switch_backend('Agg')
+
+
+def render_game(positions, path, fps=EXPORT_FPS, shape=BOARD_SHAPE):
+    """Draw a recorded game as an animated GIF, or as one PNG per position if the path has no extension.
+
+    The figure is drawn once and only its image data and labels change between frames.
+
+    Parameters
+    ----------
+    positions : ndarray
+        The positions of a single game, as read by TrajectoryReader.
+    path : str
+        The path of the GIF, or the directory of the PNG files.
+    fps : float
+        The frames per second of a GIF.
+    shape : Tuple[int, int]
+        The number of rows and columns of the boards.
+
+    Returns
+    -------
+    str
+        The path.
+    """
+    boards = TrajectoryReader.unpack(positions, shape)
+    scores = np.concatenate([[0], np.cumsum(positions['points'][:-1], dtype=np.int64)])
+    fig, axes = plt.subplots()
+    image = axes.imshow(boards[0], cmap='summer', vmin=0, vmax=max(int(boards.max()), 1))
+    rows, columns = boards.shape[1:]
+    labels = [[axes.text(i, j, '', ha='center', va='center') for i in range(columns)] for j in range(rows)]
+
+    def draw(k):
+        """Update the figure to show position k."""
+        axes.set_title(f'Score = {scores[k]}')
+        image.set_data(boards[k])
+        for (j, i), value in np.ndenumerate(boards[k]):
+            labels[j][i].set_text(str(2 ** value) if value else '')
+
+    if os.path.splitext(path)[1]:
+        writer = PillowWriter(fps=fps)
+        with writer.saving(fig, path, dpi=fig.dpi):
+            for k in range(len(boards)):
+                draw(k)
+                writer.grab_frame()
+    else:
+        os.makedirs(path, exist_ok=True)
+        for k in range(len(boards)):
+            draw(k)
+            fig.savefig(os.path.join(path, f'{k:05d}.png'))
+    plt.close(fig)
+    return path
+
+
+class ReplayExporter:
+    """Renders recorded games to files in background worker processes, so recording games is never blocked by drawing.
+
+    Attributes
+    ----------
+    fps : float
+        The frames per second of exported GIFs.
+    """
+
+    def __init__(self, workers=1, fps=EXPORT_FPS):
+        """Starts the workers.
+
+        Parameters
+        ----------
+        workers : int
+            The number of worker processes.
+        fps : float
+            The frames per second of exported GIFs.
+        """
+        self.fps = fps
+        self._pool = Pool(workers, initializer=_use_agg)
+        self._results = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def export_game(self, positions, path, shape=BOARD_SHAPE):
+        """Queue a game to be drawn, returning immediately.
+
+        Parameters
+        ----------
+        positions : ndarray
+            The positions of a single game, as read by TrajectoryReader.
+        path : str
+            The path of the GIF, or the directory of the PNG files if it has no extension.
+        shape : Tuple[int, int]
+            The number of rows and columns of the boards.
+
+        Returns
+        -------
+        AsyncResult
+            The pending export, whose result is the path.
+        """
+        result = self._pool.apply_async(render_game, (np.array(positions), path, self.fps, shape))
+        self._results.append(result)
+        return result
+
+    def export_log(self, log_path, directory, games=None, extension='.gif'):
+        """Queue the games of a trajectory log to be drawn, one file or directory per game.
+
+        Parameters
+        ----------
+        log_path : str
+            The path of a log written by TrajectoryWriter.
+        directory : str
+            The directory the games are exported to.
+        games : Optional[Iterable[int]]
+            The game numbers to export. Every game if None.
+        extension : str
+            The extension of each game's file, or '' for a directory of PNG files.
+
+        Returns
+        -------
+        List[AsyncResult]
+            The pending exports.
+        """
+        reader = TrajectoryReader(log_path)
+        os.makedirs(directory, exist_ok=True)
+        games = range(len(reader)) if games is None else games
+        return [self.export_game(reader[i], os.path.join(directory, f'game{i:05d}{extension}'), reader.shape)
+                for i in games]
+
+    def wait(self):
+        """Wait for every queued export to finish.
+
+        Returns
+        -------
+        List[str]
+            The paths of the exports, in the order they were queued.
+
+        Raises
+        ------
+        Exception
+            Any exception raised while drawing a game.
+        """
+        paths = [r.get() for r in self._results]
+        self._results = []
+        return paths
+
+    def close(self):
+        """Finish the queued exports and stop the workers."""
+        try:
+            self.wait()
+        finally:
+            self._pool.close()
+            self._pool.join()
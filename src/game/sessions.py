@@ -0,0 +1,421 @@
+from game.action import DIRECTIONS
+from game.game import Game
+from game.trajectory import decode_spawns, FOUR_TILE_FLAG
+from game.vectorized import legal_moves_mask, move_boards, pack_boards, unpack_boards
+import numpy as np
+
+
+CAPACITY = 1024
+LIVE = 1  # Set in the flags of a slot that holds a session.
+GAME_OVER = 2  # Set in the flags of a slot whose game has ended.
+COLUMNS = [('boards', np.uint64), ('scores', np.uint32), ('num_moves', np.uint32), ('highest_tiles', np.uint8),
+           ('flags', np.uint8), ('last_spawns', np.uint8), ('rng_states', np.uint64), ('generations', np.uint32)]
+BYTES_PER_SESSION = sum(np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+
+
+def _xorshift(states):
+    """Advance xorshift64* generators and draw a uniform number in [0, 1) from each.
+
+    Parameters
+    ----------
+    states : ndarray
+        The uint64 generator states, which are advanced in place.
+
+    Returns
+    -------
+    ndarray
+        The uniform numbers.
+    """
+    states ^= states >> np.uint64(12)
+    states ^= states << np.uint64(25)
+    states ^= states >> np.uint64(27)
+    return ((states * np.uint64(0x2545F4914F6CDD1D)) >> np.uint64(11)) * 2. ** -53
+
+
+class SessionStore:
+    """Many live games of 2048 held in preallocated array columns, with one small generator per game.
+
+    Every game occupies a slot holding its board packed into 64 bits, its score, move count, log2 highest tile, flags,
+    last spawn, generator state, and a generation number that is bumped whenever the slot is reused, which together
+    take BYTES_PER_SESSION bytes. The rules match Game, but new tiles come from each game's own generator, so a game is
+    reproducible from its seed no matter which other games are played alongside it. Every operation takes an array of
+    slots, and the columns double in size whenever the store is full.
+
+    Attributes
+    ----------
+    boards : ndarray
+        The boards packed by `pack_boards`.
+    scores : ndarray
+        The score of each game.
+    num_moves : ndarray
+        The number of legal moves made in each game.
+    highest_tiles : ndarray
+        The log2 highest tile of each game.
+    flags : ndarray
+        LIVE and GAME_OVER bits of each slot.
+    last_spawns : ndarray
+        The most recently added tile of each game, encoded by `encode_spawn`.
+    rng_states : ndarray
+        The state of each game's xorshift64* generator.
+    generations : ndarray
+        The number of times each slot has been used.
+    """
+
+    def __init__(self, capacity=CAPACITY, seed=None):
+        """Preallocates the columns.
+
+        Parameters
+        ----------
+        capacity : int
+            The initial number of slots.
+        seed : Optional[int]
+            The seed of the generator that seeds new games.
+        """
+        self._seeds = np.random.default_rng(seed)
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self._free = np.arange(capacity - 1, -1, -1)  # A stack of free slots, popped from the end.
+        self._num_free = capacity
+
+    def __len__(self):
+        return self.capacity - self._num_free
+
+    @property
+    def capacity(self):
+        """int: The number of slots."""
+        return len(self.flags)
+
+    def _grow(self):
+        """Double the number of slots."""
+        capacity = self.capacity
+        for name, dtype in COLUMNS:
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(capacity, dtype=dtype)]))
+        self._free = np.concatenate([np.arange(2 * capacity - 1, capacity - 1, -1), self._free[:self._num_free],
+                                     np.zeros(capacity - self._num_free, dtype=int)])
+        self._num_free += capacity
+
+    def open(self, num_sessions, seeds=None):
+        """Start new games with two random tiles each.
+
+        Parameters
+        ----------
+        num_sessions : int
+            The number of games.
+        seeds : Optional[Sequence[int]]
+            The seed of each game. Drawn from the store's generator if None.
+
+        Returns
+        -------
+        ndarray
+            The slots of the new games.
+        """
+        while self._num_free < num_sessions:
+            self._grow()
+        self._num_free -= num_sessions
+        slots = self._free[self._num_free:self._num_free + num_sessions][::-1].copy()
+        if seeds is None:
+            seeds = self._seeds.integers(1, 2 ** 63, num_sessions)
+        # A zero state would stay zero forever, so every seed is mixed with a constant and forced odd.
+        self.rng_states[slots] = (np.asarray(seeds, dtype=np.uint64) ^ np.uint64(0x9E3779B97F4A7C15)) | np.uint64(1)
+        self.boards[slots] = 0
+        self.scores[slots] = 0
+        self.num_moves[slots] = 0
+        self.flags[slots] = LIVE
+        self.generations[slots] += 1
+        boards = np.zeros((num_sessions, 4, 4), dtype=int)
+        self._add_tiles(slots, boards)
+        self._add_tiles(slots, boards)
+        self._store_boards(slots, boards)
+        return slots
+
+    def new_game(self, seed=None):
+        """Start a single new game.
+
+        Parameters
+        ----------
+        seed : Optional[int]
+            The seed of the game. Drawn from the store's generator if None.
+
+        Returns
+        -------
+        GameSession
+            A handle with the interface of Game.
+        """
+        slot = int(self.open(1, None if seed is None else [seed])[0])
+        return GameSession(self, slot)
+
+    def release(self, slots):
+        """End sessions and make their slots available to new games. Handles to them become invalid.
+
+        Slots that are not live are ignored.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots to release.
+        """
+        slots = np.atleast_1d(slots)
+        slots = slots[(self.flags[slots] & LIVE) != 0]  # Releasing a slot twice would free it twice.
+        self.flags[slots] = 0
+        self._free[self._num_free:self._num_free + len(slots)] = slots[::-1]
+        self._num_free += len(slots)
+
+    def release_finished(self):
+        """Release every session whose game is over.
+
+        Returns
+        -------
+        ndarray
+            The released slots, whose scores and highest tiles remain readable until they are reused.
+        """
+        slots = np.flatnonzero(self.flags == (LIVE | GAME_OVER))
+        self.release(slots)
+        return slots
+
+    def get_live_slots(self):
+        """Get the slots of every session.
+
+        Returns
+        -------
+        ndarray
+            The slots.
+        """
+        return np.flatnonzero(self.flags & LIVE)
+
+    def get_boards(self, slots):
+        """Unpack the boards of some games.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots.
+
+        Returns
+        -------
+        ndarray
+            The log2 tile values with shape (n, 4, 4).
+        """
+        return unpack_boards(self.boards[slots])
+
+    def _store_boards(self, slots, boards):
+        """Pack boards into their slots and update the highest tiles.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots.
+        boards : ndarray
+            The boards with shape (n, 4, 4).
+        """
+        self.boards[slots] = pack_boards(boards)
+        self.highest_tiles[slots] = boards.max(axis=(1, 2))
+
+    def _add_tiles(self, slots, boards):
+        """Add a 2 or 4 tile to a random empty position of each board, in place, with each game's generator.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots of the games, whose generators are advanced.
+        boards : ndarray
+            The boards with shape (n, 4, 4), each with at least one empty position.
+        """
+        states = self.rng_states[slots]
+        # In 2048, there is a 10% chance of a 4 being added instead of a 2.
+        values = np.where(_xorshift(states) > 0.9, 2, 1)
+        flat = boards.reshape(-1, 16)
+        empty = flat == 0
+        choice = (_xorshift(states) * empty.sum(axis=1)).astype(int)
+        positions = np.argmax(empty & (np.cumsum(empty, axis=1) == choice[:, None] + 1), axis=1)
+        flat[np.arange(len(flat)), positions] = values
+        self.rng_states[slots] = states
+        self.last_spawns[slots] = positions | np.where(values == 2, FOUR_TILE_FLAG, 0)
+
+    def legal_moves_mask(self, slots):
+        """Determine the legal directions of some games.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots.
+
+        Returns
+        -------
+        ndarray
+            A boolean array with shape (n, 4) that is True where the direction in DIRECTIONS is legal. All False for
+            finished games.
+        """
+        legal = legal_moves_mask(self.get_boards(slots))
+        legal[(self.flags[slots] & GAME_OVER) != 0] = False
+        return legal
+
+    def move(self, slots, actions):
+        """Make one move in each of some games. Illegal moves and moves in finished games are ignored.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots, without repeats.
+        actions : ndarray
+            The index in DIRECTIONS of each game's move.
+        """
+        slots, actions = np.atleast_1d(slots), np.broadcast_to(actions, np.shape(np.atleast_1d(slots)))
+        running = (self.flags[slots] & GAME_OVER) == 0
+        slots, actions = slots[running], actions[running]
+        boards = self.get_boards(slots)
+        moved = np.zeros(len(slots), dtype=bool)
+        for d in range(4):
+            index = np.flatnonzero(actions == d)
+            if not len(index):
+                continue
+            new_boards, points, legal = move_boards(boards[index], d)
+            index, new_boards, points = index[legal], new_boards[legal], points[legal]
+            boards[index] = new_boards
+            self.scores[slots[index]] += points.astype(np.uint32)
+            moved[index] = True
+        slots, boards = slots[moved], boards[moved]
+        self.num_moves[slots] += 1
+        self._add_tiles(slots, boards)
+        self._store_boards(slots, boards)
+        self._flag_game_over(slots, boards)
+
+    def _flag_game_over(self, slots, boards):
+        """Set GAME_OVER on the games whose boards have no legal moves.
+
+        Parameters
+        ----------
+        slots : ndarray
+            The slots.
+        boards : ndarray
+            The boards of the games with shape (n, 4, 4).
+        """
+        over = ~legal_moves_mask(boards).any(axis=1)
+        self.flags[slots[over]] |= GAME_OVER
+
+
+class GameSession:
+    """A handle with the interface of Game over one slot of a SessionStore.
+
+    Copying a handle gives an independent Game in the same state, so players that simulate moves on a copy work
+    unchanged. A handle becomes invalid once its slot is released.
+    """
+
+    __slots__ = ('store', 'slot', '_generation')
+
+    def __init__(self, store, slot):
+        """Wraps a live slot.
+
+        Parameters
+        ----------
+        store : SessionStore
+            The store.
+        slot : int
+            The slot.
+        """
+        self.store = store
+        self.slot = slot
+        self._generation = store.generations[slot]
+
+    def _check(self):
+        """Make sure the slot still holds this handle's game.
+
+        Raises
+        ------
+        ValueError
+            If the session was released.
+        """
+        if not self.store.flags[self.slot] & LIVE or self.store.generations[self.slot] != self._generation:
+            raise ValueError('The session has been released.')
+
+    @property
+    def board(self):
+        """ndarray: A copy of the 4x4 log2 tile values. Assigning a board replaces the game's board, like in Game."""
+        self._check()
+        return self.store.get_boards(self.slot)
+
+    @board.setter
+    def board(self, board):
+        self._check()
+        self.store._store_boards(np.array([self.slot]), np.reshape(board, (1, 4, 4)))
+
+    @property
+    def score(self):
+        """int: The current score."""
+        self._check()
+        return int(self.store.scores[self.slot])
+
+    @property
+    def highest_tile(self):
+        """int: The highest-value tile on the board."""
+        self._check()
+        return 2 ** int(self.store.highest_tiles[self.slot])
+
+    @property
+    def game_over(self):
+        """bool: Whether or not the game is over."""
+        self._check()
+        return bool(self.store.flags[self.slot] & GAME_OVER)
+
+    @property
+    def num_moves(self):
+        """int: The number of legal moves made."""
+        self._check()
+        return int(self.store.num_moves[self.slot])
+
+    @property
+    def last_spawn(self):
+        """Tuple[int, int]: The flat board position and log2 value of the most recently added tile."""
+        self._check()
+        position, value = decode_spawns(self.store.last_spawns[self.slot])
+        return int(position), int(value)
+
+    def get_legal_moves(self):
+        """Determine the legal moves in the current game state.
+
+        Returns
+        -------
+        List[Action]
+            The legal actions that can be taken (not counting quitting).
+        """
+        self._check()
+        legal = self.store.legal_moves_mask(np.array([self.slot]))[0]
+        return [d for d, is_legal in zip(DIRECTIONS, legal) if is_legal]
+
+    def move(self, direction):
+        """Execute a move in the given direction and update the game state if it was legal.
+
+        Parameters
+        ----------
+        direction : Action
+            The direction to slide the board.
+        """
+        self._check()
+        self.store.move(np.array([self.slot]), np.array([DIRECTIONS.index(direction)]))
+
+    def close(self):
+        """Release the slot for reuse."""
+        self._check()
+        self.store.release(self.slot)
+
+    def to_game(self):
+        """Copy the session into an independent Game, which draws its tiles from NumPy's global generator.
+
+        Returns
+        -------
+        Game
+            The game.
+        """
+        game = Game.__new__(Game)
+        game.board = self.board
+        game.score = self.score
+        game.highest_tile = self.highest_tile
+        game.game_over = self.game_over
+        game.num_moves = self.num_moves
+        game.last_spawn = self.last_spawn
+        return game
+
+    def __copy__(self):
+        return self.to_game()
+
+    def __deepcopy__(self, memo):
+        return self.to_game()
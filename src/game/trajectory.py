@@ -0,0 +1,325 @@
+from game.action import DIRECTIONS
+from game.game import BOARD_SHAPE, check_board_shape
+from game.vectorized import pack_boards, unpack_boards
+import numpy as np
+import os
+
+
+NO_ACTION = 255  # The action of the final position of each game.
+NO_SPAWN = 255  # The spawn of the final position of each game.
+FOUR_TILE_FLAG = 64  # Set in the spawn field when the new tile was a 4. Above every position of a 6x6 board.
+
+
+def position_dtype(shape=BOARD_SHAPE):
+    """Get the record type of a position on boards of some shape.
+
+    Parameters
+    ----------
+    shape : Tuple[int, int]
+        The number of rows and columns of the boards.
+
+    Returns
+    -------
+    dtype
+        A structured type whose 'board' field holds the board packed by `pack_boards`, as one uint64 for boards of up
+        to 16 cells or as many as they need for larger boards.
+    """
+    rows, columns = check_board_shape(shape)
+    words = -(-rows * columns // 16)
+    board = ('board', '<u8') if words == 1 else ('board', '<u8', (words,))
+    return np.dtype([board, ('action', 'u1'), ('spawn', 'u1'), ('points', '<u4')])
+
+
+POSITION_DTYPE = position_dtype()
+
+
+def encode_spawn(pos, val):
+    """Encode a spawned tile as a single byte.
+
+    Parameters
+    ----------
+    pos : int
+        The flat board position of the new tile.
+    val : int
+        The log2 value of the new tile, either 1 or 2.
+
+    Returns
+    -------
+    int
+        The position in the low six bits, with FOUR_TILE_FLAG set for a 4 tile.
+    """
+    return int(pos) | (FOUR_TILE_FLAG if val == 2 else 0)
+
+
+def decode_spawns(spawns):
+    """Decode spawn bytes into positions and log2 values.
+
+    Parameters
+    ----------
+    spawns : ndarray
+        The encoded spawns.
+
+    Returns
+    -------
+    positions : ndarray
+        The flat board positions of the new tiles.
+    values : ndarray
+        The log2 values of the new tiles.
+    """
+    spawns = np.asarray(spawns)
+    return spawns & (FOUR_TILE_FLAG - 1), np.where(spawns & FOUR_TILE_FLAG, 2, 1)
+
+
+def read_board_shape(path):
+    """Read the board shape of a trajectory log.
+
+    Parameters
+    ----------
+    path : str
+        The path of the position log.
+
+    Returns
+    -------
+    Optional[Tuple[int, int]]
+        The number of rows and columns, or None if the log does not record them.
+    """
+    shape_path = path + '.shape'
+    if not os.path.exists(shape_path):
+        return None
+    return tuple(int(s) for s in np.fromfile(shape_path, dtype='<u8'))
+
+
+class TrajectoryWriter:
+    """Appends complete games to a compact binary log.
+
+    Each position takes `position_dtype(shape).itemsize` bytes: the board before the move packed into 64 bits per 16
+    cells, the index of the action in DIRECTIONS, the encoded tile spawned after the move, and the points the move
+    earned. Each game ends with its final board, whose action and spawn are NO_ACTION and NO_SPAWN. A separate index
+    file at `path + '.idx'` holds the uint64 end offset of every game, in positions, and is only written once a game is
+    complete. A partially written game from an interrupted run is therefore truncated when the log is reopened. The
+    rows and columns of the boards are kept as two uint64s at `path + '.shape'`, and a log without them has 4x4 boards.
+
+    Attributes
+    ----------
+    path : str
+        The path of the position log.
+    shape : Tuple[int, int]
+        The number of rows and columns of the boards.
+    dtype : dtype
+        The record type of the positions.
+    num_positions : int
+        The number of positions in the log.
+    """
+
+    def __init__(self, path, shape=None):
+        """Opens the log for appending, creating it if needed.
+
+        Parameters
+        ----------
+        path : str
+            The path of the position log.
+        shape : Optional[Tuple[int, int]]
+            The number of rows and columns of the boards. The shape of an existing log, or BOARD_SHAPE for a new one,
+            if None.
+
+        Raises
+        ------
+        ValueError
+            If the shape is invalid or differs from that of an existing log.
+        """
+        self.path = path
+        index_path = path + '.idx'
+        ends = np.fromfile(index_path, dtype='<u8') if os.path.exists(index_path) else []
+        self.num_positions = int(ends[-1]) if len(ends) else 0
+        existing_shape = (read_board_shape(path) or BOARD_SHAPE) if self.num_positions else None
+        self.shape = check_board_shape(existing_shape or shape or BOARD_SHAPE)
+        if shape is not None and check_board_shape(shape) != self.shape:
+            raise ValueError(f'The log at {path} has {self.shape} boards, not {tuple(shape)}.')
+        self.dtype = position_dtype(self.shape)
+        np.array(self.shape, dtype='<u8').tofile(path + '.shape')
+        with open(path, 'ab') as f:
+            f.truncate(self.num_positions * self.dtype.itemsize)
+        self._data = open(path, 'ab')
+        self._index = open(index_path, 'ab')
+        self._game = []
+        self._actions = []
+        self._spawns = []
+        self._points = []
+        self._previous_score = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Flush and close the log."""
+        self._data.close()
+        self._index.close()
+
+    def start_game(self, game):
+        """Begin recording a new game.
+
+        Parameters
+        ----------
+        game : Game
+            The game, in its starting position.
+
+        Raises
+        ------
+        ValueError
+            If the game's board has a different shape from the log's.
+        """
+        if game.board.shape != self.shape:
+            raise ValueError(f'A game with a {game.board.shape} board cannot be recorded in a log of {self.shape} '
+                             f'boards.')
+        self._game = [game.board.copy()]
+        self._actions = []
+        self._spawns = []
+        self._points = []
+        self._previous_score = game.score
+
+    def record_move(self, game, action):
+        """Record a move that has just been made. Moves that did not change the board are skipped.
+
+        Parameters
+        ----------
+        game : Game
+            The game, after the move.
+        action : Action
+            The direction that was moved.
+        """
+        if np.array_equal(game.board, self._game[-1]):
+            return
+        self._game.append(game.board.copy())
+        self._actions.append(DIRECTIONS.index(action))
+        self._spawns.append(encode_spawn(*game.last_spawn))
+        self._points.append(game.score - self._previous_score)
+        self._previous_score = game.score
+
+    def end_game(self):
+        """Write the recorded game and its index entry."""
+        records = np.zeros(len(self._game), dtype=self.dtype)
+        records['board'] = pack_boards(np.asarray(self._game))
+        records['action'] = self._actions + [NO_ACTION]
+        records['spawn'] = self._spawns + [NO_SPAWN]
+        records['points'] = self._points + [0]
+        self.write_game(records)
+
+    def write_game(self, records):
+        """Append a complete game of already encoded positions.
+
+        Parameters
+        ----------
+        records : ndarray
+            The positions of the game with the log's dtype, ending with the final board.
+        """
+        records.astype(self.dtype, copy=False).tofile(self._data)
+        self._data.flush()
+        self.num_positions += len(records)
+        np.array([self.num_positions], dtype='<u8').tofile(self._index)
+        self._index.flush()
+
+
+class TrajectoryReader:
+    """Memory-maps a log written by TrajectoryWriter and serves its games and positions as views without copying.
+
+    Attributes
+    ----------
+    shape : Tuple[int, int]
+        The number of rows and columns of the boards.
+    positions : ndarray
+        Every complete position in the log, with dtype `position_dtype(shape)`.
+    starts : ndarray
+        The offset of the first position of each game.
+    ends : ndarray
+        The offset one past the final position of each game.
+    """
+
+    def __init__(self, path):
+        """Maps the log and reads its index.
+
+        Parameters
+        ----------
+        path : str
+            The path of the position log.
+        """
+        self.ends = np.fromfile(path + '.idx', dtype='<u8').astype(np.int64)
+        self.starts = np.concatenate([[0], self.ends[:-1]]).astype(np.int64)
+        self.shape = read_board_shape(path) or BOARD_SHAPE
+        dtype = position_dtype(self.shape)
+        num_positions = int(self.ends[-1]) if len(self.ends) else 0
+        if num_positions:
+            self.positions = np.memmap(path, dtype=dtype, mode='r', shape=(num_positions,))
+        else:
+            self.positions = np.zeros(0, dtype=dtype)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, i):
+        """Get the positions of a single game.
+
+        Parameters
+        ----------
+        i : int
+            The game number.
+
+        Returns
+        -------
+        ndarray
+            A view of the game's positions, ending with its final board.
+        """
+        return self.positions[self.starts[i]:self.ends[i]]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def iter_batches(self, batch_size):
+        """Iterate over every position in the log in contiguous batches.
+
+        The batches include the final board of each game, which can be excluded with `batch['action'] != NO_ACTION`.
+
+        Parameters
+        ----------
+        batch_size : int
+            The number of positions in each batch.
+
+        Yields
+        ------
+        ndarray
+            A view of the next batch of positions.
+        """
+        for start in range(0, len(self.positions), batch_size):
+            yield self.positions[start:start + batch_size]
+
+    def get_scores(self):
+        """Calculate the final score of every game.
+
+        Returns
+        -------
+        ndarray
+            The total points earned in each game.
+        """
+        cumulative = np.concatenate([[0], np.cumsum(self.positions['points'], dtype=np.int64)])
+        return cumulative[self.ends] - cumulative[self.starts]
+
+    @staticmethod
+    def unpack(positions, shape=BOARD_SHAPE):
+        """Unpack the boards of some positions.
+
+        Parameters
+        ----------
+        positions : ndarray
+            Positions with dtype `position_dtype(shape)`.
+        shape : Tuple[int, int]
+            The number of rows and columns of the boards, such as the `shape` of the reader they came from.
+
+        Returns
+        -------
+        ndarray
+            The boards with shape (n, rows, columns).
+        """
+        return unpack_boards(positions['board'], shape)
@@ -0,0 +1,392 @@
+from functools import lru_cache
+from game.game import BOARD_SHAPE, check_board_shape
+import numpy as np
+
+
+TABLE_CHUNK = 16 ** 4  # Rows built at once, which bounds the memory used to build the tables of long rows.
+
+
+@lru_cache(maxsize=None)
+def _row_tables(length=4):
+    """Precompute the result of sliding every possible row of a given length to the left.
+
+    The slide, merge, slide pattern and the scoring match `Game._move` exactly. Each row of 4-bit cells is one of
+    16 ** length states, so the tables of 6-cell rows take about 170 MB and are only built when first needed.
+
+    Parameters
+    ----------
+    length : int
+        The number of cells in a row.
+
+    Returns
+    -------
+    rows : ndarray
+        An int8 array with shape (16 ** length, length) of each row after moving left.
+    points : ndarray
+        An int32 array with shape (16 ** length,) of the points earned by each move.
+    """
+    num_states = 16 ** length
+    rows = np.empty((num_states, length), dtype=np.int8)
+    points = np.empty(num_states, dtype=np.int32)
+    shifts = 4 * np.arange(length - 1, -1, -1)
+
+    def slide_left(r):
+        """Stable-sort the non-zero tiles of each row to the left."""
+        order = np.argsort(r == 0, axis=1, kind='stable')
+        return np.take_along_axis(r, order, axis=1)
+
+    for start in range(0, num_states, TABLE_CHUNK):
+        index = np.arange(start, min(start + TABLE_CHUNK, num_states))
+        chunk = slide_left((index[:, None] >> shifts) & 15)
+        chunk_points = np.zeros(len(index), dtype=np.int64)
+        for j in range(length - 1):
+            merge = (chunk[:, j] == chunk[:, j + 1]) & (chunk[:, j] != 0)
+            chunk[merge, j] += 1
+            chunk[merge, j + 1] = 0
+            chunk_points += np.where(merge, 2 ** chunk[:, j], 0)
+        rows[index] = slide_left(chunk)
+        points[index] = chunk_points
+    return rows, points
+
+
+@lru_cache(maxsize=None)
+def _row_can_move_table(length=4):
+    """Precompute whether every possible row of a given length changes when moved to the left.
+
+    Parameters
+    ----------
+    length : int
+        The number of cells in a row.
+
+    Returns
+    -------
+    ndarray
+        A boolean array with shape (16 ** length,).
+    """
+    rows, _ = _row_tables(length)
+    return _row_index(rows) != np.arange(16 ** length)
+
+
+def _orient(boards, direction, inverse=False):
+    """View boards so that the given direction points left along the last axis, or undo such a view.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An array of boards with shape (n, rows, columns).
+    direction : int
+        The index of the direction in DIRECTIONS.
+    inverse : bool
+        Whether to undo the view instead of applying it.
+
+    Returns
+    -------
+    ndarray
+        A view of the boards.
+    """
+    if direction == 0:  # Left
+        return boards
+    elif direction == 1:  # Right
+        return boards[:, :, ::-1]
+    elif direction == 2:  # Up
+        return boards.transpose(0, 2, 1)
+    elif inverse:  # Down
+        return boards[:, :, ::-1].transpose(0, 2, 1)
+    return boards.transpose(0, 2, 1)[:, :, ::-1]
+
+
+def _check_tiles(boards):
+    """Make sure every tile fits in the four bits per cell of the row tables and packed boards.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An integer array of boards.
+
+    Raises
+    ------
+    ValueError
+        If a log2 tile value is 16 or more, which boards larger than 4x4 make reachable.
+    """
+    if boards.size and boards.max() > 15:
+        raise ValueError(f'Cells hold log2 tile values up to 15, so a 2^{boards.max()} tile cannot be represented.')
+
+
+def _row_index(rows):
+    """Encode rows of log2 tile values as indices into the row tables of their length.
+
+    Parameters
+    ----------
+    rows : ndarray
+        An integer array whose last axis is the row.
+
+    Returns
+    -------
+    ndarray
+        The row indices.
+    """
+    rows = rows.astype(np.int64, copy=False)
+    index = rows[..., 0]
+    for j in range(1, rows.shape[-1]):
+        index = (index << 4) | rows[..., j]
+    return index
+
+
+def move_boards(boards, direction):
+    """Simulate a move on many boards at once without adding new tiles.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An integer array of boards with shape (n, rows, columns) and log2 tile values below 16.
+    direction : int
+        The index of the direction in DIRECTIONS.
+
+    Returns
+    -------
+    new_boards : ndarray
+        The boards after the move, with the same shape. Identical to boards for illegal moves.
+    points_earned : ndarray
+        The points earned by each move, with shape (n,).
+    move_was_legal : ndarray
+        Whether or not each move changed its board, with shape (n,).
+
+    Raises
+    ------
+    ValueError
+        If a tile is 2^16 or larger.
+    """
+    _check_tiles(boards)
+    lines = _orient(boards, direction)
+    row_results, row_points = _row_tables(lines.shape[-1])
+    index = _row_index(lines)
+    new_boards = np.ascontiguousarray(_orient(row_results[index], direction, inverse=True), dtype=int)
+    move_was_legal = _row_can_move_table(lines.shape[-1])[index].any(axis=1)
+    return new_boards, row_points[index].sum(axis=1), move_was_legal
+
+
+def score_moves(boards):
+    """Determine the points and legality of all four moves for many boards at once, without building the new boards.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An integer array of boards with shape (n, rows, columns) and log2 tile values below 16.
+
+    Returns
+    -------
+    points_earned : ndarray
+        An array with shape (n, 4) of the points each direction in DIRECTIONS would earn.
+    move_was_legal : ndarray
+        A boolean array with shape (n, 4) that is True where the direction in DIRECTIONS is legal.
+
+    Raises
+    ------
+    ValueError
+        If a tile is 2^16 or larger.
+    """
+    _check_tiles(boards)
+    rows = boards.astype(np.int64, copy=False)
+    columns = rows.transpose(0, 2, 1)
+    points = np.empty((len(boards), 4), dtype=np.int64)
+    legal = np.empty((len(boards), 4), dtype=bool)
+    for d, lines in enumerate([rows, rows[:, :, ::-1], columns, columns[:, :, ::-1]]):  # The order of DIRECTIONS.
+        _, row_points = _row_tables(lines.shape[-1])
+        index = _row_index(lines)
+        points[:, d] = row_points[index].sum(axis=1)
+        legal[:, d] = _row_can_move_table(lines.shape[-1])[index].any(axis=1)
+    return points, legal
+
+
+def legal_moves_mask(boards):
+    """Determine the legal directions for many boards at once.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An integer array of boards with shape (n, rows, columns) and log2 tile values below 16.
+
+    Returns
+    -------
+    ndarray
+        A boolean array with shape (n, 4) that is True where the direction in DIRECTIONS is legal.
+    """
+    return score_moves(boards)[1]
+
+
+def pack_boards(boards):
+    """Pack boards into 64-bit integers with four bits per cell, in row-major order from the most significant bits.
+
+    A board of up to 16 cells fits in a single integer. Larger boards are packed into as many integers as they need,
+    with the unused bits of the last one left zero.
+
+    Parameters
+    ----------
+    boards : ndarray
+        An integer array of boards with shape (..., rows, columns) and log2 tile values below 16.
+
+    Returns
+    -------
+    ndarray
+        A uint64 array with shape (...) for boards of up to 16 cells, or (..., words) for larger boards.
+
+    Raises
+    ------
+    ValueError
+        If a tile is 2^16 or larger.
+    """
+    boards = np.asarray(boards)
+    _check_tiles(boards)
+    num_cells = boards.shape[-2] * boards.shape[-1]
+    words = -(-num_cells // 16)
+    cells = np.zeros(boards.shape[:-2] + (16 * words,), dtype=np.uint64)
+    cells[..., :num_cells] = boards.reshape(boards.shape[:-2] + (num_cells,))
+    shifts = np.arange(60, -1, -4, dtype=np.uint64)
+    packed = np.bitwise_or.reduce(cells.reshape(boards.shape[:-2] + (words, 16)) << shifts, axis=-1)
+    return packed[..., 0] if words == 1 else packed
+
+
+def unpack_boards(packed, shape=BOARD_SHAPE):
+    """Unpack boards packed by `pack_boards`.
+
+    Parameters
+    ----------
+    packed : ndarray
+        A uint64 array with shape (...) for boards of up to 16 cells, or (..., words) for larger boards.
+    shape : Tuple[int, int]
+        The number of rows and columns of the boards.
+
+    Returns
+    -------
+    ndarray
+        An integer array of boards with shape (..., rows, columns).
+    """
+    packed = np.asarray(packed, dtype=np.uint64)
+    num_cells = shape[0] * shape[1]
+    if num_cells <= 16:
+        packed = packed[..., None]
+    shifts = np.arange(60, -1, -4, dtype=np.uint64)
+    cells = (packed[..., None] >> shifts) & np.uint64(15)
+    cells = cells.reshape(packed.shape[:-1] + (-1,))[..., :num_cells]
+    return cells.astype(int).reshape(packed.shape[:-1] + tuple(shape))
+
+
+class GameBatch:
+    """Many games of 2048 played in lockstep with the batched rules.
+
+    The rules match Game, including the 90/10 split between new 2 and 4 tiles, but the random numbers are drawn in a
+    different order, so individual games differ from Game for the same seed.
+
+    Attributes
+    ----------
+    boards : ndarray
+        The log2 tile values with shape (n, rows, columns).
+    scores : ndarray
+        The current score of each game.
+    num_moves : ndarray
+        The number of legal moves made in each game.
+    game_over : ndarray
+        Whether or not each game is over.
+    rng : Generator
+        The source of new tiles.
+    """
+
+    def __init__(self, num_games, rng=None, boards=None, shape=BOARD_SHAPE):
+        """Sets up each game with two random tiles, or from given boards.
+
+        Parameters
+        ----------
+        num_games : int
+            The number of games.
+        rng : Optional[Generator]
+            The source of new tiles. A freshly seeded generator if None.
+        boards : Optional[ndarray]
+            The starting boards with shape (num_games, rows, columns), such as positions to roll out from. Their
+            scores start at zero.
+        shape : Tuple[int, int]
+            The number of rows and columns of every board.
+        """
+        shape = check_board_shape(shape)
+        self.rng = np.random.default_rng() if rng is None else rng
+        self.scores = np.zeros(num_games, dtype=np.int64)
+        self.num_moves = np.zeros(num_games, dtype=np.int64)
+        if boards is None:
+            self.boards = np.zeros((num_games,) + shape, dtype=int)
+            self._legal = np.zeros((num_games, 4), dtype=bool)
+            self.game_over = np.zeros(num_games, dtype=bool)
+            everything = np.ones(num_games, dtype=bool)
+            self.add_tiles(everything)
+            self.add_tiles(everything)
+        else:
+            self.boards = np.array(boards, dtype=int).reshape((num_games,) + shape)
+            self._legal = legal_moves_mask(self.boards)
+            self.game_over = ~self._legal.any(axis=1)
+
+    def __len__(self):
+        return len(self.boards)
+
+    @property
+    def highest_tiles(self):
+        """ndarray: The highest tile of each game."""
+        return 2 ** self.boards.max(axis=(1, 2))
+
+    def get_legal_moves_mask(self):
+        """Get the legal directions of every game.
+
+        Returns
+        -------
+        ndarray
+            A boolean array with shape (n, 4) that is True where the direction in DIRECTIONS is legal. All False for
+            finished games.
+        """
+        return self._legal & ~self.game_over[:, None]
+
+    def move(self, actions):
+        """Make one move in every game that is still running.
+
+        Parameters
+        ----------
+        actions : ndarray
+            The index in DIRECTIONS of each game's move. Illegal moves and moves in finished games are ignored.
+        """
+        running = np.flatnonzero(~self.game_over)
+        actions = np.asarray(actions)[running]
+        moved = []
+        for d in range(4):
+            index = running[actions == d]
+            if not len(index):
+                continue
+            new_boards, points, legal = move_boards(self.boards[index], d)
+            index = index[legal]
+            self.boards[index] = new_boards[legal]
+            self.scores[index] += points[legal]
+            moved.append(index)
+        if moved:
+            moved = np.sort(np.concatenate(moved))
+            self.num_moves[moved] += 1
+            self.add_tiles(moved)
+
+    def add_tiles(self, games):
+        """Add a 2 or 4 tile to a random empty position of some games and update which games are over.
+
+        Parameters
+        ----------
+        games : ndarray
+            The indices of, or a boolean mask of, the games to add a tile to. Games without an empty position are
+            skipped.
+        """
+        games = np.asarray(games)
+        if games.dtype == bool:
+            games = np.flatnonzero(games)
+        boards = self.boards[games].reshape(-1, self.boards.shape[1] * self.boards.shape[2])
+        has_empty = np.any(boards == 0, axis=1)
+        games, boards = games[has_empty], boards[has_empty]
+        keys = self.rng.random(boards.shape)
+        keys[boards != 0] = -1  # Only empty positions can be chosen.
+        positions = keys.argmax(axis=1)
+        # In 2048, there is a 10% chance of a 4 being added instead of a 2.
+        boards[np.arange(len(boards)), positions] = np.where(self.rng.random(len(boards)) > 0.9, 2, 1)
+        self.boards[games] = boards.reshape((-1,) + self.boards.shape[1:])
+        legal = legal_moves_mask(self.boards[games])
+        self._legal[games] = legal
+        self.game_over[games] = ~legal.any(axis=1)
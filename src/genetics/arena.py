@@ -0,0 +1,287 @@
+from genetics.genome import Architecture, DEFAULT_ARCHITECTURE, Genome
+from multiprocessing import Pool, shared_memory
+import numpy as np
+from players import NetworkPlayer
+
+
+GENOME_BYTES = DEFAULT_ARCHITECTURE.num_weights
+GAMES_PER_JOB = 10
+_arena = None  # The arena attached by this worker process.
+_players = {}  # The players built by this worker process, keyed by their arena slot.
+
+
+class SharedArena:
+    """A generation's packed genomes and preallocated result buffers in a single shared memory block.
+
+    Each network has a slot holding its genome as up to `genome_bytes` int8 values along with its architecture, a
+    version number that is bumped whenever the genome is replaced, and room for the scores, log2 highest tiles, and
+    move counts of up to `max_games` games.
+
+    Attributes
+    ----------
+    name : str
+        The name of the shared memory block, used to attach from other processes.
+    num_networks : int
+        The number of network slots.
+    max_games : int
+        The number of game results each slot can hold.
+    genome_bytes : int
+        The largest genome buffer each slot can hold.
+    versions : ndarray
+        The version of the genome in each slot.
+    architectures : ndarray
+        The hidden layer size, number of hidden layers, and board rows and columns of the genome in each slot, with
+        shape (num_networks, 4).
+    scores : ndarray
+        The uint32 scores with shape (num_networks, max_games).
+    num_moves : ndarray
+        The uint32 move counts with shape (num_networks, max_games).
+    highest_tiles : ndarray
+        The uint8 log2 highest tiles with shape (num_networks, max_games).
+    genomes : ndarray
+        The packed genomes with shape (num_networks, genome_bytes).
+    """
+
+    def __init__(self, num_networks, max_games, name=None, genome_bytes=GENOME_BYTES):
+        """Creates a new block, or attaches to an existing one if a name is given.
+
+        Parameters
+        ----------
+        num_networks : int
+            The number of network slots.
+        max_games : int
+            The number of game results each slot can hold.
+        name : Optional[str]
+            The name of an existing block with the same dimensions.
+        genome_bytes : int
+            The largest genome buffer each slot can hold.
+        """
+        self.num_networks = num_networks
+        self.max_games = max_games
+        self.genome_bytes = genome_bytes
+        layout = [('versions', np.int64, (num_networks,)),
+                  ('architectures', np.int64, (num_networks, 4)),
+                  ('scores', np.uint32, (num_networks, max_games)),
+                  ('num_moves', np.uint32, (num_networks, max_games)),
+                  ('highest_tiles', np.uint8, (num_networks, max_games)),
+                  ('genomes', np.int8, (num_networks, genome_bytes))]  # Ordered by alignment.
+        size = sum(np.dtype(dtype).itemsize * int(np.prod(shape)) for _, dtype, shape in layout)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=size)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.name = self._shm.name
+        offset = 0
+        for field, dtype, shape in layout:
+            setattr(self, field, np.ndarray(shape, dtype=dtype, buffer=self._shm.buf, offset=offset))
+            offset += np.dtype(dtype).itemsize * int(np.prod(shape))
+        if self._owner:
+            self.versions[:] = 0
+
+    def close(self):
+        """Detach from the block, and free it if this arena created it."""
+        for field in ('versions', 'architectures', 'scores', 'num_moves', 'highest_tiles', 'genomes'):
+            setattr(self, field, None)  # The block cannot be closed while arrays still point into it.
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def write_genome(self, index, genome):
+        """Pack a genome into a slot and bump the slot's version.
+
+        Parameters
+        ----------
+        index : int
+            The slot.
+        genome : Genome
+            The genome.
+        """
+        buffer = np.frombuffer(genome.to_buffer(), dtype=np.int8)
+        self.genomes[index, :len(buffer)] = buffer
+        architecture = genome.architecture
+        self.architectures[index] = architecture[:2] + architecture.board_shape
+        self.versions[index] += 1
+
+    def read_genome(self, index):
+        """Unpack the genome in a slot.
+
+        Parameters
+        ----------
+        index : int
+            The slot.
+
+        Returns
+        -------
+        Genome
+            The genome.
+        """
+        hidden_layer_size, num_hidden_layers, *board_shape = self.architectures[index].tolist()
+        architecture = Architecture(hidden_layer_size, num_hidden_layers, board_shape)
+        return Genome.from_buffer(self.genomes[index, :architecture.num_weights].tobytes(), architecture)
+
+
+def _attach(name, num_networks, max_games, genome_bytes):
+    """Attach a worker process to an arena once, when the worker starts.
+
+    Parameters
+    ----------
+    name : str
+        The name of the arena's shared memory block.
+    num_networks : int
+        The number of network slots.
+    max_games : int
+        The number of game results each slot can hold.
+    genome_bytes : int
+        The largest genome buffer each slot can hold.
+    """
+    global _arena
+    _arena = SharedArena(num_networks, max_games, name, genome_bytes)
+    _players.clear()
+
+
+def _play_job(job):
+    """Play the games of a job and write the results into the attached arena.
+
+    Parameters
+    ----------
+    job : Tuple[int, int, int, int, int]
+        The slot, the genome version, the first result column, the number of games, and the seed of the first game.
+        Game i is played with seed + i.
+
+    Returns
+    -------
+    Tuple[int, int, int]
+        The slot, first result column, and number of games, to acknowledge the job.
+    """
+    index, version, first, num_games, seed = job
+    if index not in _players or _players[index][0] != version:
+        _players[index] = (version, NetworkPlayer(genome=_arena.read_genome(index)))
+    player = _players[index][1]
+    for i in range(num_games):
+        np.random.seed(seed + i)
+        game = player.play_game(False)
+        _arena.scores[index, first + i] = game.score
+        _arena.highest_tiles[index, first + i] = np.log2(game.highest_tile)
+        _arena.num_moves[index, first + i] = game.num_moves
+    player.scores, player.highest_tiles = [], []
+    return index, first, num_games
+
+
+class SharedMemoryEvaluator:
+    """Plays the games of `Population.play_games` in a pool of worker processes that share an arena.
+
+    Workers attach to the arena when they start. A slot's genome is only written when a genome with different weight
+    arrays is played in it, including the same genome after one of its weight arrays was replaced. Each job is a small
+    tuple of integers, so the data crossing process boundaries does not grow with the population or the number of
+    games. The arena is rebuilt, along with the pool, if a call needs more network slots, games, or genome bytes than it
+    holds.
+
+    Attributes
+    ----------
+    workers : Optional[int]
+        The number of worker processes. One per CPU if None.
+    games_per_job : int
+        The maximum number of games in a single job.
+    seed : int
+        The seed of the next game.
+    arena : SharedArena
+        The shared genomes and results.
+    total_moves : int
+        The number of moves made in all games played so far.
+    """
+
+    def __init__(self, workers=None, num_networks=32, max_games=250, games_per_job=GAMES_PER_JOB, seed=0):
+        """Creates the arena and starts the workers.
+
+        Parameters
+        ----------
+        workers : Optional[int]
+            The number of worker processes. One per CPU if None.
+        num_networks : int
+            The initial number of network slots.
+        max_games : int
+            The initial number of game results each slot can hold.
+        games_per_job : int
+            The maximum number of games in a single job.
+        seed : int
+            The seed of the first game.
+        """
+        self.workers = workers
+        self.games_per_job = games_per_job
+        self.seed = seed
+        self.total_moves = 0
+        self.arena = None
+        self._pool = None
+        self._weights = []  # The weight arrays of the genome written to each slot.
+        self._start(num_networks, max_games, GENOME_BYTES)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _start(self, num_networks, max_games, genome_bytes):
+        """(Re)create the arena and the worker pool.
+
+        Parameters
+        ----------
+        num_networks : int
+            The number of network slots.
+        max_games : int
+            The number of game results each slot can hold.
+        genome_bytes : int
+            The largest genome buffer each slot can hold.
+        """
+        self.close()
+        self.arena = SharedArena(num_networks, max_games, genome_bytes=genome_bytes)
+        self._weights = [()] * num_networks
+        self._pool = Pool(self.workers, initializer=_attach,
+                          initargs=(self.arena.name, num_networks, max_games, genome_bytes))
+
+    def close(self):
+        """Stop the workers and free the arena."""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self.arena is not None:
+            self.arena.close()
+            self.arena = None
+
+    def play_games(self, networks, games):
+        """Have the workers play games for each network and add the results to the networks' stats.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks that should play.
+        games : Union[int, Sequence[int]]
+            The number of games each network should play, either for all of them or for each one.
+        """
+        if not np.iterable(games):
+            games = [games] * len(networks)
+        genome_bytes = max((n.genome.architecture.num_weights for n in networks), default=0)
+        if len(networks) > self.arena.num_networks or max(games, default=0) > self.arena.max_games or \
+                genome_bytes > self.arena.genome_bytes:
+            self._start(max(len(networks), self.arena.num_networks), max(max(games), self.arena.max_games),
+                        max(genome_bytes, self.arena.genome_bytes))
+        jobs = []
+        for index, (n, net_games) in enumerate(zip(networks, games)):
+            weights = (n.genome.input_weights, n.genome.hidden_weights, n.genome.output_weights)
+            if len(self._weights[index]) != 3 or any(w is not c for w, c in zip(weights, self._weights[index])):
+                self.arena.write_genome(index, n.genome)
+                self._weights[index] = weights
+            version = int(self.arena.versions[index])
+            for first in range(0, net_games, self.games_per_job):
+                num_games = min(self.games_per_job, net_games - first)
+                jobs.append((index, version, first, num_games, self.seed))
+                self.seed += num_games
+        for _ in self._pool.imap_unordered(_play_job, jobs):
+            pass
+        for index, (n, net_games) in enumerate(zip(networks, games)):
+            n.scores.extend(self.arena.scores[index, :net_games].tolist())
+            n.highest_tiles.extend((2 ** self.arena.highest_tiles[index, :net_games].astype(np.int64)).tolist())
+            self.total_moves += int(self.arena.num_moves[index, :net_games].sum())
@@ -0,0 +1,203 @@
+import numpy as np
+import time
+
+
+INITIAL_GAMES = 5
+ROUND_GAMES = 40
+MIN_LOG_STD = 0.05  # Keeps a network whose first games happened to score alike from being treated as certain.
+
+
+def ocba_allocation(means, stds, num_top):
+    """Calculate the share of further games each network should get to best separate the top networks from the rest.
+
+    This is optimal computing budget allocation for selecting a subset (OCBA-m): each network's share is proportional
+    to the square of its standard deviation divided by its distance from the boundary halfway between the last network
+    in the top and the first network outside it, so networks that are noisy and close to the boundary play the most.
+
+    Parameters
+    ----------
+    means : ndarray
+        The estimated mean of each network.
+    stds : ndarray
+        The standard deviation of a single game of each network.
+    num_top : int
+        The number of top networks to identify.
+
+    Returns
+    -------
+    ndarray
+        The share of each network, summing to one.
+    """
+    order = np.argsort(means)[::-1]
+    boundary = (means[order[num_top - 1]] + means[order[num_top]]) / 2
+    distances = np.maximum(np.abs(means - boundary), 1e-9)
+    ratios = np.square(stds / distances)
+    return ratios / ratios.sum()
+
+
+class BudgetScheduler:
+    """Plays a generation's games within a wall-clock or total-move budget, allocating them with OCBA-m.
+
+    Every network first plays `initial_games` games. Then, in rounds of up to `round_games` games, the games played so
+    far plus the next round are split between the networks in proportion to `ocba_allocation` on their mean log-scores,
+    or log-fitnesses if networks are penalized for their inference cost, and each network plays enough to reach its
+    share. The cost of a game is measured live from the generation's games so far, so a round is only started if its
+    expected cost fits in what is left of the budget, and games that get longer as the networks improve shrink the
+    rounds instead of stretching the generation.
+
+    A move budget needs the moves to be counted: games played in this process always are, and a coordinator is only
+    accepted if it has a `total_moves` counter, like SharedMemoryEvaluator and ThreadEvaluator.
+
+    Attributes
+    ----------
+    seconds : Optional[float]
+        The wall-clock budget of a generation.
+    moves : Optional[int]
+        The move budget of a generation.
+    initial_games : int
+        The number of games every network plays before any are allocated.
+    round_games : int
+        The largest number of games allocated at once.
+    games : int
+        The number of games played in the last generation.
+    spent_seconds : float
+        The time taken by the last generation.
+    spent_moves : Optional[int]
+        The number of moves made in the last generation, or None if they could not be counted.
+    rounds : int
+        The number of allocation rounds in the last generation.
+    """
+
+    def __init__(self, seconds=None, moves=None, initial_games=INITIAL_GAMES, round_games=ROUND_GAMES):
+        """Sets the budget.
+
+        Parameters
+        ----------
+        seconds : Optional[float]
+            The wall-clock budget of a generation.
+        moves : Optional[int]
+            The move budget of a generation. Exactly one of seconds and moves must be given.
+        initial_games : int
+            The number of games every network plays before any are allocated, at least two so every network has a
+            variance.
+        round_games : int
+            The largest number of games allocated at once.
+        """
+        if (seconds is None) == (moves is None):
+            raise ValueError('Exactly one of seconds and moves must be given.')
+        if initial_games < 2:
+            raise ValueError('Every network must play at least two initial games.')
+        self.seconds = seconds
+        self.moves = moves
+        self.initial_games = initial_games
+        self.round_games = round_games
+        self.games = 0
+        self.spent_seconds = 0.
+        self.spent_moves = None
+        self.rounds = 0
+
+    def _play(self, networks, counts, coordinator):
+        """Play some games for each network.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks.
+        counts : Sequence[int]
+            The number of games for each network.
+        coordinator : Optional[Union[Coordinator, SharedMemoryEvaluator, ThreadEvaluator]]
+            If given, the games are played by the coordinator's workers instead of in this process.
+
+        Returns
+        -------
+        Optional[int]
+            The number of moves made, or None if they could not be counted.
+        """
+        pairs = [(n, int(k)) for n, k in zip(networks, counts) if k > 0]
+        if coordinator is None:
+            return sum(n.play_game(False).num_moves for n, k in pairs for _ in range(k))
+        before = getattr(coordinator, 'total_moves', None)
+        coordinator.play_games([n for n, _ in pairs], [k for _, k in pairs])
+        return None if before is None else coordinator.total_moves - before
+
+    def _spent(self, start):
+        """Measure the part of the budget used so far.
+
+        Parameters
+        ----------
+        start : float
+            The time the generation started.
+
+        Returns
+        -------
+        float
+            The seconds or moves used.
+        """
+        return time.perf_counter() - start if self.seconds is not None else self.spent_moves
+
+    def run(self, pop, num_top, coordinator=None):
+        """Play the games of a generation for the non-elite networks of a population, with the elites as rivals.
+
+        Parameters
+        ----------
+        pop : Population
+            The population. Its `get_fitness` gives the value networks are ranked by.
+        num_top : int
+            The number of networks, including the elites, that should be identified as the best.
+        coordinator : Optional[Union[Coordinator, SharedMemoryEvaluator, ThreadEvaluator]]
+            If given, the games are played by the coordinator's workers instead of in this process.
+
+        Returns
+        -------
+        games : int
+            The number of games played.
+        seconds : float
+            The time taken.
+        """
+        if self.moves is not None and coordinator is not None and not hasattr(coordinator, 'total_moves'):
+            raise ValueError(f'A move budget needs a coordinator that counts moves, not {type(coordinator).__name__}.')
+        start = time.perf_counter()
+        self.games, self.spent_moves, self.rounds = 0, 0, 0
+        networks = pop.networks + pop.elites
+        budget = self.seconds if self.seconds is not None else self.moves
+
+        def play(counts):
+            """Play some games and add up what they cost."""
+            moves = self._play(networks, counts, coordinator)
+            self.spent_moves = None if moves is None or self.spent_moves is None else self.spent_moves + moves
+            self.games += int(np.sum(counts))
+
+        play([max(self.initial_games - n.get_num_games_played(), 0) for n in networks])
+        while 0 < num_top < len(networks):
+            per_game = self._spent(start) / self.games if self.games else 0
+            affordable = int((budget - self._spent(start)) // per_game) if per_game > 0 else self.round_games
+            size = min(self.round_games, affordable)
+            if size < 1:
+                break
+            played = np.array([n.get_num_games_played() for n in networks])
+            means = np.log([pop.get_fitness(n) for n in networks])
+            stds = np.maximum([np.std(np.log(n.scores), ddof=1) for n in networks], MIN_LOG_STD)
+            targets = (played.sum() + size) * ocba_allocation(means, stds, num_top)
+            shortfall = np.maximum(targets - played, 0)
+            counts = np.floor(size * shortfall / shortfall.sum()).astype(int)
+            counts[np.argsort(shortfall - counts)[::-1][:size - counts.sum()]] += 1  # Hand out what flooring left over.
+            play(counts)
+            self.rounds += 1
+        self.spent_seconds = time.perf_counter() - start
+        return self.games, self.spent_seconds
+
+    def summary(self):
+        """Summarize the last generation.
+
+        Returns
+        -------
+        dict
+            The budget, the games played, the time taken, the moves made, and the number of allocation rounds.
+        """
+        return {
+            'budget': {'seconds': self.seconds} if self.seconds is not None else {'moves': self.moves},
+            'games': self.games,
+            'seconds': self.spent_seconds,
+            'moves': self.spent_moves,
+            'rounds': self.rounds,
+        }
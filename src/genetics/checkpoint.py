@@ -0,0 +1,215 @@
+from collections import deque
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+
+
+MAX_PENDING = 1
+CHECKPOINT_PATTERN = re.compile(r'^Generation(\d+)(\.cache)?\.pkl$')
+
+
+def checkpoint_paths(output_dir, generation):
+    """Get the paths a generation's checkpoint is saved to.
+
+    Parameters
+    ----------
+    output_dir : str
+        The directory of the checkpoints.
+    generation : int
+        The generation of the checkpoint.
+
+    Returns
+    -------
+    pop_path : str
+        The path of the population.
+    cache_path : str
+        The path of the fitness cache.
+    """
+    return (os.path.join(output_dir, f'Generation{generation}.pkl'),
+            os.path.join(output_dir, f'Generation{generation}.cache.pkl'))
+
+
+def write_atomically(obj, path):
+    """Pickle an object to a temporary file next to the path, then rename it over the path.
+
+    The rename is atomic, so the path always holds either the previous file or the complete new one, never a file cut
+    short by an interrupted write.
+
+    Parameters
+    ----------
+    obj : Any
+        The object to pickle.
+    path : str
+        The save path.
+    """
+    directory, name = os.path.split(os.path.abspath(path))
+    f = tempfile.NamedTemporaryFile('wb', dir=directory, prefix=f'.{name}.', suffix='.tmp', delete=False)
+    try:
+        with f:
+            pickle.dump(obj, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f.name, path)
+    except BaseException:
+        os.remove(f.name)
+        raise
+
+
+class CheckpointWriter:
+    """Saves checkpoints on a background thread so the games never wait for the disk.
+
+    `submit` only takes a snapshot of the population and the fitness cache, which shares the genomes and copies the
+    game results and collections that keep changing, and queues it. A thread, started whenever there is something to
+    write and finishing once the queue is empty, pickles the snapshots and writes them with `write_atomically`. At most
+    `max_pending` snapshots wait behind the one being written, so if the disk falls behind, the oldest waiting
+    snapshot is dropped for the newer one rather than holding ever more of them in memory. The thread is not a daemon,
+    so an exiting interpreter still finishes the writes already queued.
+
+    Attributes
+    ----------
+    output_dir : str
+        The directory the checkpoints are written to.
+    keep : Optional[int]
+        The number of most recent checkpoints kept in output_dir, deleting older ones after every write. All are kept
+        if None.
+    max_pending : int
+        The largest number of snapshots waiting to be written.
+    written : int
+        The number of checkpoints written.
+    skipped : int
+        The number of snapshots dropped for newer ones.
+    seconds : float
+        The time the thread has spent writing.
+    """
+
+    def __init__(self, output_dir='.', keep=None, max_pending=MAX_PENDING):
+        """Sets where and how many checkpoints are kept.
+
+        Parameters
+        ----------
+        output_dir : str
+            The directory the checkpoints are written to.
+        keep : Optional[int]
+            The number of most recent checkpoints kept. All are kept if None.
+        max_pending : int
+            The largest number of snapshots waiting to be written, at least one.
+        """
+        if keep is not None and keep < 1:
+            raise ValueError('At least one checkpoint must be kept.')
+        if max_pending < 1:
+            raise ValueError('At least one snapshot must be able to wait.')
+        self.output_dir = output_dir
+        self.keep = keep
+        self.max_pending = max_pending
+        self.written = 0
+        self.skipped = 0
+        self.seconds = 0.
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._error = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def submit(self, pop, fitness_cache=None):
+        """Snapshot a population, and the fitness cache if there is one, and queue them to be written.
+
+        Parameters
+        ----------
+        pop : Population
+            The population.
+        fitness_cache : Optional[FitnessCache]
+            The fitness cache, saved next to the population.
+        """
+        self._raise_error()
+        snapshot = (pop.generation, pop.snapshot(), None if fitness_cache is None else fitness_cache.snapshot())
+        with self._lock:
+            if len(self._pending) == self.max_pending:
+                self._pending.popleft()
+                self.skipped += 1
+            self._pending.append(snapshot)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='CheckpointWriter')
+                self._thread.start()
+
+    def flush(self):
+        """Wait for every queued snapshot to be written, raising the first error in writing any of them."""
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self._raise_error()
+
+    def close(self):
+        """Write the queued snapshots. The writer can still be used afterwards, as it holds no thread while idle."""
+        self.flush()
+
+    def summary(self):
+        """Summarize the checkpoints written so far.
+
+        Returns
+        -------
+        str
+            A one-line summary.
+        """
+        return f'{self.written} written, {self.skipped} skipped, {self.seconds:.2f}s writing in the background'
+
+    def _raise_error(self):
+        """Raise the first error in writing a snapshot, if there was one, once."""
+        error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def _run(self):
+        """Write queued snapshots until there are none left."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                generation, pop, fitness_cache = self._pending.popleft()
+            try:
+                start = time.perf_counter()
+                self._write(generation, pop, fitness_cache)
+                self.seconds += time.perf_counter() - start
+                self.written += 1
+            except Exception as e:
+                self._error = self._error or e
+
+    def _write(self, generation, pop, fitness_cache):
+        """Write a snapshot and delete the checkpoints that are no longer kept.
+
+        Parameters
+        ----------
+        generation : int
+            The generation of the snapshot.
+        pop : Population
+            The snapshot of the population.
+        fitness_cache : Optional[FitnessCache]
+            The snapshot of the fitness cache.
+        """
+        pop_path, cache_path = checkpoint_paths(self.output_dir, generation)
+        write_atomically(pop, pop_path)
+        if fitness_cache is not None:
+            write_atomically(fitness_cache, cache_path)
+        self.prune()
+
+    def prune(self):
+        """Delete every checkpoint in output_dir, and its fitness cache, older than the `keep` most recent ones."""
+        if self.keep is None:
+            return
+        checkpoints = {}
+        for name in os.listdir(self.output_dir):
+            match = CHECKPOINT_PATTERN.match(name)
+            if match:
+                checkpoints.setdefault(int(match.group(1)), []).append(name)
+        for generation in sorted(checkpoints)[:-self.keep]:
+            for name in checkpoints[generation]:
+                os.remove(os.path.join(self.output_dir, name))
@@ -0,0 +1,214 @@
+from game import DIRECTIONS
+from game.trajectory import NO_ACTION, TrajectoryReader
+from genetics.genome import input_layer
+import numpy as np
+import time
+
+
+MIN_INPUT, MAX_INPUT = -7, 8  # The range of log2 tile values minus 7, which the normalized inputs are proportional to.
+
+
+class CompiledNetwork:
+    """A pruned version of a Genome's network that gives exactly the same move orders.
+
+    Units whose sign is the same for every possible board are folded into a bias on the next layer, and units that
+    cannot reach the output are removed. The result can be used anywhere a Genome is only used for inference, such as
+    in `NetworkPlayer(genome=compiled)` for evaluation or in a MoveServer.
+
+    Attributes
+    ----------
+    input_table : ndarray
+        The kept columns of the genome's input lookup table.
+    input_weights : ndarray
+        The kept columns of the genome's input weights.
+    hidden_weights : List[ndarray]
+        The float weights between consecutive kept hidden layers.
+    hidden_biases : List[ndarray]
+        The contributions of the folded constant units to each hidden layer after the first.
+    output_weights : ndarray
+        The float weights from the last kept hidden layer to the outputs.
+    output_bias : ndarray
+        The contribution of the folded constant units to the outputs.
+    report : dict
+        The number of units kept, folded, and removed in each layer, and the number of weights before and after.
+    board_shape : Tuple[int, int]
+        The board shape of the genome.
+    """
+
+    def __init__(self, genome):
+        """Analyzes the genome and builds the pruned network.
+
+        Parameters
+        ----------
+        genome : Genome
+            The genome to compile.
+        """
+        self.board_shape = genome.board_shape
+        input_table, hidden_weights, output_weights = genome._compile()
+        layer_weights = [genome.input_weights] + list(genome.hidden_weights) + [genome.output_weights]
+
+        # Forward pass: find the units with constant signs using exact integer bounds on their pre-activations.
+        w = genome.input_weights
+        bias = np.zeros(w.shape[1], dtype=np.int64)
+        low = np.sum(np.minimum(MIN_INPUT * w, MAX_INPUT * w), axis=0)
+        high = np.sum(np.maximum(MIN_INPUT * w, MAX_INPUT * w), axis=0)
+        constants = []
+        for w in layer_weights[1:]:
+            constant = np.where(low > 0, 1, np.where(high < 0, -1, np.where((low == 0) & (high == 0), 0, np.nan)))
+            constants.append(constant)
+            is_constant = ~np.isnan(constant)
+            bias = np.nan_to_num(constant)[is_constant] @ w[is_constant]
+            spread = np.sum(np.abs(w[~is_constant]), axis=0)
+            low, high = bias - spread, bias + spread
+
+        # Backward pass: find the non-constant units that only feed units which are removed or constant.
+        live = [np.ones(4, dtype=bool)]
+        for w, constant in zip(layer_weights[:0:-1], constants[::-1]):
+            reaches = np.any(w[:, live[0]] != 0, axis=1)
+            live.insert(0, reaches & np.isnan(constant))
+        live = live[:-1]
+
+        self.input_table = np.ascontiguousarray(input_table[:, live[0]])
+        self.input_weights = np.ascontiguousarray(genome.input_weights[:, live[0]])
+        self.hidden_weights = []
+        self.hidden_biases = []
+        float_weights = list(hidden_weights) + [output_weights]
+        for i, w in enumerate(float_weights):
+            kept_out = live[i + 1] if i + 1 < len(live) else np.ones(w.shape[1], dtype=bool)
+            folded = ~np.isnan(constants[i])
+            w_bias = np.nan_to_num(constants[i])[folded] @ w[folded][:, kept_out]
+            w_kept = np.ascontiguousarray(w[live[i]][:, kept_out])
+            if i + 1 < len(live):
+                self.hidden_weights.append(w_kept)
+                self.hidden_biases.append(w_bias)
+            else:
+                self.output_weights = w_kept
+                self.output_bias = w_bias
+
+        units = [w.shape[1] for w in layer_weights[:-1]]
+        num_constant = [int(np.sum(~np.isnan(c))) for c in constants]
+        num_kept = [int(np.sum(k)) for k in live]
+        kept_weights = [self.input_weights] + self.hidden_weights + [self.output_weights]
+        self.report = {
+            'units': units,
+            'units_kept': num_kept,
+            'units_constant': num_constant,
+            'units_dead': [u - k - c for u, k, c in zip(units, num_kept, num_constant)],
+            'weights': int(sum(w.size for w in layer_weights)),
+            'weights_kept': int(sum(w.size for w in kept_weights)),
+        }
+
+    def calculate_move_order(self, board):
+        """Evaluate a single board to get the priority for each move direction.
+
+        Parameters
+        ----------
+        board : ndarray
+            The board state to calculate the move for.
+
+        Returns
+        -------
+        ndarray
+            The four direction actions sorted in the order of the network's evaluation.
+        """
+        h = np.sign(input_layer(board.reshape(-1), self.input_table, self.input_weights))
+        for w, b in zip(self.hidden_weights, self.hidden_biases):
+            h = np.sign(h @ w + b)
+        y = h @ self.output_weights + self.output_bias
+        return np.asarray(DIRECTIONS)[y.argsort()[::-1]]
+
+    def calculate_move_orders(self, boards):
+        """Evaluate many boards at once to get the priority for each move direction.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The board states with shape (n, rows, columns).
+
+        Returns
+        -------
+        ndarray
+            An integer array with shape (n, 4) of indices into DIRECTIONS, sorted in the order of the network's
+            evaluation.
+        """
+        h = np.sign(input_layer(boards.reshape(-1, len(self.input_weights)), self.input_table, self.input_weights))
+        for w, b in zip(self.hidden_weights, self.hidden_biases):
+            h = np.sign(h @ w + b)
+        y = h @ self.output_weights + self.output_bias
+        return y.argsort(axis=1)[:, ::-1]
+
+
+def load_corpus(path, max_positions=None):
+    """Load the boards of a recorded trajectory log, skipping the final board of each game.
+
+    Parameters
+    ----------
+    path : str
+        The path of a log written by TrajectoryWriter.
+    max_positions : Optional[int]
+        The largest number of boards to load.
+
+    Returns
+    -------
+    ndarray
+        The boards with shape (n, rows, columns).
+    """
+    reader = TrajectoryReader(path)
+    positions = reader.positions[:max_positions]
+    return reader.unpack(positions[positions['action'] != NO_ACTION], reader.shape)
+
+
+def verify(genome, compiled, boards):
+    """Count the boards on which a compiled network's move order differs from the original.
+
+    Parameters
+    ----------
+    genome : Genome
+        The original genome.
+    compiled : CompiledNetwork
+        The compiled network.
+    boards : ndarray
+        The boards to compare on, with shape (n, 4, 4).
+
+    Returns
+    -------
+    int
+        The number of boards with a different move order.
+    """
+    return int(np.sum(np.any(genome.calculate_move_orders(boards) != compiled.calculate_move_orders(boards), axis=1)))
+
+
+def benchmark(genome, compiled, boards, single_boards=1000):
+    """Measure how much faster the compiled network is than the original.
+
+    Parameters
+    ----------
+    genome : Genome
+        The original genome.
+    compiled : CompiledNetwork
+        The compiled network.
+    boards : ndarray
+        The boards to time on, with shape (n, 4, 4).
+    single_boards : int
+        The number of boards to time one at a time.
+
+    Returns
+    -------
+    dict
+        The batched and single-board speedups.
+    """
+    def seconds(function, *args):
+        """Time a single call."""
+        start = time.perf_counter()
+        function(*args)
+        return time.perf_counter() - start
+
+    def one_at_a_time(network):
+        """Evaluate the first few boards individually."""
+        for board in boards[:single_boards]:
+            network.calculate_move_order(board)
+
+    return {
+        'batched_speedup': seconds(genome.calculate_move_orders, boards) / seconds(compiled.calculate_move_orders, boards),
+        'single_speedup': seconds(one_at_a_time, genome) / seconds(one_at_a_time, compiled),
+    }
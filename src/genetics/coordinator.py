@@ -0,0 +1,296 @@
+import argparse
+from collections import deque
+from genetics.genome import DEFAULT_ARCHITECTURE, Genome
+from itertools import count
+from multiprocessing.connection import Client, Listener
+import numpy as np
+from players import NetworkPlayer
+import threading
+import time
+
+
+GAMES_PER_JOB = 10
+HEARTBEAT_INTERVAL = 1.0
+HEARTBEAT_TIMEOUT = 5.0
+
+
+class Coordinator:
+    """Serves the games of `Population.play_games` to worker processes over a TCP or Unix socket.
+
+    A job is a packed genome, a number of games, and the first seed of the contiguous range of seeds to play them with.
+    Workers pull jobs, play them, and send back the scores and the log2 of the highest tiles. Workers send heartbeats
+    while they play, and the jobs of any worker that disconnects or goes silent are put back in the queue. Since a job
+    always plays the same seeds, a re-dispatched job gives the same result, and only the first copy of each is kept.
+
+    Attributes
+    ----------
+    address : Union[Tuple[str, int], str]
+        The address workers should connect to.
+    games_per_job : int
+        The maximum number of games in a single job.
+    heartbeat_timeout : float
+        The number of seconds a worker may stay silent before its jobs are re-dispatched.
+    seed : int
+        The first seed of the next job.
+    """
+
+    def __init__(self, address=('localhost', 0), authkey=b'2048', family=None, games_per_job=GAMES_PER_JOB,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, seed=0):
+        """Starts listening for workers in a background thread.
+
+        Parameters
+        ----------
+        address : Union[Tuple[str, int], str]
+            A (host, port) pair for TCP or a path for a Unix socket. Port 0 picks a free port.
+        authkey : bytes
+            The shared secret workers must present.
+        family : Optional[str]
+            The socket family, 'AF_INET' or 'AF_UNIX'. Inferred from the address if None.
+        games_per_job : int
+            The maximum number of games in a single job.
+        heartbeat_timeout : float
+            The number of seconds a worker may stay silent before its jobs are re-dispatched.
+        seed : int
+            The first seed to hand out.
+        """
+        self._listener = Listener(address, family=family, authkey=authkey)
+        self.address = self._listener.address
+        self.games_per_job = games_per_job
+        self.heartbeat_timeout = heartbeat_timeout
+        self.seed = seed
+        self._job_ids = count()
+        self._jobs = {}
+        self._results = {}
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        threading.Thread(target=self._accept_workers, daemon=True).start()
+
+    def play_games(self, networks, games):
+        """Have the workers play games for each network and add the results to the networks' stats.
+
+        Blocks until every game has been played.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks that should play.
+        games : Union[int, Sequence[int]]
+            The number of games each network should play, either for all of them or for each one.
+        """
+        if not np.iterable(games):
+            games = [games] * len(networks)
+        batch = []
+        with self._condition:
+            for n, net_games in zip(networks, games):
+                buffer = n.genome.to_buffer()
+                architecture = tuple(n.genome.architecture)
+                for start in range(0, net_games, self.games_per_job):
+                    num_games = min(self.games_per_job, net_games - start)
+                    job_id = next(self._job_ids)
+                    self._jobs[job_id] = (job_id, buffer, num_games, self.seed, architecture)
+                    self._pending.append(job_id)
+                    self.seed += num_games
+                    batch.append((n, job_id))
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: all(job_id in self._results for _, job_id in batch))
+            for n, job_id in batch:
+                scores, highest_tiles = self._results.pop(job_id)
+                del self._jobs[job_id]
+                n.scores.extend(scores)
+                n.highest_tiles.extend(highest_tiles)
+
+    def close(self):
+        """Stop accepting workers and tell connected workers to exit once they next ask for a job."""
+        self._closed = True
+        self._listener.close()
+
+    def _accept_workers(self):
+        """Accept worker connections until the coordinator is closed, serving each one on its own thread."""
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue  # A failed handshake should not stop the coordinator.
+            threading.Thread(target=self._serve_worker, args=(conn,), daemon=True).start()
+
+    def _serve_worker(self, conn):
+        """Answer a single worker's requests and re-queue its unfinished jobs if it dies.
+
+        Parameters
+        ----------
+        conn : Connection
+            The connection to the worker.
+        """
+        assigned = set()
+        try:
+            while conn.poll(self.heartbeat_timeout):
+                message = conn.recv()
+                if message[0] == 'result':
+                    _, job_id, scores, highest_tiles = message
+                    self._record_result(job_id, scores, highest_tiles)
+                    assigned.discard(job_id)
+                elif message[0] == 'request':
+                    job = self._next_job()
+                    if job is not None:
+                        assigned.add(job[0])
+                        conn.send(('job',) + job)
+                    elif self._closed:
+                        conn.send(('stop',))
+                    else:
+                        conn.send(('wait',))
+                # Heartbeats need no answer. Receiving them is enough to keep polling.
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+            self._requeue(assigned)
+
+    def _next_job(self):
+        """Pop the next job that still needs a result.
+
+        Returns
+        -------
+        Optional[Tuple[int, bytes, int, int, Tuple[int, int, Tuple[int, int]]]]
+            The job id, genome buffer, number of games, first seed, and architecture as a tuple of the hidden layer
+            size, the number of hidden layers, and the board shape, or None if there is nothing to do.
+        """
+        with self._condition:
+            while self._pending:
+                job_id = self._pending.popleft()
+                if job_id in self._jobs and job_id not in self._results:
+                    return self._jobs[job_id]
+        return None
+
+    def _requeue(self, job_ids):
+        """Put jobs back in the queue if they are still missing a result.
+
+        Parameters
+        ----------
+        job_ids : Iterable[int]
+            The jobs held by a worker that died.
+        """
+        with self._condition:
+            for job_id in job_ids:
+                if job_id in self._jobs and job_id not in self._results:
+                    self._pending.appendleft(job_id)
+
+    def _record_result(self, job_id, scores, highest_tiles):
+        """Store the first result received for a job and discard duplicates.
+
+        Parameters
+        ----------
+        job_id : int
+            The job the result belongs to.
+        scores : bytes
+            The packed uint32 scores.
+        highest_tiles : bytes
+            The packed uint8 log2 of the highest tiles.
+
+        Returns
+        -------
+        bool
+            Whether the result was new.
+        """
+        with self._condition:
+            if job_id not in self._jobs or job_id in self._results:
+                return False
+            scores = np.frombuffer(scores, dtype=np.uint32).tolist()
+            highest_tiles = (2 ** np.frombuffer(highest_tiles, dtype=np.uint8).astype(np.int64)).tolist()
+            self._results[job_id] = (scores, highest_tiles)
+            self._condition.notify_all()
+            return True
+
+
+def play_job(buffer, num_games, seed, architecture=DEFAULT_ARCHITECTURE):
+    """Play the games of a single job.
+
+    Parameters
+    ----------
+    buffer : bytes
+        The packed genome of the network.
+    num_games : int
+        The number of games to play.
+    seed : int
+        The seed of the first game. Game i is played with seed + i.
+    architecture : Architecture
+        The architecture of the packed genome.
+
+    Returns
+    -------
+    scores : bytes
+        The packed uint32 scores.
+    highest_tiles : bytes
+        The packed uint8 log2 of the highest tiles.
+    """
+    player = NetworkPlayer(genome=Genome.from_buffer(buffer, architecture))
+    for game_seed in range(seed, seed + num_games):
+        np.random.seed(game_seed)
+        player.play_game(False)
+    scores = np.asarray(player.scores, dtype=np.uint32).tobytes()
+    highest_tiles = np.log2(player.highest_tiles).astype(np.uint8).tobytes()
+    return scores, highest_tiles
+
+
+def run_worker(address, authkey=b'2048', family=None, heartbeat_interval=HEARTBEAT_INTERVAL, poll_interval=0.1):
+    """Connect to a coordinator and play its jobs until told to stop or disconnected.
+
+    Parameters
+    ----------
+    address : Union[Tuple[str, int], str]
+        The coordinator's address.
+    authkey : bytes
+        The coordinator's shared secret.
+    family : Optional[str]
+        The socket family, 'AF_INET' or 'AF_UNIX'. Inferred from the address if None.
+    heartbeat_interval : float
+        The number of seconds between heartbeats.
+    poll_interval : float
+        The number of seconds to wait before asking again when no job is available.
+    """
+    conn = Client(address, family=family, authkey=authkey)
+    lock = threading.Lock()
+    done = threading.Event()
+
+    def send(message):
+        """Send a message, since the heartbeat thread shares the connection."""
+        with lock:
+            conn.send(message)
+
+    def beat():
+        """Send heartbeats until the worker is done."""
+        while not done.wait(heartbeat_interval):
+            try:
+                send(('heartbeat',))
+            except OSError:
+                return
+
+    threading.Thread(target=beat, daemon=True).start()
+    try:
+        while True:
+            send(('request',))
+            message = conn.recv()
+            if message[0] == 'stop':
+                break
+            elif message[0] == 'wait':
+                time.sleep(poll_interval)
+            else:
+                _, job_id, buffer, num_games, seed, *architecture = message  # Older coordinators send no architecture.
+                send(('result', job_id) + play_job(buffer, num_games, seed, *architecture))
+    except (EOFError, OSError):
+        pass
+    finally:
+        done.set()
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run an evaluation worker for a remote coordinator.')
+    parser.add_argument('--host', default='localhost', help='The coordinator host.')
+    parser.add_argument('--port', type=int, help='The coordinator TCP port.')
+    parser.add_argument('--unix', help='The coordinator Unix socket path, used instead of host and port.')
+    parser.add_argument('--authkey', default='2048', help='The coordinator shared secret.')
+    args = parser.parse_args()
+    run_worker(args.unix if args.unix else (args.host, args.port), authkey=args.authkey.encode())
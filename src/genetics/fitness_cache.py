@@ -0,0 +1,266 @@
+from collections import OrderedDict
+from copy import copy
+from genetics.checkpoint import write_atomically
+import hashlib
+import numpy as np
+import pickle
+
+
+MAX_ENTRIES = 10000
+
+
+class CacheEntry:
+    """The game results recorded for a single genome, with streaming statistics on its log-scores.
+
+    Attributes
+    ----------
+    scores : ndarray
+        The score of every game played by networks with this genome.
+    highest_tiles : ndarray
+        The highest tile of every game played by networks with this genome.
+    log_score_sum : float
+        The sum of the log-scores.
+    log_score_sq_sum : float
+        The sum of the squared log-scores.
+    """
+
+    def __init__(self):
+        """Starts with no games."""
+        self.scores = np.zeros(0, dtype=np.int64)
+        self.highest_tiles = np.zeros(0, dtype=np.int64)
+        self.log_score_sum = 0.
+        self.log_score_sq_sum = 0.
+
+    def __len__(self):
+        return len(self.scores)
+
+    def merge(self, scores, highest_tiles):
+        """Append the results of new games.
+
+        Parameters
+        ----------
+        scores : Sequence[int]
+            The new scores.
+        highest_tiles : Sequence[int]
+            The new highest tiles.
+        """
+        log_scores = np.log(scores)
+        self.scores = np.concatenate([self.scores, np.asarray(scores, dtype=np.int64)])
+        self.highest_tiles = np.concatenate([self.highest_tiles, np.asarray(highest_tiles, dtype=np.int64)])
+        self.log_score_sum += np.sum(log_scores)
+        self.log_score_sq_sum += np.sum(log_scores ** 2)
+
+    def get_avg_score(self):
+        """Calculate the geometric mean score from the streaming statistics.
+
+        Returns
+        -------
+        float
+            The geometric mean score.
+        """
+        return np.exp(self.log_score_sum / len(self)) if len(self) else np.nan
+
+    def get_log_score_std(self):
+        """Calculate the standard deviation of the log-scores from the streaming statistics.
+
+        Returns
+        -------
+        float
+            The standard deviation of the log-scores.
+        """
+        if not len(self):
+            return np.nan
+        mean = self.log_score_sum / len(self)
+        return np.sqrt(max(self.log_score_sq_sum / len(self) - mean ** 2, 0))
+
+
+class FitnessCache:
+    """Game results keyed by a hash of the genome weights, so duplicate genomes are never evaluated twice.
+
+    When a network is about to play, any games already recorded for its genome beyond the ones it has played itself
+    are handed to it, and it only plays the remainder. Its new games are then merged back into the entry. Entries are
+    evicted in least-recently-used order.
+
+    Attributes
+    ----------
+    max_entries : int
+        The largest number of genomes kept.
+    hits : int
+        The number of lookups that needed no new games since the last reset.
+    top_ups : int
+        The number of lookups that reused some games but needed more since the last reset.
+    misses : int
+        The number of lookups that reused nothing since the last reset.
+    games_requested : int
+        The number of games asked for since the last reset.
+    games_saved : int
+        The number of those games taken from the cache instead of played.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """Starts with an empty cache.
+
+        Parameters
+        ----------
+        max_entries : int
+            The largest number of genomes kept.
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.reset_counters()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(genome):
+        """Hash a genome's weights.
+
+        Parameters
+        ----------
+        genome : Genome
+            The genome to hash.
+
+        Returns
+        -------
+        bytes
+            The digest of the packed weights.
+        """
+        return hashlib.blake2b(genome.to_buffer(), digest_size=16).digest()
+
+    def get(self, genome):
+        """Get the entry for a genome without counting a lookup.
+
+        Parameters
+        ----------
+        genome : Genome
+            The genome to look up.
+
+        Returns
+        -------
+        Optional[CacheEntry]
+            The genome's entry, if cached.
+        """
+        return self._entries.get(self.key(genome))
+
+    def lookup(self, network, games):
+        """Give a network any cached games for its genome that it has not played, up to the number requested.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network about to play.
+        games : int
+            The number of games it should play.
+
+        Returns
+        -------
+        int
+            The number of games it still needs to play.
+        """
+        self.games_requested += games
+        key = self.key(network.genome)
+        entry = self._entries.get(key)
+        played = network.get_num_games_played()
+        if entry is None or len(entry) <= played:
+            self.misses += 1
+            return games
+        self._entries.move_to_end(key)
+        reused = min(games, len(entry) - played)
+        network.scores.extend(entry.scores[played:played + reused].tolist())
+        network.highest_tiles.extend(entry.highest_tiles[played:played + reused].tolist())
+        self.games_saved += reused
+        if reused == games:
+            self.hits += 1
+        else:
+            self.top_ups += 1
+        return games - reused
+
+    def update(self, network):
+        """Merge any games a network has played beyond its genome's entry into the cache.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network that played.
+        """
+        key = self.key(network.genome)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = CacheEntry()
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._entries.move_to_end(key)
+        if network.get_num_games_played() > len(entry):
+            entry.merge(network.scores[len(entry):], network.highest_tiles[len(entry):])
+
+    def get_hit_rate(self):
+        """Calculate the fraction of requested games served from the cache since the last reset.
+
+        Returns
+        -------
+        float
+            The fraction of games saved, from 0 to 1.
+        """
+        return self.games_saved / self.games_requested if self.games_requested else np.nan
+
+    def reset_counters(self):
+        """Reset the lookup counters, for example at the start of a generation."""
+        self.hits = 0
+        self.top_ups = 0
+        self.misses = 0
+        self.games_requested = 0
+        self.games_saved = 0
+
+    def summary(self):
+        """Summarize the lookups since the last reset.
+
+        Returns
+        -------
+        str
+            A one-line summary.
+        """
+        return (f'{self.hits} hits, {self.top_ups} top-ups, {self.misses} misses, '
+                f'{self.games_saved} of {self.games_requested} games saved ({100 * self.get_hit_rate():.1f}%), '
+                f'{len(self)} genomes cached')
+
+    def snapshot(self):
+        """Copy the cache cheaply, so the copy can be saved while this one keeps changing.
+
+        Merging games into an entry replaces its arrays rather than changing them, so each entry is copied shallowly.
+
+        Returns
+        -------
+        FitnessCache
+            The copy.
+        """
+        cache = copy(self)
+        cache._entries = OrderedDict((key, copy(entry)) for key, entry in self._entries.items())
+        return cache
+
+    def save(self, path):
+        """Save the cache to a file, replacing it only once the whole cache is written.
+
+        Parameters
+        ----------
+        path : str
+            The save path.
+        """
+        write_atomically(self, path)
+
+    @staticmethod
+    def load(path):
+        """Load a cache saved with `save`.
+
+        Parameters
+        ----------
+        path : str
+            The load path.
+
+        Returns
+        -------
+        FitnessCache
+            The loaded cache.
+        """
+        with open(path, 'rb') as f:
+            return pickle.load(f)
@@ -1,14 +1,119 @@
-from game import DIRECTIONS
+from collections import namedtuple
+from game import BOARD_SHAPE, DIRECTIONS
+from game.game import check_board_shape, MAX_BOARD_SIZE
 import numpy as np
+import secrets
+import time
 
 
 HIDDEN_LAYER_SIZE = 128
 NUM_HIDDEN_LAYERS = 2
 assert NUM_HIDDEN_LAYERS > 0
 
-INPUT_WEIGHT_SHAPE = (16, HIDDEN_LAYER_SIZE)
-HIDDEN_WEIGHTS_SHAPE = ((NUM_HIDDEN_LAYERS - 1), HIDDEN_LAYER_SIZE, HIDDEN_LAYER_SIZE)
-OUTPUT_WEIGHT_SHAPE = (HIDDEN_LAYER_SIZE, 4)
+MUTATION_RATE = 0.01
+CROSSOVER_RATE = 0.5
+COST_BOARDS = 256  # The number of boards timed one at a time by `measure_inference_cost`.
+COST_REPEATS = 3
+
+_DIRECTIONS_ARRAY = np.asarray(DIRECTIONS)
+_TABLE_OFFSETS = 16 * np.arange(MAX_BOARD_SIZE ** 2)  # Row offset of each position in the flattened input lookup table.
+
+
+class Architecture(namedtuple('Architecture', ['hidden_layer_size', 'num_hidden_layers', 'board_shape'])):
+    """The layer sizes of a genome's network and its board shape, which every genome it reproduces with must share.
+
+    Attributes
+    ----------
+    hidden_layer_size : int
+        The number of units in each hidden layer.
+    num_hidden_layers : int
+        The number of hidden layers, at least one.
+    board_shape : Tuple[int, int]
+        The number of rows and columns of the board, which has one input per cell. BOARD_SHAPE if not given, as for
+        architectures recorded before boards could change size.
+    """
+    __slots__ = ()
+
+    def __new__(cls, hidden_layer_size, num_hidden_layers, board_shape=BOARD_SHAPE):
+        return super().__new__(cls, int(hidden_layer_size), int(num_hidden_layers), check_board_shape(board_shape))
+
+    @property
+    def num_inputs(self):
+        """int: The number of inputs, one per board cell."""
+        return self.board_shape[0] * self.board_shape[1]
+
+    @property
+    def input_weight_shape(self):
+        """Tuple[int, int]: The shape of the first layer's weights."""
+        return self.num_inputs, self.hidden_layer_size
+
+    @property
+    def hidden_weights_shape(self):
+        """Tuple[int, int, int]: The shape of all the hidden layers' weights."""
+        return self.num_hidden_layers - 1, self.hidden_layer_size, self.hidden_layer_size
+
+    @property
+    def output_weight_shape(self):
+        """Tuple[int, int]: The shape of the final layer's weights."""
+        return self.hidden_layer_size, 4
+
+    @property
+    def num_weights(self):
+        """int: The total number of weights, which is also the length of a genome's buffer."""
+        return int(np.prod(self.input_weight_shape) + np.prod(self.hidden_weights_shape) +
+                   np.prod(self.output_weight_shape))
+
+    @property
+    def row_lengths(self):
+        """ndarray: The length of every weight matrix row, in the order of `Genome.to_buffer`."""
+        return np.repeat([self.hidden_layer_size, self.hidden_layer_size, 4],
+                         [self.num_inputs, (self.num_hidden_layers - 1) * self.hidden_layer_size,
+                          self.hidden_layer_size])
+
+
+DEFAULT_ARCHITECTURE = Architecture(HIDDEN_LAYER_SIZE, NUM_HIDDEN_LAYERS)
+
+
+def input_layer(boards, input_table, input_weights):
+    """Calculate the first layer's pre-activation with a fixed summation order.
+
+    The hidden and output layers only ever add integers, but the normalized inputs are not exactly representable, so
+    the order of summation can flip the sign of pre-activations that should cancel to zero. A plain matmul picks its
+    order based on the batch size, so the inputs are instead summed in blocks of four, which reproduces the
+    single-board matmul the networks were trained with, regardless of the batch size. Boards whose number of cells is
+    not a multiple of four get zero terms to fill the last block, which leave every sum unchanged.
+
+    The term for each input is gathered from the lookup table rather than computed, except for boards with tiles too
+    large for the table.
+
+    Parameters
+    ----------
+    boards : ndarray
+        The log2 tile values with shape (..., cells).
+    input_table : ndarray
+        The lookup table from `Genome._compile`, or a subset of its columns.
+    input_weights : ndarray
+        The first layer's weights, with the same columns as input_table.
+
+    Returns
+    -------
+    ndarray
+        The pre-activation with one column per column of input_weights.
+    """
+    num_inputs = boards.shape[-1]
+    if boards.max() < 16:
+        terms = input_table.take(boards + _TABLE_OFFSETS[:num_inputs], axis=0)
+    else:
+        x = 3 * (boards / 7 - 1)  # Max tile log-value in 2048 is 14. Normalize to [-3, 3].
+        terms = x[..., None] * input_weights
+    if num_inputs % 4:
+        padding = np.zeros(terms.shape[:-2] + (4 - num_inputs % 4, terms.shape[-1]))
+        terms = np.concatenate([terms, padding], axis=-2)
+    blocks = terms[..., 0::4, :] + terms[..., 1::4, :] + terms[..., 2::4, :] + terms[..., 3::4, :]
+    total = blocks[..., 0, :]
+    for i in range(1, blocks.shape[-2]):
+        total = total + blocks[..., i, :]
+    return total
 
 
 class Genome:
@@ -17,14 +122,31 @@ class Genome:
     Attributes
     ----------
     input_weights : ndarray
-        The weights for the first layer with shape INPUT_WEIGHT_SHAPE.
+        The weights for the first layer with the architecture's input_weight_shape.
     hidden_weights : ndarray
-        The weights for all the hidden layers with shape HIDDEN_WEIGHTS_SHAPE.
+        The weights for all the hidden layers with the architecture's hidden_weights_shape.
     output_weights : ndarray
-        The weights for the final layer with shape OUTPUT_WEIGHT_SHAPE.
+        The weights for the final layer with the architecture's output_weight_shape.
+    board_shape : Tuple[int, int]
+        The number of rows and columns of the board the network plays on.
+    genome_id : int
+        A random identifier for tracking ancestry.
+    parent_ids : Optional[Tuple[int, int]]
+        The genome ids of the mom and dad, or None if the genome was not spawned from parents.
+    crossover : Optional[ndarray]
+        For each weight matrix row, in the order of `to_buffer`, whether it was taken from the mom.
+    mutations : Optional[Tuple[ndarray, ndarray]]
+        The indices into the `to_buffer` order of the weights changed by mutation after crossover, and their new values.
+    mutation_rate : float
+        The probability of mutating each weight that the genome was spawned with, or would pass on if its rates are
+        inherited.
+    crossover_rate : float
+        The probability of taking each weight matrix row from the mom that the genome was spawned with, or would pass
+        on if its rates are inherited.
     """
 
-    def __init__(self, mom=None, dad=None):
+    def __init__(self, mom=None, dad=None, architecture=DEFAULT_ARCHITECTURE, mutation_rate=MUTATION_RATE,
+                 crossover_rate=CROSSOVER_RATE):
         """Initializes the genome either through reproduction from parents or random generation.
 
         Parameters
@@ -33,19 +155,50 @@ class Genome:
             The first of the two parent genomes.
         dad : Optional[Genome]
             The second of the two parent genomes.
+        architecture : Architecture
+            The layer sizes and board shape of a randomly generated genome. Children always have their parents'
+            architecture.
+        mutation_rate : float
+            The probability of mutating each weight of a child.
+        crossover_rate : float
+            The probability of taking each weight matrix row of a child from the mom rather than the dad.
+
+        Raises
+        ------
+        ValueError
+            If the parents have different architectures.
         """
+        self.genome_id = secrets.randbits(63)
+        self.parent_ids = self.crossover = self.mutations = None
+        self.mutation_rate = mutation_rate
+        self.crossover_rate = crossover_rate
         if None not in [mom, dad]:
-            self.input_weights, self.hidden_weights, self.output_weights = self._spawn_child_chromosome(mom, dad)
+            if mom.architecture != dad.architecture:
+                raise ValueError(f'Cannot cross a {mom.architecture} genome with a {dad.architecture} genome.')
+            (self.input_weights, self.hidden_weights, self.output_weights, self.crossover,
+             self.mutations) = self._spawn_child_chromosome(mom, dad, mutation_rate, crossover_rate)
+            self.parent_ids = (mom.genome_id, dad.genome_id)
+            self.board_shape = mom.board_shape
         else:
             def generate_binary_weights(shape):
                 """Generate binary {-1, 1} weights of a given shape."""
                 return 2 * np.random.randint(0, 2, shape) - 1
-            self.input_weights = generate_binary_weights(INPUT_WEIGHT_SHAPE)
-            self.hidden_weights = generate_binary_weights(HIDDEN_WEIGHTS_SHAPE)
-            self.output_weights = generate_binary_weights(OUTPUT_WEIGHT_SHAPE)
+            architecture = Architecture(*architecture)
+            if architecture.num_hidden_layers < 1:
+                raise ValueError('A network needs at least one hidden layer.')
+            self.input_weights = generate_binary_weights(architecture.input_weight_shape)
+            self.hidden_weights = generate_binary_weights(architecture.hidden_weights_shape)
+            self.output_weights = generate_binary_weights(architecture.output_weight_shape)
+            self.board_shape = architecture.board_shape
+        self._freeze_weights()
+
+    @property
+    def architecture(self):
+        """Architecture: The layer sizes, as given by the shapes of the weights, and the board shape."""
+        return Architecture(self.input_weights.shape[1], len(self.hidden_weights) + 1, self.board_shape)
 
     @staticmethod
-    def _spawn_child_chromosome(mom, dad):
+    def _spawn_child_chromosome(mom, dad, mutation_rate=MUTATION_RATE, crossover_rate=CROSSOVER_RATE):
         """Spawn mutated weight arrays from two parent Genomes.
 
         Weights are passed down to children one matrix row at a time to preserve some similarity between parents and
@@ -57,34 +210,46 @@ class Genome:
             The first of the two parent genomes.
         dad : Genome
             The second of the two parent genomes.
+        mutation_rate : float
+            The probability of mutating each weight.
+        crossover_rate : float
+            The probability of taking each row from the mom.
 
         Returns
         -------
         input_weights : ndarray
-            The weights for the first layer with shape INPUT_WEIGHT_SHAPE.
+            The weights for the first layer.
         hidden_weights : ndarray
-            The weights for all the hidden layers with shape HIDDEN_WEIGHTS_SHAPE.
+            The weights for all the hidden layers.
         output_weights : ndarray
-            The weights for the final layer with shape OUTPUT_WEIGHT_SHAPE.
+            The weights for the final layer.
+        crossover : ndarray
+            For each row, in the order of `to_buffer`, whether it was taken from the mom.
+        mutations : Tuple[ndarray, ndarray]
+            The indices into the `to_buffer` order of the weights changed by mutation, and their new values.
         """
-        input_weights = np.array([m if np.random.random() > 0.5 else d
-                                  for m, d in zip(mom.input_weights, dad.input_weights)])
+        def cross(m, d):
+            """Take each row from m with probability crossover_rate, or else from d."""
+            from_mom = np.random.random(len(m)) > 1 - crossover_rate
+            return np.where(from_mom[:, None], m, d), from_mom
 
-        hidden_weights = []
-        for m_hid, d_hid in zip(mom.hidden_weights, dad.hidden_weights):
-            hidden_weights.append(np.array([m if np.random.random() > 0.5 else d for m, d in zip(m_hid, d_hid)]))
-        hidden_weights = np.asarray(hidden_weights)
-
-        output_weights = np.array([m if np.random.random() > 0.5 else d
-                                   for m, d in zip(mom.output_weights, dad.output_weights)])
+        input_weights, input_mask = cross(mom.input_weights, dad.input_weights)
+        hidden = [cross(m_hid, d_hid) for m_hid, d_hid in zip(mom.hidden_weights, dad.hidden_weights)]
+        hidden_weights = np.asarray([w for w, _ in hidden]).reshape(mom.hidden_weights.shape)
+        output_weights, output_mask = cross(mom.output_weights, dad.output_weights)
+        crossover = np.concatenate([input_mask] + [mask for _, mask in hidden] + [output_mask])
 
         def mutate(array):
-            """Randomly flip or zero ~1% of the bits."""
-            mutation = np.array([np.random.choice([-1, 0, 1])
-                                 if np.random.random() < 0.01 else i for i in array.reshape(-1)])
+            """Randomly set each weight to -1, 0, or 1 with probability mutation_rate."""
+            mutation = np.array([np.random.choice([-1, 0, 1]) if np.random.random() < mutation_rate else i
+                                 for i in array.reshape(-1)], dtype=array.dtype)
             return mutation.reshape(array.shape)
 
-        return mutate(input_weights), mutate(hidden_weights), mutate(output_weights)
+        crossed = (input_weights, hidden_weights, output_weights)
+        mutated = [mutate(w) for w in crossed]
+        before, after = (np.hstack([w.reshape(-1) for w in weights]) for weights in (crossed, mutated))
+        changed = np.flatnonzero(before != after)
+        return mutated[0], mutated[1], mutated[2], crossover, (changed, after[changed])
 
     def calculate_move_order(self, board):
         """Input board into the network and evaluate it to get the priority for each move direction.
@@ -100,12 +265,89 @@ class Genome:
             The four direction actions sorted in the order of the network's evaluation.
         """
         do_activation = np.sign
-        x = 3 * (board.reshape(16) / 7 - 1)  # Max tile log-value in 2048 is 14. Normalize to [-3, 3].
-        h = do_activation(x @ self.input_weights)
-        for w in self.hidden_weights:
+        input_table, hidden_weights, output_weights = self._compile()
+        h = do_activation(input_layer(board.reshape(-1), input_table, self.input_weights))
+        for w in hidden_weights:
             h = do_activation(h @ w)
-        y = h @ self.output_weights  # No non-linearity needed. We only care about order.
-        return np.asarray(DIRECTIONS)[y.argsort()[::-1]]
+        y = h @ output_weights  # No non-linearity needed. We only care about order.
+        return _DIRECTIONS_ARRAY[y.argsort()[::-1]]
+
+    def calculate_move_orders(self, boards):
+        """Evaluate many boards at once to get the priority for each move direction.
+
+        Gives exactly the same orders as calling `calculate_move_order` on each board.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The board states with shape (n, rows, columns).
+
+        Returns
+        -------
+        ndarray
+            An integer array with shape (n, 4) of indices into DIRECTIONS, sorted in the order of the network's
+            evaluation.
+        """
+        input_table, hidden_weights, output_weights = self._compile()
+        h = np.sign(input_layer(boards.reshape(-1, len(self.input_weights)), input_table, self.input_weights))
+        for w in hidden_weights:
+            h = np.sign(h @ w)
+        y = h @ output_weights
+        return y.argsort(axis=1)[:, ::-1]
+
+    def _compile(self):
+        """Get the weights in the form used for inference, building them again if any weights have been replaced.
+
+        The inputs can only take 16 values, so the first layer's contribution from every input position for every
+        tile value is precomputed into a lookup table, with the same normalization as for a single input. The other
+        weights are converted to floats once rather than on every multiplication. The weights are read-only, so they
+        are only rebuilt when a weight array is replaced.
+
+        Returns
+        -------
+        input_table : ndarray
+            The first layer's contributions with shape (cells * 16, hidden_layer_size), indexed by 16 times the position
+            plus the log2 tile value.
+        hidden_weights : ndarray
+            The hidden weights as floats.
+        output_weights : ndarray
+            The output weights as floats.
+        """
+        weights = (self.input_weights, self.hidden_weights, self.output_weights)
+        compiled_from = self.__dict__.get('_compiled_from', ())
+        if len(compiled_from) != 3 or any(w is not c for w, c in zip(weights, compiled_from)):
+            x = 3 * (np.arange(16) / 7 - 1)
+            input_table = (x[None, :, None] * self.input_weights[:, None, :]).reshape(-1, self.input_weights.shape[1])
+            self._compiled = (input_table, self.hidden_weights.astype(float), self.output_weights.astype(float))
+            self._compiled_from = weights
+        return self._compiled
+
+    def _freeze_weights(self):
+        """Make the weight arrays read-only.
+
+        Changing a weight in place would leave the compiled weights stale, so it fails instead. A network is changed by
+        replacing a weight array, which `_compile` notices.
+        """
+        for weights in (self.input_weights, self.hidden_weights, self.output_weights):
+            weights.setflags(write=False)
+
+    def __getstate__(self):
+        """Pickle the weights without the compiled inference weights, which are rebuilt on demand."""
+        state = self.__dict__.copy()
+        state.pop('_compiled', None)
+        state.pop('_compiled_from', None)
+        return state
+
+    def __setstate__(self, state):
+        """Restore a pickled genome, including ones saved before its ancestry, board shape, or rates were recorded."""
+        state.setdefault('genome_id', secrets.randbits(63))
+        state.setdefault('board_shape', BOARD_SHAPE)
+        state.setdefault('mutation_rate', MUTATION_RATE)
+        state.setdefault('crossover_rate', CROSSOVER_RATE)
+        for name in ('parent_ids', 'crossover', 'mutations'):
+            state.setdefault(name, None)
+        self.__dict__.update(state)
+        self._freeze_weights()
 
     def calculate_similarity(self, genome):
         """Calculate the similarity (percentage of equal weights) between this genome and another.
@@ -118,8 +360,87 @@ class Genome:
         Returns
         -------
         float
-            The percent similarity from 0 to 1.
+            The percent similarity from 0 to 1. Genomes with different architectures have no similarity.
         """
+        if self.architecture != genome.architecture:
+            return 0.
         w1 = np.hstack([w.reshape(-1) for w in (self.input_weights, self.hidden_weights, self.output_weights)])
         w2 = np.hstack([w.reshape(-1) for w in (genome.input_weights, genome.hidden_weights, genome.output_weights)])
         return np.mean(w1 == w2)
+
+    def to_buffer(self):
+        """Pack the weights into a compact byte buffer with one signed byte per weight.
+
+        Returns
+        -------
+        bytes
+            The input, hidden, and output weights flattened and concatenated in that order.
+        """
+        weights = (self.input_weights, self.hidden_weights, self.output_weights)
+        return np.hstack([w.reshape(-1) for w in weights]).astype(np.int8).tobytes()
+
+    @classmethod
+    def from_buffer(cls, buffer, architecture=DEFAULT_ARCHITECTURE):
+        """Rebuild a genome from a buffer created by `to_buffer`.
+
+        Parameters
+        ----------
+        buffer : bytes
+            The packed weights.
+        architecture : Architecture
+            The architecture and board shape of the genome that was packed, which the buffer does not record.
+
+        Returns
+        -------
+        Genome
+            A genome with the unpacked weights.
+        """
+        architecture = Architecture(*architecture)
+        flat = np.frombuffer(buffer, dtype=np.int8).astype(int)
+        if len(flat) != architecture.num_weights:
+            raise ValueError(f'A {architecture} genome has {architecture.num_weights} weights, not {len(flat)}.')
+        genome = cls.__new__(cls)
+        genome.genome_id = secrets.randbits(63)
+        genome.parent_ids = genome.crossover = genome.mutations = None
+        genome.board_shape = architecture.board_shape
+        genome.mutation_rate, genome.crossover_rate = MUTATION_RATE, CROSSOVER_RATE
+        offset = 0
+        for name, shape in (('input_weights', architecture.input_weight_shape),
+                            ('hidden_weights', architecture.hidden_weights_shape),
+                            ('output_weights', architecture.output_weight_shape)):
+            size = int(np.prod(shape))
+            setattr(genome, name, flat[offset:offset + size].reshape(shape))
+            offset += size
+        genome._freeze_weights()
+        return genome
+
+
+def measure_inference_cost(genome, boards=None, repeats=COST_REPEATS):
+    """Measure the time a genome takes to choose a single move, as on a serving path that sees one board at a time.
+
+    Parameters
+    ----------
+    genome : Genome
+        The genome to time.
+    boards : Optional[ndarray]
+        The boards to time on, with shape (n, rows, columns). COST_BOARDS random boards of the genome's board shape from
+        a fixed seed if None.
+    repeats : int
+        The number of times the boards are timed. The fastest is kept, since slower runs only add interference from
+        other processes.
+
+    Returns
+    -------
+    float
+        The seconds per move.
+    """
+    if boards is None:
+        boards = np.random.RandomState(0).randint(0, 12, (COST_BOARDS,) + genome.board_shape)
+    genome.calculate_move_order(boards[0])  # Build the compiled weights outside the timing.
+    best = np.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for board in boards:
+            genome.calculate_move_order(board)
+        best = min(best, time.perf_counter() - start)
+    return best / len(boards)
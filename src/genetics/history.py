@@ -0,0 +1,192 @@
+import json
+from matplotlib.figure import Figure
+import numpy as np
+import os
+
+
+BUCKETS_PER_DECADE = 200  # The resolution of plots along the log-scaled generation axis.
+
+
+class RunHistory:
+    """An append-only store of per-generation statistics, written as one JSON object per line.
+
+    Nothing but running totals and a bounded set of plot points are kept in memory, so the cost of a run's history
+    does not grow with its length. Every record is flushed as soon as it is written, and a line cut short by a crash is
+    dropped when the store is reopened. Plots only read the records appended since the previous plot.
+
+    Attributes
+    ----------
+    path : str
+        The path of the store.
+    generations : int
+        The number of records in the store.
+    best : Optional[dict]
+        The record with the highest best score.
+    last : Optional[dict]
+        The most recent record.
+    total_games : int
+        The number of games played in all recorded generations.
+    total_seconds : float
+        The time spent in all recorded generations.
+    """
+
+    def __init__(self, path):
+        """Opens the store for appending, creating it if needed, and computes the running totals.
+
+        Parameters
+        ----------
+        path : str
+            The path of the store.
+        """
+        self.path = path
+        self._reset()
+        end = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    self._accumulate(json.loads(line))
+                    end += len(line)
+        with open(path, 'ab') as f:
+            f.truncate(end)
+        self._file = open(path, 'a')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return self.generations
+
+    def close(self):
+        """Close the store."""
+        self._file.close()
+
+    def _reset(self):
+        """Clear the running totals and plot points."""
+        self.generations = 0
+        self.best = None
+        self.last = None
+        self.total_games = 0
+        self.total_seconds = 0.
+        self._plot_offset = 0  # The file offset up to which records have been added to `_plot_points`.
+        self._plot_points = {}  # The highest best score in each log-spaced bucket of generations, with its generation.
+
+    def _accumulate(self, record):
+        """Add a record to the running totals.
+
+        Parameters
+        ----------
+        record : dict
+            The record.
+        """
+        self.generations += 1
+        if self.best is None or record['best_score'] > self.best['best_score']:
+            self.best = record
+        self.last = record
+        self.total_games += sum(record.get('games', {}).values())
+        self.total_seconds += sum(record.get('seconds', {}).values())
+
+    def append(self, **record):
+        """Write the statistics of a generation.
+
+        Parameters
+        ----------
+        record
+            The statistics, which must include 'generation' and 'best_score' and may include 'games' and 'seconds' as
+            mappings from stage names to counts and times. Every value must be JSON serializable.
+        """
+        record = {k: v.item() if isinstance(v, np.generic) else v for k, v in record.items()}
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        self._accumulate(record)
+
+    def rewind(self, generation):
+        """Drop the records of a generation and every later one, such as before resuming from an earlier checkpoint.
+
+        Parameters
+        ----------
+        generation : int
+            The first generation to drop.
+        """
+        self._file.close()
+        end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if json.loads(line)['generation'] >= generation:
+                    break
+                end += len(line)
+        with open(self.path, 'ab') as f:
+            f.truncate(end)
+        self._file = open(self.path, 'a')
+        self._reset()
+        for record in self:
+            self._accumulate(record)
+
+    def __iter__(self):
+        """Stream the records from the store without loading them all.
+
+        Yields
+        ------
+        dict
+            Each record, in the order they were written.
+        """
+        self._file.flush()
+        with open(self.path, 'rb') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def summary(self):
+        """Summarize the run from the running totals.
+
+        Returns
+        -------
+        dict
+            The number of generations, the best score with the generation it was recorded in, the latest generation,
+            and the total games and hours.
+        """
+        return {
+            'generations': self.generations,
+            'best_score': None if self.best is None else self.best['best_score'],
+            'best_generation': None if self.best is None else self.best['generation'],
+            'last_generation': None if self.last is None else self.last['generation'],
+            'total_games': self.total_games,
+            'total_hours': self.total_seconds / 3600,
+        }
+
+    def _update_plot_points(self):
+        """Add the records written since the last plot to the bucketed plot points."""
+        self._file.flush()
+        with open(self.path, 'rb') as f:
+            f.seek(self._plot_offset)
+            for line in f:
+                record = json.loads(line)
+                self._plot_offset += len(line)
+                bucket = int(np.floor(BUCKETS_PER_DECADE * np.log10(max(record['generation'], 1))))
+                point = (record['generation'], record['best_score'])
+                if bucket not in self._plot_points or point[1] > self._plot_points[bucket][1]:
+                    self._plot_points[bucket] = point
+
+    def plot(self, path):
+        """Plot the best score of each generation on log-log axes.
+
+        Generations that fall in the same log-spaced bucket are represented by their highest best score, so the number
+        of points grows only with the logarithm of the number of generations.
+
+        Parameters
+        ----------
+        path : str
+            The path of the saved figure.
+        """
+        self._update_plot_points()
+        generations, scores = zip(*sorted(self._plot_points.values())) if self._plot_points else ([], [])
+        fig = Figure()  # Not managed by pyplot, so runs on other threads can plot at the same time.
+        axes = fig.subplots()
+        axes.set_title('Network Improvement vs Generation')
+        axes.set_xlabel('Generation')
+        axes.set_ylabel('Highest Score')
+        axes.loglog(generations, scores)
+        fig.savefig(path)
@@ -0,0 +1,293 @@
+from collections import OrderedDict
+from genetics.genome import Architecture, DEFAULT_ARCHITECTURE, Genome
+import numpy as np
+import os
+import pickle
+
+
+KEYFRAME_INTERVAL = 50
+CACHE_SIZE = 256
+
+
+class LineageArchive:
+    """An append-only archive of every evaluated genome, mostly stored as the difference from its parents.
+
+    A child whose parents are both archived is stored as its parent ids, its crossover row mask packed into bits, and
+    the indices and values of its mutations, which together take well under a kilobyte. Other genomes, and any child
+    that is `keyframe_interval` deltas away from the nearest full genome, are stored in full with their architecture as
+    a keyframe, so that reconstructing a genome never needs more than `keyframe_interval` generations of ancestors.
+    Archiving a genome a second time appends only its updated score statistics.
+
+    The file is a sequence of pickled records. A record cut short by an interrupted run is dropped when the archive is
+    reopened.
+
+    Attributes
+    ----------
+    path : str
+        The path of the archive file.
+    keyframe_interval : int
+        The longest chain of deltas from any genome to a keyframe.
+    """
+
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, cache_size=CACHE_SIZE):
+        """Opens the archive for appending, creating it if needed, and indexes its records.
+
+        Parameters
+        ----------
+        path : str
+            The path of the archive file.
+        keyframe_interval : int
+            The longest chain of deltas from any genome to a keyframe.
+        cache_size : int
+            The number of most recently reconstructed genomes kept in memory.
+        """
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        self._cache_size = cache_size
+        self._cache = OrderedDict()
+        self._records = {}  # The file offset of each genome's weight record.
+        self._depths = {}  # The number of deltas from each genome to its furthest keyframe.
+        self._parents = {}
+        self._architectures = {}
+        self._stats = {}
+        end = 0
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                while True:
+                    try:
+                        record = pickle.load(f)
+                    except (EOFError, pickle.UnpicklingError, ValueError):
+                        break
+                    self._index(record, end)
+                    end = f.tell()
+        with open(path, 'ab') as f:
+            f.truncate(end)
+        self._file = open(path, 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, genome_id):
+        return genome_id in self._records
+
+    def close(self):
+        """Flush and close the archive."""
+        self._file.close()
+
+    def _index(self, record, offset):
+        """Remember where a record is and what it says about its genome.
+
+        Parameters
+        ----------
+        record : dict
+            The record.
+        offset : int
+            The file offset of the record.
+        """
+        genome_id = record['genome_id']
+        if 'stats' in record:
+            self._stats[genome_id] = record['stats']
+        if record['kind'] == 'keyframe':
+            self._records[genome_id] = offset
+            self._depths[genome_id] = 0
+            self._parents[genome_id] = record['parent_ids']
+            self._architectures[genome_id] = Architecture(*record.get('architecture', DEFAULT_ARCHITECTURE))
+        elif record['kind'] == 'delta':
+            self._records[genome_id] = offset
+            self._depths[genome_id] = 1 + max(self._depths[p] for p in record['parent_ids'])
+            self._parents[genome_id] = record['parent_ids']
+            self._architectures[genome_id] = self._architectures[record['parent_ids'][0]]
+
+    def _append(self, record):
+        """Append a record and index it.
+
+        Parameters
+        ----------
+        record : dict
+            The record.
+        """
+        offset = self._file.tell()
+        pickle.dump(record, self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self._file.flush()
+        self._index(record, offset)
+
+    def add(self, network):
+        """Archive a network's genome and score statistics, or just update the statistics if already archived.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network.
+        """
+        genome = network.genome
+        record = {'kind': 'stats', 'genome_id': genome.genome_id, 'stats': self._summarize(network)}
+        if genome.genome_id not in self._records:
+            record['generation'] = network.generation
+            record['parent_ids'] = genome.parent_ids
+            parents = genome.parent_ids
+            if parents is not None and all(p in self._records for p in parents) and \
+                    1 + max(self._depths[p] for p in parents) <= self.keyframe_interval:
+                record['kind'] = 'delta'
+                record['crossover'] = np.packbits(genome.crossover)
+                indices, values = genome.mutations
+                record['mutation_indices'] = indices.astype(np.uint16 if genome.architecture.num_weights <= 2 ** 16
+                                                            else np.uint32)
+                record['mutation_values'] = values.astype(np.int8)
+            else:
+                record['kind'] = 'keyframe'
+                record['weights'] = genome.to_buffer()
+                record['architecture'] = tuple(genome.architecture)
+        self._append(record)
+
+    def add_all(self, networks):
+        """Archive several networks.
+
+        Parameters
+        ----------
+        networks : Iterable[NetworkPlayer]
+            The networks.
+        """
+        for n in networks:
+            self.add(n)
+
+    @staticmethod
+    def _summarize(network):
+        """Summarize a network's games.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network.
+
+        Returns
+        -------
+        dict
+            The generation, number of games, geometric mean score and highest tile, and standard deviation of the
+            log-scores.
+        """
+        return {
+            'generation': network.generation,
+            'games': network.get_num_games_played(),
+            'avg_score': network.get_avg_score(),
+            'avg_highest_tile': network.get_avg_highest_tile(),
+            'log_score_std': np.std(np.log(network.scores)) if network.scores else np.nan,
+        }
+
+    def _get_flat_weights(self, genome_id):
+        """Reconstruct a genome's weights in the order of `to_buffer`, through its ancestors if needed.
+
+        Every ancestor needed is reconstructed once, in order of depth, starting from keyframes or cached genomes.
+
+        Parameters
+        ----------
+        genome_id : int
+            The genome id.
+
+        Returns
+        -------
+        ndarray
+            The int8 weights.
+        """
+        if genome_id in self._cache:
+            self._cache.move_to_end(genome_id)
+            return self._cache[genome_id]
+        records, stack = {}, [genome_id]
+        with open(self.path, 'rb') as f:
+            while stack:
+                g = stack.pop()
+                if g in records or g in self._cache:
+                    continue
+                f.seek(self._records[g])
+                records[g] = pickle.load(f)
+                if records[g]['kind'] == 'delta':
+                    stack.extend(records[g]['parent_ids'])
+        weights = {}
+        for g in sorted(records, key=self._depths.get):
+            record = records[g]
+            if record['kind'] == 'keyframe':
+                weights[g] = np.frombuffer(record['weights'], dtype=np.int8)
+                continue
+            row_lengths = self._architectures[g].row_lengths
+            from_mom = np.unpackbits(record['crossover'], count=len(row_lengths)).astype(bool)
+            mom, dad = (weights[p] if p in weights else self._cache[p] for p in record['parent_ids'])
+            weights[g] = np.where(np.repeat(from_mom, row_lengths), mom, dad)
+            weights[g][record['mutation_indices']] = record['mutation_values']
+        self._cache[genome_id] = weights[genome_id]
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+        return weights[genome_id]
+
+    def get_genome(self, genome_id):
+        """Reconstruct any archived genome.
+
+        Parameters
+        ----------
+        genome_id : int
+            The genome id.
+
+        Returns
+        -------
+        Genome
+            The genome, with its original id and parent ids.
+        """
+        genome = Genome.from_buffer(self._get_flat_weights(genome_id).tobytes(), self._architectures[genome_id])
+        genome.genome_id = genome_id
+        genome.parent_ids = self._parents[genome_id]
+        return genome
+
+    def get_stats(self, genome_id):
+        """Get the most recently archived score statistics of a genome.
+
+        Parameters
+        ----------
+        genome_id : int
+            The genome id.
+
+        Returns
+        -------
+        dict
+            The statistics from the last time the genome was archived.
+        """
+        return self._stats[genome_id]
+
+    def get_parents(self, genome_id):
+        """Get the parent ids of a genome.
+
+        Parameters
+        ----------
+        genome_id : int
+            The genome id.
+
+        Returns
+        -------
+        Optional[Tuple[int, int]]
+            The mom and dad ids, or None if the genome was not spawned from parents.
+        """
+        return self._parents[genome_id]
+
+    def get_ancestors(self, genome_id, generations):
+        """Get every archived ancestor of a genome within some number of generations.
+
+        Parameters
+        ----------
+        genome_id : int
+            The genome id.
+        generations : int
+            The number of generations to go back.
+
+        Returns
+        -------
+        Set[int]
+            The ancestor ids.
+        """
+        ancestors, frontier = set(), {genome_id}
+        for _ in range(generations):
+            frontier = {p for g in frontier if g in self._parents and self._parents[g] for p in self._parents[g]}
+            ancestors |= frontier
+        return ancestors
@@ -1,19 +1,31 @@
+from genetics.checkpoint import CheckpointWriter
+from genetics.history import RunHistory
 from genetics.population import Population
-import matplotlib.pyplot as plt
 import numpy as np
+import os
+import time
 
 
 NETS_PER_POP = 32
 NUM_ELITE = 1
+STAGE_GAMES = (20, 30, 250)
+RANDOMIZE_INTERVAL = 20
 
 
-def run_micro_genetic_alg(num_generations, pop=None):
+def run_micro_genetic_alg(num_generations, pop=None, coordinator=None, fitness_cache=None, prescreener=None,
+                          proxy=None, archive=None, history='run_history.jsonl', architectures=None, cost_weight=None,
+                          nets_per_pop=NETS_PER_POP, num_elite=NUM_ELITE, stage_games=STAGE_GAMES,
+                          randomize_interval=RANDOMIZE_INTERVAL, mutation_rate=None, output_dir='.', verbose=True,
+                          should_stop=None, scheduler=None, adaptive=None, keep_checkpoints=None):
     """Run a micro-genetic algorithm to evolve a good neural network.
 
     Each network plays 20 games and the weakest half are removed from the population. Then 30 more games are played and
     the weakest half are again removed. Finally, for each remaining network whose average score is in range of the
     elite network's lower bound, 250 more games are played. The top networks then go on to populate the next generation.
-    Every 30 generations, all non-elite networks are randomized to improve diversity.
+    Every 20 generations, all non-elite networks are randomized to improve diversity, unless the mutation and crossover
+    rates are adaptive, in which case they are raised whenever the population grows too similar instead. Every 10
+    generations, and at the end, a snapshot of the population is handed to a CheckpointWriter, which saves it in the
+    background while the next generation plays.
 
     Parameters
     ----------
@@ -21,61 +33,198 @@ def run_micro_genetic_alg(num_generations, pop=None):
         The total number of generations to run.
     pop : Optional[Population]
         Starting population. If None, one will be randomly generated.
+    coordinator : Optional[Union[Coordinator, SharedMemoryEvaluator, ThreadEvaluator]]
+        If given, all games are played by the coordinator's workers.
+    fitness_cache : Optional[FitnessCache]
+        If given, games already played by identical genomes are reused. Its hit rate is reported every generation and
+        it is saved next to each checkpoint.
+    prescreener : Optional[Prescreener]
+        If given, children predicted by truncated games to be confidently below the first cull are dropped before
+        playing any full games. The games saved and the calibration error are reported every generation.
+    proxy : Optional[ProxyFilter]
+        If given, children are first ranked against its position corpus and the worst are removed before any games are
+        played, keeping at least as many as survive the first cull.
+    archive : Optional[LineageArchive]
+        If given, every child evaluated in each generation, and the elites, are archived with their score statistics at
+        the end of the generation.
+    history : Union[RunHistory, str]
+        The store, or the path of the store within output_dir, that the statistics of every generation are appended
+        to. Any records of the first generation played or later are dropped first, so a run resumed from a checkpoint
+        continues the same store. `scores_per_generation.png` is redrawn from it after every generation.
+    architectures : Optional[Union[Architecture, List[Architecture]]]
+        The architectures that randomly generated networks are spread across. Taken from the starting population if
+        None, or DEFAULT_ARCHITECTURE if there is none.
+    cost_weight : Optional[float]
+        If nonzero, networks are ranked by their geometric mean score divided by their measured per-move inference cost
+        raised to this power, in every cull, in the elite threshold, and in choosing parents, so cheaper architectures
+        can win with slightly lower scores. Taken from the starting population if None, or zero if there is none.
+    nets_per_pop : int
+        The number of networks in a randomly generated starting population. Taken from the starting population if
+        there is one.
+    num_elite : int
+        The number of elite networks kept between generations. Taken from the starting population if there is one.
+    stage_games : Tuple[int, int, int]
+        The number of games played in each of the three stages.
+    randomize_interval : Optional[int]
+        The number of generations between randomizations of the non-elite networks. Never randomized if None, or if
+        the rates are adaptive.
+    mutation_rate : Optional[float]
+        The probability of mutating each weight of a child. Taken from the starting population if None, or
+        MUTATION_RATE if there is none.
+    output_dir : str
+        The directory that checkpoints, the history, and the plot are written to, which is created if needed.
+    verbose : bool
+        Whether or not to print the progress of every generation.
+    should_stop : Optional[Callable[[RunHistory], bool]]
+        Called with the history after every generation. The run ends early, with a final checkpoint, once it returns
+        True.
+    scheduler : Optional[BudgetScheduler]
+        If given, the three fixed stages are replaced by the scheduler, which allocates games within its wall-clock or
+        move budget to best identify the top quarter of the population, which survives as in the final stage. The
+        fitness cache is not consulted for these games.
+    adaptive : Optional[bool]
+        Whether or not each child inherits and perturbs its parents' mutation and crossover rates, with every rate
+        adjusted by how many children beat their parents and how similar the population is, as in `Population`. The
+        success rate and the mean rates are recorded in the history every generation. Taken from the starting
+        population if None, or False if there is none.
+    keep_checkpoints : Optional[int]
+        The number of most recent checkpoints kept in output_dir, deleting older ones. All are kept if None.
 
     Returns
     -------
-    top_scores : List[float]
-        List of floats. The top average score in each generation.
+    history : RunHistory
+        The store of every generation's statistics.
     best_net : NetworkPlayer
         The trained networks that performs best.
     """
-    top_scores = []
+    log = print if verbose else lambda *args: None
+    os.makedirs(output_dir, exist_ok=True)
+    if isinstance(history, str):
+        history = RunHistory(os.path.join(output_dir, history))
     top_network = None
+    checkpoints = CheckpointWriter(output_dir, keep_checkpoints)
+    checkpointed = None
+    evaluation = {'coordinator': coordinator, 'fitness_cache': fitness_cache, 'progress_bar': verbose}
     for gen in range(num_generations):
-        pop = Population(NETS_PER_POP, NUM_ELITE, pop)
-        if not gen % 20 and gen > 0:
-            print('Randomizing non-elite networks to improve diversity.')
+        pop = Population(nets_per_pop, num_elite, pop, architectures, cost_weight, mutation_rate, adaptive)
+        if not gen:
+            history.rewind(pop.generation)
+        games, seconds = {}, {}
+        if randomize_interval and not gen % randomize_interval and gen > 0 and not pop.adaptive:
+            log('Randomizing non-elite networks to improve diversity.')
             pop.randomize()
 
-        print(f'Playing games for generation {pop.generation} ({gen + 1} of {num_generations})')
-
-        print('Playing first 20 games.')
-        pop.play_games(20, include_elites=False)
-        num_to_filter = NETS_PER_POP // 2 - len(pop.elites)
-        pop.networks = pop.get_sorted_networks(include_elites=False)[:num_to_filter]
-
-        print('Playing next 30 games.')
-        pop.play_games(30, include_elites=False)
-        num_to_filter = NETS_PER_POP // 4 - len(pop.elites)
-        pop.networks = pop.get_sorted_networks(include_elites=False)[:num_to_filter]
-
-        if not pop.elites:
-            print('Playing final 250 games to determine elites.')
-            pop.play_games(250, include_elites=False)
+        log(f'Playing games for generation {pop.generation} ({gen + 1} of {num_generations})')
+
+        children = pop.networks
+        num_to_filter = pop.num_nets // 2 - len(pop.elites)
+        if proxy is not None:
+            pop.networks = proxy.filter(pop.networks, min_keep=num_to_filter)
+            log('Position corpus filter:', proxy.summary())
+        if prescreener is not None:
+            log('Pre-screening with truncated games.')
+            pop.networks = prescreener.screen(pop.networks, num_to_filter, stage_games[0])
+
+        if scheduler is not None:
+            log('Playing games within the generation budget.')
+            games['scheduled'], seconds['scheduled'] = scheduler.run(pop, pop.num_nets // 4, coordinator)
+            if prescreener is not None:
+                prescreener.calibrate(pop.networks, pop.get_sorted_networks(include_elites=False)[:num_to_filter])
+                log('Pre-screening:', prescreener.summary())
+                prescreener.reset_counters()
+            pop.networks = pop.get_sorted_networks(include_elites=False)[:pop.num_nets // 4 - len(pop.elites)]
+            log('Budget scheduler:', scheduler.summary())
         else:
-            elite = pop.elites[0]
-            log_st_err = np.std(np.log(elite.scores)) / np.sqrt(elite.get_num_games_played())
-            thresh = elite.get_avg_score() / np.exp(2 * log_st_err)  # Approximate lower bound of score estimate.
-            print(f'Playing 250 games for networks above {np.rint(thresh)}.')
-            pop.play_games(250, include_elites=False, thresh=thresh)
+            log(f'Playing first {stage_games[0]} games.')
+            games['first'], seconds['first'] = _play_stage(pop, stage_games[0], **evaluation)
+            played = pop.networks
+            pop.networks = pop.get_sorted_networks(include_elites=False)[:num_to_filter]
+            if prescreener is not None:
+                prescreener.calibrate(played, pop.networks)
+                log('Pre-screening:', prescreener.summary())
+                prescreener.reset_counters()
+
+            log(f'Playing next {stage_games[1]} games.')
+            games['second'], seconds['second'] = _play_stage(pop, stage_games[1], **evaluation)
+            num_to_filter = pop.num_nets // 4 - len(pop.elites)
+            pop.networks = pop.get_sorted_networks(include_elites=False)[:num_to_filter]
+
+            if not pop.elites:
+                log(f'Playing final {stage_games[2]} games to determine elites.')
+                games['final'], seconds['final'] = _play_stage(pop, stage_games[2], **evaluation)
+            else:
+                elite = pop.elites[0]
+                log_st_err = np.std(np.log(elite.scores)) / np.sqrt(elite.get_num_games_played())
+                thresh = pop.get_fitness(elite) / np.exp(2 * log_st_err)  # Approximate lower bound of fitness estimate.
+                log(f'Playing {stage_games[2]} games for networks above {np.rint(thresh)}.')
+                games['final'], seconds['final'] = _play_stage(pop, stage_games[2], thresh=thresh, **evaluation)
+
+        if fitness_cache is not None:
+            log('Fitness cache:', fitness_cache.summary())
+            fitness_cache.reset_counters()
+
+        if archive is not None:
+            archive.add_all([n for n in children if n.scores] + pop.elites)
+        pop.record_success(children)
 
         if not pop.generation % 10 and pop.generation != 0:
-            pop.save(f'Generation{pop.generation}.pkl')
+            checkpoints.submit(pop, fitness_cache)
+            checkpointed = pop.generation
+            log('Checkpoints:', checkpoints.summary())
 
         top_network = pop.get_sorted_networks(include_elites=True)[0]
-        top_scores.append(top_network.get_avg_score())
-
-        print('Best network\'s generation =', top_network.generation)
-        print('Best network\'s score =', np.rint(top_scores[-1]))
-        print('Best network\'s highest tile =', np.rint(top_network.get_avg_highest_tile()), '\n')
-
-    plt.figure()
-    plt.title('Network Improvement vs Generation')
-    plt.xlabel('Generation')
-    plt.ylabel('Highest Score')
-    plt.loglog(top_scores)
-    plt.savefig('scores_per_generation.png')
+        costs = {'best_inference_cost': pop.get_inference_cost(top_network)} if pop.cost_weight else {}
+        rates = {}
+        if pop.adaptive:
+            rates['mutation_rate'], rates['crossover_rate'] = pop.get_mean_rates()
+        history.append(generation=pop.generation, best_score=top_network.get_avg_score(),
+                       best_generation=top_network.generation,
+                       best_highest_tile=top_network.get_avg_highest_tile(), similarity=pop.similarity, games=games,
+                       seconds=seconds, best_architecture=list(top_network.genome.architecture),
+                       success_rate=pop.success_rate, **costs, **rates)
+        history.plot(os.path.join(output_dir, 'scores_per_generation.png'))
+
+        log('Best network\'s generation =', top_network.generation)
+        log('Best network\'s architecture =', top_network.genome.architecture)
+        if pop.cost_weight:
+            log(f'Best network\'s inference cost = {1e6 * pop.get_inference_cost(top_network):.1f} us per move')
+        if pop.adaptive:
+            log(f'Children beating their parents = {pop.success_rate}, mean mutation rate = '
+                f'{rates["mutation_rate"]:.4f}, mean crossover rate = {rates["crossover_rate"]:.3f}')
+        log('Best network\'s score =', np.rint(top_network.get_avg_score()))
+        log('Best network\'s highest tile =', np.rint(top_network.get_avg_highest_tile()), '\n')
+
+        if should_stop is not None and should_stop(history):
+            log(f'Stopping early after generation {pop.generation}.')
+            break
+
+    if pop.generation != checkpointed:
+        checkpoints.submit(pop, fitness_cache)
+    checkpoints.close()
+
+    return history, top_network
+
+
+def _play_stage(pop, games, **kwargs):
+    """Play one stage of a generation's games and measure it.
 
-    pop.save(f'Generation{pop.generation}.pkl')
+    Parameters
+    ----------
+    pop : Population
+        The population whose non-elite networks should play.
+    games : int
+        The number of games each network should play.
+    kwargs
+        Passed on to `Population.play_games`.
 
-    return top_scores, top_network
+    Returns
+    -------
+    games_played : int
+        The number of games added to the networks' stats, including any reused from a fitness cache.
+    seconds : float
+        The time taken.
+    """
+    start = time.perf_counter()
+    before = sum(n.get_num_games_played() for n in pop.networks)
+    pop.play_games(games, include_elites=False, **kwargs)
+    return sum(n.get_num_games_played() for n in pop.networks) - before, time.perf_counter() - start
@@ -1,10 +1,20 @@
 from copy import copy
+from genetics.checkpoint import write_atomically
+from genetics.genome import Architecture, CROSSOVER_RATE, DEFAULT_ARCHITECTURE, measure_inference_cost, MUTATION_RATE
 import pickle
 from players import NetworkPlayer
 import numpy as np
 from tqdm import tqdm
 
 
+RATE_LEARNING_RATE = 0.2  # The standard deviation of the log-normal perturbation of each inherited rate.
+TARGET_SUCCESS_RATE = 0.2  # The one-fifth success rule.
+RATE_STEP = 1.5  # The population-level factor by which every child's mutation rate is raised or lowered.
+MAX_SIMILARITY = 0.98  # Above this, mutation rates are raised to restore diversity.
+MUTATION_RATE_BOUNDS = (1e-4, 0.2)
+CROSSOVER_RATE_BOUNDS = (0.5, 0.95)
+
+
 class Population:
     """A collection of networks.
 
@@ -22,9 +32,33 @@ class Population:
         Additional elite networks from a previous generation that may be treated differently.
     similarity : float
         The average similarity (overlapping weights) between all networks in the population.
+    architectures : List[Architecture]
+        The architectures that randomly generated networks are spread evenly across. Children always have the
+        architecture of their parents, and only networks with the same architecture reproduce together. They all have
+        the same board shape.
+    cost_weight : float
+        How strongly networks are penalized for their inference cost when ranked. Each network's fitness is its
+        geometric mean score divided by its per-move inference cost raised to this power, so at zero networks are
+        ranked by score alone, and at one halving the cost is worth as much as doubling the score.
+    inference_costs : Dict[Architecture, float]
+        The measured seconds per move of each architecture seen so far.
+    mutation_rate : float
+        The probability of mutating each weight of a child, or of a child of randomly generated networks if the rates
+        are adaptive.
+    adaptive : bool
+        Whether or not each child inherits its mutation and crossover rates from its parents instead of using the
+        population's. See `_inherit_rates`.
+    rate_factor : float
+        The population-level factor every inherited mutation rate was multiplied by when spawning this generation.
+    parent_fitness : Dict[int, float]
+        The fitness of the fitter parent of each spawned child, by genome id.
+    success_rate : Optional[float]
+        The fraction of this generation's evaluated children that beat their fitter parent, once recorded by
+        `record_success`.
     """
 
-    def __init__(self, num_nets=None, num_elite=None, pop=None):
+    def __init__(self, num_nets=None, num_elite=None, pop=None, architectures=None, cost_weight=None,
+                 mutation_rate=None, adaptive=None):
         """Builds the population by either reproducing from a previous one or randomly generating networks.
 
         Parameters
@@ -36,15 +70,37 @@ class Population:
         pop : Optional[Union[Population, str]]
             The population from which to spawn this population, or a path leading to it. If None, the population will
             be generated randomly. Overwrites the given num_net and num_elite parameters to match it.
+        architectures : Optional[Union[Architecture, List[Architecture]]]
+            The architectures of randomly generated networks. Taken from pop if None, or DEFAULT_ARCHITECTURE if there
+            is no pop.
+        cost_weight : Optional[float]
+            How strongly networks are penalized for their inference cost when ranked. Taken from pop if None, or zero
+            if there is no pop.
+        mutation_rate : Optional[float]
+            The probability of mutating each weight of a child. Taken from pop if None, or MUTATION_RATE if there is no
+            pop.
+        adaptive : Optional[bool]
+            Whether or not the mutation and crossover rates are inherited and adapted. Taken from pop if None, or
+            False if there is no pop.
         """
+        if isinstance(architectures, tuple):
+            architectures = [architectures]
         if pop is None:
             if None in [num_nets, num_elite]:
                 raise ValueError('If pop is none, then both num_nets and num_elite must be given.')
             self.generation = 1
             self.num_nets = num_nets
             self.num_elite = num_elite
+            self.architectures = [DEFAULT_ARCHITECTURE] if architectures is None else architectures
+            self.architectures = [Architecture(*a) for a in self.architectures]
+            self.cost_weight = 0. if cost_weight is None else cost_weight
+            self.mutation_rate = MUTATION_RATE if mutation_rate is None else mutation_rate
+            self.adaptive = bool(adaptive)
+            self.rate_factor = 1.
+            self.parent_fitness = {}
+            self.inference_costs = {}
             self.elites = []
-            self.networks = [NetworkPlayer(gen=1) for _ in range(self.num_nets)]
+            self.networks = self._generate_networks(self.num_nets)
         else:
             if isinstance(pop, str):
                 with open(pop, 'rb') as f:
@@ -52,14 +108,59 @@ class Population:
             self.generation = pop.generation + 1
             self.num_nets = pop.num_nets
             self.num_elite = pop.num_elite
+            self.architectures = pop.architectures if architectures is None else architectures
+            self.architectures = [Architecture(*a) for a in self.architectures]
+            self.cost_weight = pop.cost_weight if cost_weight is None else cost_weight
+            self.mutation_rate = pop.mutation_rate if mutation_rate is None else mutation_rate
+            self.adaptive = pop.adaptive if adaptive is None else adaptive
+            self.rate_factor = self._get_rate_factor(pop) if self.adaptive else 1.
+            self.parent_fitness = {}
+            self.inference_costs = dict(pop.inference_costs)
             prev_networks = pop.get_sorted_networks(include_elites=True)
             self.elites = prev_networks[:self.num_elite]
             self.networks = self._spawn_children(prev_networks)
+        if len({a.board_shape for a in self.architectures}) > 1:
+            raise ValueError('Scores on different boards cannot be ranked together, so the architectures must share '
+                             'a board shape.')
         self.similarity = self._determine_similarity()
+        self.success_rate = None
+
+    def __setstate__(self, state):
+        """Restore a pickled population, including ones saved before architectures were configurable."""
+        architectures = {n.genome.architecture for n in state['networks'] + state['elites']}
+        state.setdefault('architectures', sorted(architectures) or [DEFAULT_ARCHITECTURE])
+        state.setdefault('cost_weight', 0.)
+        state.setdefault('inference_costs', {})
+        state.setdefault('mutation_rate', MUTATION_RATE)
+        state.setdefault('adaptive', False)
+        state.setdefault('rate_factor', 1.)
+        state.setdefault('parent_fitness', {})
+        state.setdefault('success_rate', None)
+        self.__dict__.update(state)
+
+    def _generate_networks(self, num_nets):
+        """Randomly generate networks spread evenly across the population's architectures.
+
+        Parameters
+        ----------
+        num_nets : int
+            The number of networks.
+
+        Returns
+        -------
+        List[NetworkPlayer]
+            The networks.
+        """
+        return [NetworkPlayer(gen=self.generation, architecture=self.architectures[i % len(self.architectures)],
+                              mutation_rate=self.mutation_rate) for i in range(num_nets)]
 
     def _spawn_children(self, parents):
         """Generate a list of child networks from a list of parents.
 
+        The mom is chosen by rank, and the dad by rank among the other parents with the mom's architecture. If there
+        are none, the child is generated randomly with the mom's architecture instead. If the rates are adaptive, the
+        fitter of the two parents is made the mom, so a crossover rate above one half favors the fitter parent.
+
         Parameters
         ----------
         parents : List[NetworkPlayer]
@@ -72,8 +173,112 @@ class Population:
         """
         prob = np.arange(len(parents), 0, -1)
         prob = prob / np.sum(prob)
-        parents = [np.random.choice(parents, 2, replace=False, p=prob) for _ in range(self.num_nets - self.num_elite)]
-        return [NetworkPlayer(gen=self.generation, mom=p[0], dad=p[1]) for p in parents]
+        architectures = [p.genome.architecture for p in parents]
+        children = []
+        fitness = [self.get_fitness(p) for p in parents]
+        for _ in range(self.num_nets - self.num_elite):
+            mom = np.random.choice(len(parents), p=prob)
+            dad_prob = np.where([a == architectures[mom] for a in architectures], prob, 0)
+            dad_prob[mom] = 0
+            if not dad_prob.any():
+                children.append(NetworkPlayer(gen=self.generation, architecture=parents[mom].genome.architecture,
+                                              mutation_rate=self.mutation_rate))
+                continue
+            dad = np.random.choice(len(parents), p=dad_prob / dad_prob.sum())
+            if self.adaptive:
+                mom, dad = min(mom, dad), max(mom, dad)  # The parents are sorted by fitness.
+                mutation_rate, crossover_rate = self._inherit_rates(parents[mom].genome, parents[dad].genome)
+            else:
+                mutation_rate, crossover_rate = self.mutation_rate, CROSSOVER_RATE
+            child = NetworkPlayer(gen=self.generation, mom=parents[mom], dad=parents[dad],
+                                  mutation_rate=mutation_rate, crossover_rate=crossover_rate)
+            self.parent_fitness[child.genome.genome_id] = max(fitness[mom], fitness[dad])
+            children.append(child)
+        return children
+
+    def _get_rate_factor(self, pop):
+        """Decide how to adjust every inherited mutation rate from the outcome of the previous generation.
+
+        If the previous generation was more similar than MAX_SIMILARITY, the rates are raised, which restores diversity
+        gradually instead of randomizing the population. Otherwise, following the one-fifth success rule, they are
+        raised if more than TARGET_SUCCESS_RATE of the previous generation's children beat their fitter parent, since
+        bigger steps are still paying off, and lowered if fewer did.
+
+        Parameters
+        ----------
+        pop : Population
+            The previous generation.
+
+        Returns
+        -------
+        float
+            The factor.
+        """
+        if pop.similarity > MAX_SIMILARITY:
+            return RATE_STEP
+        if pop.success_rate is None:
+            return 1.
+        return RATE_STEP if pop.success_rate > TARGET_SUCCESS_RATE else 1 / RATE_STEP
+
+    def _inherit_rates(self, mom, dad):
+        """Determine a child's mutation and crossover rates from its parents' rates.
+
+        The mutation rate is the geometric mean of the parents' rates, perturbed log-normally and multiplied by
+        `rate_factor`. The crossover rate is the mean of the parents' rates in log-odds, perturbed normally. Children
+        with rates that produce fitter networks are more likely to become parents, so good rates spread with them.
+
+        Parameters
+        ----------
+        mom : Genome
+            The fitter parent.
+        dad : Genome
+            The other parent.
+
+        Returns
+        -------
+        mutation_rate : float
+            The child's mutation rate, within MUTATION_RATE_BOUNDS.
+        crossover_rate : float
+            The child's crossover rate, within CROSSOVER_RATE_BOUNDS.
+        """
+        log_rate = np.mean(np.log([mom.mutation_rate, dad.mutation_rate])) + RATE_LEARNING_RATE * np.random.normal()
+        mutation_rate = np.clip(np.exp(log_rate) * self.rate_factor, *MUTATION_RATE_BOUNDS)
+        log_odds = np.mean(np.log([c / (1 - c) for c in (mom.crossover_rate, dad.crossover_rate)]))
+        log_odds += RATE_LEARNING_RATE * np.random.normal()
+        crossover_rate = np.clip(1 / (1 + np.exp(-log_odds)), *CROSSOVER_RATE_BOUNDS)
+        return float(mutation_rate), float(crossover_rate)
+
+    def record_success(self, children):
+        """Record the fraction of this generation's evaluated children that beat their fitter parent.
+
+        Parameters
+        ----------
+        children : List[NetworkPlayer]
+            The children spawned for this generation, including any culled since.
+
+        Returns
+        -------
+        Optional[float]
+            The success rate, or None if none of the children spawned from parents were evaluated.
+        """
+        outcomes = [self.get_fitness(c) > self.parent_fitness[c.genome.genome_id] for c in children
+                    if c.scores and c.genome.genome_id in self.parent_fitness]
+        self.success_rate = float(np.mean(outcomes)) if outcomes else None
+        return self.success_rate
+
+    def get_mean_rates(self):
+        """Calculate the mean mutation and crossover rates of the networks, including the elites.
+
+        Returns
+        -------
+        mutation_rate : float
+            The geometric mean mutation rate.
+        crossover_rate : float
+            The mean crossover rate.
+        """
+        genomes = [n.genome for n in self.networks + self.elites]
+        return (float(np.exp(np.mean(np.log([g.mutation_rate for g in genomes])))),
+                float(np.mean([g.crossover_rate for g in genomes])))
 
     def _determine_similarity(self):
         """Determine the mean similarity between all pairs of networks in the population.
@@ -92,10 +297,48 @@ class Population:
 
     def randomize(self):
         """Randomize the non-elite networks without changing the total number and recalculate the similarity."""
-        self.networks = [NetworkPlayer() for _ in self.networks]
+        self.networks = self._generate_networks(len(self.networks))
         self.similarity = self._determine_similarity()
 
-    def play_games(self, games, include_elites, progress_bar=True, thresh=0):
+    def get_inference_cost(self, network):
+        """Get the per-move inference cost of a network's architecture, measuring it the first time it is seen.
+
+        Every network with the same architecture does the same work per move, so the cost is measured once per
+        architecture, which keeps timing noise from reordering networks that only differ in their weights.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network.
+
+        Returns
+        -------
+        float
+            The seconds per move.
+        """
+        architecture = network.genome.architecture
+        if architecture not in self.inference_costs:
+            self.inference_costs[architecture] = measure_inference_cost(network.genome)
+        return self.inference_costs[architecture]
+
+    def get_fitness(self, network):
+        """Calculate the value networks are ranked by.
+
+        Parameters
+        ----------
+        network : NetworkPlayer
+            The network.
+
+        Returns
+        -------
+        float
+            The geometric mean score, divided by the per-move inference cost raised to `cost_weight` if it is nonzero.
+        """
+        if not self.cost_weight:
+            return network.get_avg_score()
+        return network.get_avg_score() / self.get_inference_cost(network) ** self.cost_weight
+
+    def play_games(self, games, include_elites, progress_bar=True, thresh=0, coordinator=None, fitness_cache=None):
         """Get each network in the population to play a certain number of games.
 
         Parameters
@@ -107,21 +350,46 @@ class Population:
         progress_bar : bool
             Whether or not to display a tqdm progress bar.
         thresh : float
-            Only networks with an average score above this threshold will play games.
+            Only networks with a fitness above this threshold will play games.
+        coordinator : Optional[Union[Coordinator, SharedMemoryEvaluator, ThreadEvaluator]]
+            If given, the games are played by the coordinator's workers instead of in this process.
+        fitness_cache : Optional[FitnessCache]
+            If given, games already recorded for a network's genome are reused instead of played, and new games are
+            recorded.
         """
         networks = copy(self.networks)
         if include_elites:
             networks += self.elites
-        networks = [n for n in networks if not n.scores or n.get_avg_score() > thresh]
-        if progress_bar:
-            iterator = tqdm(networks)
+        networks = [n for n in networks if not n.scores or self.get_fitness(n) > thresh]
+        counts = [games] * len(networks)
+        duplicates = []
+        if fitness_cache is not None:
+            keys = set()
+            for i, n in enumerate(networks):
+                key = fitness_cache.key(n.genome)
+                if key in keys:
+                    counts[i] = 0  # Wait for the first network with this genome to play.
+                    duplicates.append(n)
+                else:
+                    keys.add(key)
+                    counts[i] = fitness_cache.lookup(n, games)
+        if coordinator is not None:
+            coordinator.play_games(networks, counts)
         else:
-            iterator = networks
-        for n in iterator:
-            n.play_multiple_games(games, progress_bar=False)
+            if progress_bar:
+                iterator = tqdm(list(zip(networks, counts)))
+            else:
+                iterator = zip(networks, counts)
+            for n, count in iterator:
+                n.play_multiple_games(count, progress_bar=False)
+        if fitness_cache is not None:
+            [fitness_cache.update(n) for n in networks]
+            for n in duplicates:
+                n.play_multiple_games(fitness_cache.lookup(n, games), progress_bar=False)
+                fitness_cache.update(n)
 
     def get_sorted_networks(self, include_elites):
-        """Sort the population's networks in descending order by each network's average score.
+        """Sort the population's networks in descending order by each network's fitness.
 
         Parameters
         ----------
@@ -131,21 +399,58 @@ class Population:
         Returns
         -------
         networks : List[NetworkPlayer]
-            The networks sorted by average score.
+            The networks sorted by fitness.
         """
         networks = copy(self.networks)
         if include_elites:
             networks += self.elites
-        networks.sort(key=lambda n: n.get_avg_score(), reverse=True)
+        networks.sort(key=self.get_fitness, reverse=True)
         return networks
 
+    def snapshot(self):
+        """Copy the population cheaply, so the copy can be saved while this one keeps playing and reproducing.
+
+        Genomes are never changed once built, so they are shared, while the networks' game results and the
+        population's collections are copied.
+
+        Returns
+        -------
+        Population
+            The copy.
+        """
+        pop = copy(self)
+        pop.networks = [_snapshot_network(n) for n in self.networks]
+        pop.elites = [_snapshot_network(n) for n in self.elites]
+        pop.architectures = list(self.architectures)
+        pop.inference_costs = dict(self.inference_costs)
+        pop.parent_fitness = dict(self.parent_fitness)
+        return pop
+
     def save(self, path):
-        """Save the population to a file.
+        """Save the population to a file, replacing it only once the whole population is written.
 
         Parameters
         ----------
         path : str
             The save path.
         """
-        with open(path, 'wb') as f:
-            pickle.dump(self, f)
+        write_atomically(self, path)
+
+
+def _snapshot_network(network):
+    """Copy a network with its own game results but the same genome.
+
+    Parameters
+    ----------
+    network : NetworkPlayer
+        The network.
+
+    Returns
+    -------
+    NetworkPlayer
+        The copy.
+    """
+    network = copy(network)
+    network.scores = list(network.scores)
+    network.highest_tiles = list(network.highest_tiles)
+    return network
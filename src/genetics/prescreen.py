@@ -0,0 +1,216 @@
+from collections import deque
+from game.vectorized import GameBatch
+import numpy as np
+
+
+MAX_MOVES = 200
+TRUNCATED_GAMES = 8
+MIN_CALIBRATION = 32
+MAX_CALIBRATION = 2000
+
+
+class Prescreener:
+    """Drops children that are confidently too weak to survive the first cull, using cheap truncated games.
+
+    Every child plays `games` games capped at `max_moves` moves, all in lockstep. The mean log-score of the truncated
+    games is mapped to a predicted full-game log-score by a linear fit over the children of earlier generations, and a
+    child is dropped if its prediction plus `z` residual standard deviations is still below the prediction of the last
+    child that would survive the cull. Until `min_calibration` children have played both kinds of game, nothing is
+    dropped. A random `audit_fraction` of the children that would have been dropped play their full games anyway, which
+    both keeps the calibration honest at the low end and counts how many dropped children would have survived.
+
+    Attributes
+    ----------
+    max_moves : int
+        The number of moves each truncated game is capped at.
+    games : int
+        The number of truncated games each child plays.
+    z : float
+        The number of residual standard deviations a child must be below the culling line to be dropped.
+    min_calibration : int
+        The number of calibration pairs needed before any child is dropped.
+    audit_fraction : float
+        The fraction of would-be-dropped children that play their full games anyway.
+    calibration : deque
+        The (truncated, full) mean log-score pairs of recent children.
+    screened : int
+        The number of children screened since the counters were reset.
+    dropped : int
+        The number of children dropped since the counters were reset.
+    games_saved : int
+        The number of full games not played because of dropped children since the counters were reset.
+    audited : int
+        The number of would-be-dropped children that played anyway since the counters were reset.
+    false_drops : int
+        The number of audited children that survived the cull since the counters were reset.
+    residuals : List[float]
+        The full-game log-score minus the prediction of each child that played since the counters were reset.
+    """
+
+    def __init__(self, max_moves=MAX_MOVES, games=TRUNCATED_GAMES, z=2., min_calibration=MIN_CALIBRATION,
+                 max_calibration=MAX_CALIBRATION, audit_fraction=0.1):
+        """Starts without a calibration.
+
+        Parameters
+        ----------
+        max_moves : int
+            The number of moves each truncated game is capped at.
+        games : int
+            The number of truncated games each child plays.
+        z : float
+            The number of residual standard deviations a child must be below the culling line to be dropped.
+        min_calibration : int
+            The number of calibration pairs needed before any child is dropped.
+        max_calibration : int
+            The number of most recent calibration pairs kept.
+        audit_fraction : float
+            The fraction of would-be-dropped children that play their full games anyway.
+        """
+        self.max_moves = max_moves
+        self.games = games
+        self.z = z
+        self.min_calibration = min_calibration
+        self.audit_fraction = audit_fraction
+        self.calibration = deque(maxlen=max_calibration)
+        self._pending = {}
+        self._audited = set()
+        self.reset_counters()
+
+    def reset_counters(self):
+        """Reset the per-generation statistics without forgetting the calibration."""
+        self.screened = 0
+        self.dropped = 0
+        self.games_saved = 0
+        self.audited = 0
+        self.false_drops = 0
+        self.residuals = []
+
+    def play_truncated_games(self, networks):
+        """Play the capped games of every network in lockstep.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks that should play, which all share a board shape.
+
+        Returns
+        -------
+        ndarray
+            The mean log-score of each network's truncated games.
+        """
+        batch = GameBatch(len(networks) * self.games, shape=networks[0].board_shape)
+        slices = [slice(i * self.games, (i + 1) * self.games) for i in range(len(networks))]
+        for _ in range(self.max_moves):
+            if batch.game_over.all():
+                break
+            legal = batch.get_legal_moves_mask()
+            actions = np.zeros(len(batch), dtype=int)
+            for n, s in zip(networks, slices):
+                running = np.flatnonzero(~batch.game_over[s]) + s.start
+                if not len(running):
+                    continue
+                orders = n.genome.calculate_move_orders(batch.boards[running])
+                first = np.take_along_axis(legal[running], orders, axis=1).argmax(axis=1)
+                actions[running] = orders[np.arange(len(running)), first]
+            batch.move(actions)
+        log_scores = np.log(np.maximum(batch.scores, 1))
+        return np.array([np.mean(log_scores[s]) for s in slices])
+
+    def get_fit(self):
+        """Fit the full-game log-score as a linear function of the truncated log-score.
+
+        Returns
+        -------
+        Optional[Tuple[float, float, float]]
+            The slope, intercept, and residual standard deviation, or None if there are too few calibration pairs.
+        """
+        if len(self.calibration) < max(self.min_calibration, 3):
+            return None
+        truncated, full = np.array(self.calibration).T
+        slope, intercept = np.polyfit(truncated, full, 1)
+        residual_std = np.std(full - (slope * truncated + intercept), ddof=2)
+        return slope, intercept, residual_std
+
+    def screen(self, networks, num_keep, games):
+        """Drop the networks whose predicted score is confidently below the culling line.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The children about to play their first full games.
+        num_keep : int
+            The number of networks that will survive the first cull.
+        games : int
+            The number of full games each network would play before the cull.
+
+        Returns
+        -------
+        List[NetworkPlayer]
+            The networks that should go on to play full games, in their original order.
+        """
+        truncated = self.play_truncated_games(networks)
+        fit = self.get_fit()
+        self.screened += len(networks)
+        if fit is None or len(networks) < num_keep:
+            self._pending.update((n, (t, None)) for n, t in zip(networks, truncated))
+            return list(networks)
+        slope, intercept, residual_std = fit
+        predicted = slope * truncated + intercept
+        line = np.sort(predicted)[::-1][num_keep - 1]
+        confidently_weak = predicted + self.z * residual_std < line
+        audit = confidently_weak & (np.random.random(len(networks)) < self.audit_fraction)
+        kept = []
+        for n, t, p, weak, audited in zip(networks, truncated, predicted, confidently_weak, audit):
+            if weak and not audited:
+                self.dropped += 1
+                self.games_saved += games
+                continue
+            self._pending[n] = (t, p)
+            if audited:
+                self.audited += 1
+                self._audited.add(n)
+            kept.append(n)
+        return kept
+
+    def calibrate(self, networks, survivors):
+        """Add the screened networks' full-game results to the calibration and score the predictions.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks after playing their full games, before the cull.
+        survivors : List[NetworkPlayer]
+            The networks that survived the cull.
+        """
+        survivors = set(survivors)
+        for n in networks:
+            if n not in self._pending:
+                continue
+            truncated, predicted = self._pending[n]
+            full = np.mean(np.log(n.scores))
+            self.calibration.append((truncated, full))
+            if predicted is not None:
+                self.residuals.append(full - predicted)
+            if n in self._audited and n in survivors:
+                self.false_drops += 1
+        self._pending = {}
+        self._audited = set()
+
+    def summary(self):
+        """Summarize the screening since the counters were reset.
+
+        Returns
+        -------
+        dict
+            The number of children screened and dropped, the full games saved, the calibration RMSE on log-scores, and
+            the audit results.
+        """
+        return {
+            'screened': self.screened,
+            'dropped': self.dropped,
+            'games_saved': self.games_saved,
+            'calibration_rmse': np.sqrt(np.mean(np.square(self.residuals))) if self.residuals else np.nan,
+            'calibration_pairs': len(self.calibration),
+            'audited': self.audited,
+            'false_drops': self.false_drops,
+        }
@@ -0,0 +1,231 @@
+from game.game import BOARD_SHAPE, check_board_shape
+from game.trajectory import NO_ACTION, TrajectoryReader
+from game.vectorized import GameBatch, legal_moves_mask, move_boards
+import numpy as np
+import time
+
+
+class PositionCorpus:
+    """A fixed set of positions for ranking networks without playing any games.
+
+    Every position is labelled with the move a strong player chose, and optionally with an estimated value for each of
+    the four moves, such as the mean final score of rollouts after making it.
+
+    Attributes
+    ----------
+    boards : ndarray
+        The log2 tile values with shape (n, rows, cols).
+    moves : ndarray
+        The index in DIRECTIONS of the labelled move of each position.
+    values : Optional[ndarray]
+        The value of each move with shape (n, 4), or NaN where the move is illegal.
+    """
+
+    def __init__(self, boards, moves, values=None):
+        """Wraps labelled positions.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The log2 tile values with shape (n, rows, cols), or flattened 4x4 boards.
+        moves : ndarray
+            The index in DIRECTIONS of the labelled move of each position.
+        values : Optional[ndarray]
+            The value of each move with shape (n, 4), or NaN where the move is illegal.
+        """
+        boards = np.asarray(boards, dtype=int)
+        self.boards = boards if boards.ndim == 3 else boards.reshape((-1,) + BOARD_SHAPE)
+        check_board_shape(self.boards.shape[1:])
+        self.moves = np.asarray(moves, dtype=int)
+        self.values = None if values is None else np.asarray(values, dtype=float)
+        self._legal = legal_moves_mask(self.boards)
+
+    def __len__(self):
+        return len(self.boards)
+
+    @property
+    def board_shape(self):
+        """Tuple[int, int]: The number of rows and columns of the positions."""
+        return self.boards.shape[1:]
+
+    @classmethod
+    def from_trajectories(cls, path, max_positions=None):
+        """Build a corpus from the moves recorded in a trajectory log, such as one of an elite network's games.
+
+        Parameters
+        ----------
+        path : str
+            The path of a log written by TrajectoryWriter.
+        max_positions : Optional[int]
+            The largest number of positions to use.
+
+        Returns
+        -------
+        PositionCorpus
+            The corpus, labelled with the recorded moves and without values.
+        """
+        reader = TrajectoryReader(path)
+        positions = reader.positions[reader.positions['action'] != NO_ACTION][:max_positions]
+        return cls(reader.unpack(positions, reader.shape), positions['action'])
+
+    @classmethod
+    def load(cls, path):
+        """Load a corpus saved by `save`.
+
+        Parameters
+        ----------
+        path : str
+            The path of the saved corpus.
+
+        Returns
+        -------
+        PositionCorpus
+            The corpus.
+        """
+        with np.load(path) as data:
+            return cls(data['boards'], data['moves'], data['values'] if 'values' in data else None)
+
+    def save(self, path):
+        """Save the corpus as an uncompressed npz archive.
+
+        Parameters
+        ----------
+        path : str
+            The save path.
+        """
+        arrays = {'boards': self.boards.astype(np.uint8), 'moves': self.moves.astype(np.uint8)}
+        if self.values is not None:
+            arrays['values'] = self.values
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def add_rollout_values(self, rollouts=8, rng=None):
+        """Estimate the value of every legal move as its points plus the mean score of random rollouts after it.
+
+        Parameters
+        ----------
+        rollouts : int
+            The number of random games played to the end after each move.
+        rng : Optional[Generator]
+            The source of randomness for new tiles and moves.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        self.values = np.full((len(self), 4), np.nan)
+        for d in range(4):
+            new_boards, points, legal = move_boards(self.boards, d)
+            batch = GameBatch(legal.sum() * rollouts, rng, np.repeat(new_boards[legal], rollouts, axis=0),
+                              self.board_shape)
+            batch.add_tiles(np.ones(len(batch), dtype=bool))
+            while not batch.game_over.all():
+                keys = rng.random((len(batch), 4)) * batch.get_legal_moves_mask()
+                batch.move(keys.argmax(axis=1))
+            self.values[legal, d] = points[legal] + batch.scores.reshape(-1, rollouts).mean(axis=1)
+
+    def score(self, genome):
+        """Score a genome against the corpus with a single batched forward pass.
+
+        Parameters
+        ----------
+        genome : Genome
+            The network to score.
+
+        Returns
+        -------
+        dict
+            The fraction of positions where the network's best legal move agrees with the label, and, if the corpus has
+            values, the mean value of the network's moves and the mean regret against the best move's value.
+        """
+        if genome.board_shape != self.board_shape:
+            raise ValueError(f'A network for {genome.board_shape} boards cannot score {self.board_shape} positions.')
+        orders = genome.calculate_move_orders(self.boards)
+        legal = np.take_along_axis(self._legal, orders, axis=1)
+        chosen = orders[np.arange(len(orders)), legal.argmax(axis=1)]
+        result = {'agreement': np.mean(chosen == self.moves)}
+        if self.values is not None:
+            chosen_values = self.values[np.arange(len(self)), chosen]
+            result['expected_value'] = np.nanmean(chosen_values)
+            result['regret'] = np.nanmean(np.nanmax(self.values, axis=1) - chosen_values)
+        return result
+
+
+class ProxyFilter:
+    """Removes the networks that score worst against a position corpus before any games are played.
+
+    The proxy is deterministic, so networks are ranked without any sampling noise, at the cost of only measuring how
+    closely they imitate the corpus.
+
+    Attributes
+    ----------
+    corpus : PositionCorpus
+        The labelled positions.
+    keep_fraction : float
+        The fraction of networks kept.
+    metric : str
+        The result of `PositionCorpus.score` to rank by. Higher is better, except for 'regret'.
+    last_scores : List[float]
+        The metric of every network in the most recent call to `filter`.
+    last_kept : int
+        The number of networks kept by the most recent call to `filter`.
+    last_seconds : float
+        The time taken by the most recent call to `filter`.
+    """
+
+    def __init__(self, corpus, keep_fraction=0.5, metric='agreement'):
+        """Wraps a corpus.
+
+        Parameters
+        ----------
+        corpus : PositionCorpus
+            The labelled positions.
+        keep_fraction : float
+            The fraction of networks kept.
+        metric : str
+            The result of `PositionCorpus.score` to rank by. Higher is better, except for 'regret'.
+        """
+        self.corpus = corpus
+        self.keep_fraction = keep_fraction
+        self.metric = metric
+        self.last_scores = []
+        self.last_kept = 0
+        self.last_seconds = 0.
+
+    def filter(self, networks, min_keep=0):
+        """Keep the networks that score best against the corpus.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks to filter.
+        min_keep : int
+            The smallest number of networks kept, such as the number that will survive the next cull.
+
+        Returns
+        -------
+        List[NetworkPlayer]
+            The kept networks, in their original order.
+        """
+        start = time.perf_counter()
+        self.last_scores = [self.corpus.score(n.genome)[self.metric] for n in networks]
+        sign = 1 if self.metric == 'regret' else -1
+        ranks = np.argsort(sign * np.asarray(self.last_scores), kind='stable')
+        self.last_kept = max(int(np.ceil(self.keep_fraction * len(networks))), min_keep)
+        keep = set(ranks[:self.last_kept].tolist())
+        self.last_seconds = time.perf_counter() - start
+        return [n for i, n in enumerate(networks) if i in keep]
+
+    def summary(self):
+        """Summarize the most recent call to `filter`.
+
+        Returns
+        -------
+        dict
+            The number of networks scored and kept, the best and median metric, and the seconds taken.
+        """
+        scores = np.asarray(self.last_scores)
+        return {
+            'scored': len(scores),
+            'kept': self.last_kept,
+            'best': (scores.min() if self.metric == 'regret' else scores.max()) if len(scores) else np.nan,
+            'median': np.median(scores) if len(scores) else np.nan,
+            'seconds': self.last_seconds,
+        }
@@ -0,0 +1,544 @@
+import argparse
+from bisect import bisect_right
+from collections import deque
+from functools import partial
+from genetics.coordinator import GAMES_PER_JOB, play_job
+from genetics.microgenetic import run_micro_genetic_alg
+from itertools import product
+import json
+from matplotlib.figure import Figure
+from multiprocessing import Pool
+import numpy as np
+import os
+import threading
+
+
+STOP_RATIO = 0.75
+MIN_GENERATIONS = 5
+JOBS_PER_WORKER = 2  # Jobs queued on each worker process, so a worker never idles between jobs.
+
+
+def grid_search(space):
+    """List every combination of values in a search space.
+
+    Parameters
+    ----------
+    space : Dict[str, List]
+        The values to try for each keyword argument of `run_micro_genetic_alg`.
+
+    Returns
+    -------
+    List[dict]
+        The configurations, varying the last argument fastest.
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in product(*(space[name] for name in names))]
+
+
+def random_search(space, num_configs, seed=0):
+    """Sample configurations from a search space.
+
+    Parameters
+    ----------
+    space : Dict[str, Union[List, dict]]
+        For each keyword argument of `run_micro_genetic_alg`, either a list of values to choose from uniformly, or a
+        range given as a dict with 'low' and 'high' and optionally 'log'. A range is sampled as integers if both ends
+        are integers, and log-uniformly if 'log' is true.
+    num_configs : int
+        The number of configurations.
+    seed : int
+        The seed of the sampler, so the same spec gives the same configurations.
+
+    Returns
+    -------
+    List[dict]
+        The configurations.
+    """
+    rng = np.random.RandomState(seed)
+
+    def sample(values):
+        """Draw one value of an argument."""
+        if not isinstance(values, dict):
+            return values[rng.randint(len(values))]
+        low, high = values['low'], values['high']
+        if isinstance(low, int) and isinstance(high, int):
+            return int(rng.randint(low, high + 1))
+        if values.get('log', False):
+            return float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        return float(rng.uniform(low, high))
+
+    return [{name: sample(values) for name, values in space.items()} for _ in range(num_configs)]
+
+
+class FairPool:
+    """A pool of worker processes shared by several runs, which dispatches the queued jobs of each run in turn.
+
+    Each run plays through its own client, which has the same `play_games` as a Coordinator. Jobs are taken from the
+    clients round-robin and only a few are handed to the workers at a time, so a run that queues a large stage cannot
+    hold up the others, and every run with queued jobs gets an equal share of the workers.
+
+    Attributes
+    ----------
+    workers : int
+        The number of worker processes.
+    games_per_job : int
+        The maximum number of games in a single job.
+    max_in_flight : int
+        The largest number of jobs handed to the workers at once.
+    """
+
+    def __init__(self, workers=None, games_per_job=GAMES_PER_JOB):
+        """Starts the workers and the dispatcher.
+
+        Parameters
+        ----------
+        workers : Optional[int]
+            The number of worker processes. One per CPU if None.
+        games_per_job : int
+            The maximum number of games in a single job.
+        """
+        self.workers = os.cpu_count() if workers is None else workers
+        self.games_per_job = games_per_job
+        self.max_in_flight = JOBS_PER_WORKER * self.workers
+        self._pool = Pool(self.workers)
+        self._queues = []  # The queued jobs of each client.
+        self._turn = 0  # The index of the client whose queue is checked first.
+        self._in_flight = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def client(self, seed=0):
+        """Create a client for one run.
+
+        Parameters
+        ----------
+        seed : int
+            The seed of the client's first game.
+
+        Returns
+        -------
+        PoolClient
+            The client.
+        """
+        with self._condition:
+            self._queues.append(deque())
+            return PoolClient(self, len(self._queues) - 1, seed)
+
+    def run_jobs(self, index, jobs):
+        """Queue the jobs of a client and wait for all of them to be played.
+
+        Parameters
+        ----------
+        index : int
+            The client's index.
+        jobs : List[tuple]
+            The arguments of `play_job` for each job.
+
+        Returns
+        -------
+        List[Tuple[bytes, bytes]]
+            The packed scores and log2 highest tiles of each job, in order.
+
+        Raises
+        ------
+        Exception
+            Any exception raised while playing a job.
+        """
+        batch = {'results': [None] * len(jobs), 'remaining': len(jobs), 'error': None}
+        with self._condition:
+            self._queues[index].extend((batch, i, job) for i, job in enumerate(jobs))
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: not batch['remaining'] or batch['error'] is not None)
+        if batch['error'] is not None:
+            raise batch['error']
+        return batch['results']
+
+    def _next_job(self):
+        """Pop the next job in round-robin order over the clients. Must be called with the condition held.
+
+        Returns
+        -------
+        Optional[Tuple[dict, int, tuple]]
+            The job's batch, its position in the batch, and its arguments, or None if no jobs are queued.
+        """
+        for k in range(len(self._queues)):
+            index = (self._turn + k) % len(self._queues)
+            if self._queues[index]:
+                self._turn = index + 1
+                return self._queues[index].popleft()
+        return None
+
+    def _dispatch(self):
+        """Hand jobs to the workers whenever one is queued and fewer than `max_in_flight` are being played."""
+        with self._condition:
+            while True:
+                self._condition.wait_for(lambda: self._closed or (self._in_flight < self.max_in_flight and
+                                                                  any(self._queues)))
+                if self._closed:
+                    return
+                batch, i, job = self._next_job()
+                self._in_flight += 1
+                self._pool.apply_async(play_job, job, callback=partial(self._finish, batch, i),
+                                       error_callback=partial(self._fail, batch))
+
+    def _finish(self, batch, i, result):
+        """Store the result of a job.
+
+        Parameters
+        ----------
+        batch : dict
+            The job's batch.
+        i : int
+            The job's position in the batch.
+        result : Tuple[bytes, bytes]
+            The packed scores and log2 highest tiles.
+        """
+        with self._condition:
+            batch['results'][i] = result
+            batch['remaining'] -= 1
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _fail(self, batch, error):
+        """Pass the exception of a failed job on to the client waiting for it.
+
+        Parameters
+        ----------
+        batch : dict
+            The job's batch.
+        error : Exception
+            The exception.
+        """
+        with self._condition:
+            batch['error'] = error
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def close(self):
+        """Stop the dispatcher and the workers."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._dispatcher.join()
+        self._pool.close()
+        self._pool.join()
+
+
+class PoolClient:
+    """Plays the games of `Population.play_games` for one run on a FairPool.
+
+    Attributes
+    ----------
+    seed : int
+        The seed of the next game.
+    games_played : int
+        The number of games played through the client.
+    """
+
+    def __init__(self, pool, index, seed=0):
+        """Wraps a client's place in a pool. Use `FairPool.client` rather than calling this directly.
+
+        Parameters
+        ----------
+        pool : FairPool
+            The pool.
+        index : int
+            The client's index in the pool.
+        seed : int
+            The seed of the first game.
+        """
+        self._pool = pool
+        self._index = index
+        self.seed = seed
+        self.games_played = 0
+
+    def play_games(self, networks, games):
+        """Have the pool's workers play games for each network and add the results to the networks' stats.
+
+        Blocks until every game has been played.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks that should play.
+        games : Union[int, Sequence[int]]
+            The number of games each network should play, either for all of them or for each one.
+        """
+        if not np.iterable(games):
+            games = [games] * len(networks)
+        owners, jobs = [], []
+        for n, net_games in zip(networks, games):
+            buffer = n.genome.to_buffer()
+            architecture = tuple(n.genome.architecture)
+            for start in range(0, net_games, self._pool.games_per_job):
+                num_games = min(self._pool.games_per_job, net_games - start)
+                owners.append(n)
+                jobs.append((buffer, num_games, self.seed, architecture))
+                self.seed += num_games
+        for n, (scores, highest_tiles) in zip(owners, self._pool.run_jobs(self._index, jobs)):
+            scores = np.frombuffer(scores, dtype=np.uint32).tolist()
+            n.scores.extend(scores)
+            n.highest_tiles.extend((2 ** np.frombuffer(highest_tiles, dtype=np.uint8).astype(np.int64)).tolist())
+            self.games_played += len(scores)
+
+
+class Sweep:
+    """Runs many configurations of `run_micro_genetic_alg` at once, sharing a FairPool, and stops clear losers early.
+
+    Each configuration runs on its own thread and writes its checkpoints, history, and plot to its own directory, along
+    with a `config.json` of its arguments. Every configuration plays the same game seeds, so differences between them
+    are not down to luck of the draw. After each generation, `sweep_summary.json` and `sweep.png` are rewritten in the
+    sweep's directory to compare every configuration's best score so far against the games it has played.
+
+    A configuration is stopped early once it has run `min_generations` generations and its best score is below
+    `stop_ratio` times the best score any other configuration had reached after playing as many games. Comparing at
+    equal games rather than equal generations keeps configurations with larger populations or stages from being
+    favored only for spending more. If there is a `target_score`, a configuration is also stopped as soon as its best
+    score reaches it, and the games it took are reported, which compares configurations by the cost of reaching a
+    given score.
+
+    Attributes
+    ----------
+    configs : List[dict]
+        The keyword arguments of `run_micro_genetic_alg` for each configuration.
+    output_dir : str
+        The sweep's directory.
+    num_generations : int
+        The largest number of generations run for each configuration.
+    stop_ratio : float
+        The fraction of the leading score below which a configuration is stopped. Never stopped if zero.
+    min_generations : int
+        The number of generations run before a configuration can be stopped.
+    target_score : Optional[float]
+        The best score at which a configuration is done.
+    statuses : List[str]
+        Whether each configuration is 'pending', 'running', 'stopped', 'reached' its target, 'finished', or 'failed'.
+    """
+
+    def __init__(self, configs, output_dir='sweep', num_generations=100, stop_ratio=STOP_RATIO,
+                 min_generations=MIN_GENERATIONS, verbose=True, target_score=None):
+        """Sets up the sweep without starting it.
+
+        Parameters
+        ----------
+        configs : List[dict]
+            The keyword arguments of `run_micro_genetic_alg` for each configuration, such as from `grid_search` or
+            `random_search`.
+        output_dir : str
+            The sweep's directory.
+        num_generations : int
+            The largest number of generations run for each configuration.
+        stop_ratio : float
+            The fraction of the leading score below which a configuration is stopped. Never stopped if zero.
+        min_generations : int
+            The number of generations run before a configuration can be stopped.
+        verbose : bool
+            Whether or not to print the summary table after every generation.
+        target_score : Optional[float]
+            If given, configurations stop once their best score reaches it.
+        """
+        self.configs = configs
+        self.output_dir = output_dir
+        self.num_generations = num_generations
+        self.stop_ratio = stop_ratio
+        self.min_generations = min_generations
+        self.target_score = target_score
+        self.statuses = ['pending'] * len(configs)
+        self._verbose = verbose
+        self._curves = [[] for _ in configs]  # The total games and best score so far after each generation.
+        self._errors = [None] * len(configs)
+        self._lock = threading.Lock()
+
+    def get_name(self, index):
+        """Get the name of a configuration, which is also its directory within the sweep's directory.
+
+        Parameters
+        ----------
+        index : int
+            The configuration's index.
+
+        Returns
+        -------
+        str
+            The name.
+        """
+        return f'config{index:03d}'
+
+    def run(self, workers=None, games_per_job=GAMES_PER_JOB):
+        """Run every configuration to completion or until stopped.
+
+        Parameters
+        ----------
+        workers : Optional[int]
+            The number of worker processes shared by all configurations. One per CPU if None.
+        games_per_job : int
+            The maximum number of games in a single job.
+
+        Returns
+        -------
+        List[dict]
+            The final summary, as from `summary`.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        with FairPool(workers, games_per_job) as pool:
+            threads = [threading.Thread(target=self._run_config, args=(i, pool.client()))
+                       for i in range(len(self.configs))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self._report()
+        return self.summary()
+
+    def _run_config(self, index, client):
+        """Run one configuration, recording how it ended.
+
+        Parameters
+        ----------
+        index : int
+            The configuration's index.
+        client : PoolClient
+            The configuration's client of the shared pool.
+        """
+        directory = os.path.join(self.output_dir, self.get_name(index))
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, 'config.json'), 'w') as f:
+            json.dump(self.configs[index], f, indent=2)
+        self.statuses[index] = 'running'
+        try:
+            history, _ = run_micro_genetic_alg(self.num_generations, coordinator=client, output_dir=directory,
+                                               verbose=False, should_stop=partial(self._should_stop, index),
+                                               **self.configs[index])
+            history.close()
+        except Exception as e:
+            self._errors[index] = repr(e)
+            self.statuses[index] = 'failed'
+            return
+        if self.statuses[index] == 'running':
+            self.statuses[index] = 'finished'
+
+    @staticmethod
+    def _best_at(curve, games):
+        """Find the best score a configuration had reached after playing some number of games.
+
+        Parameters
+        ----------
+        curve : List[Tuple[int, float]]
+            The configuration's total games and best score so far after each generation.
+        games : int
+            The number of games.
+
+        Returns
+        -------
+        float
+            The best score, or NaN if it had not finished a generation.
+        """
+        i = bisect_right([g for g, _ in curve], games) - 1
+        return curve[i][1] if i >= 0 else np.nan
+
+    def _should_stop(self, index, history):
+        """Record a configuration's latest generation, report it, and decide whether the configuration is losing.
+
+        Parameters
+        ----------
+        index : int
+            The configuration's index.
+        history : RunHistory
+            The configuration's history.
+
+        Returns
+        -------
+        bool
+            Whether the configuration should stop.
+        """
+        with self._lock:
+            curve = self._curves[index]
+            best = max(history.last['best_score'], curve[-1][1] if curve else 0)
+            curve.append((history.total_games, best))
+            leader = max([self._best_at(c, history.total_games) for j, c in enumerate(self._curves)
+                          if j != index and c and c[-1][0] >= history.total_games], default=np.nan)
+            stop = len(curve) >= self.min_generations and best < self.stop_ratio * leader
+            if stop:
+                self.statuses[index] = 'stopped'
+            elif self.target_score is not None and best >= self.target_score:
+                stop = True
+                self.statuses[index] = 'reached'
+            self._report()
+        return stop
+
+    def summary(self):
+        """Summarize the progress of every configuration.
+
+        Returns
+        -------
+        List[dict]
+            For each configuration, its name, arguments, status, generations run, games played, best score so far, the
+            games it took to reach the target score if it has, and any error, sorted by best score.
+        """
+        rows = [{
+            'name': self.get_name(i),
+            'config': config,
+            'status': self.statuses[i],
+            'generations': len(self._curves[i]),
+            'games': self._curves[i][-1][0] if self._curves[i] else 0,
+            'best_score': self._curves[i][-1][1] if self._curves[i] else None,
+            'games_to_target': next((g for g, best in self._curves[i]
+                                     if self.target_score is not None and best >= self.target_score), None),
+            'error': self._errors[i],
+        } for i, config in enumerate(self.configs)]
+        return sorted(rows, key=lambda row: -np.inf if row['best_score'] is None else row['best_score'], reverse=True)
+
+    def _report(self):
+        """Rewrite the summary file and comparison plot, and print the summary table if verbose."""
+        rows = self.summary()
+        with open(os.path.join(self.output_dir, 'sweep_summary.json'), 'w') as f:
+            json.dump(rows, f, indent=2, default=str)
+        fig = Figure()
+        axes = fig.subplots()
+        axes.set_title('Best Score vs Games Played')
+        axes.set_xlabel('Games Played')
+        axes.set_ylabel('Best Score')
+        for i, curve in enumerate(self._curves):
+            if curve:
+                axes.step(*zip(*curve), where='post', label=self.get_name(i))
+        if any(self._curves):
+            axes.legend(fontsize='small')
+        fig.savefig(os.path.join(self.output_dir, 'sweep.png'))
+        if self._verbose:
+            for row in rows:
+                score = '-' if row['best_score'] is None else f'{row["best_score"]:.0f}'
+                target = '' if self.target_score is None else f'to_target={row["games_to_target"] or "-":<8}  '
+                print(f'{row["name"]}  {row["status"]:<8}  generations={row["generations"]:<5}  '
+                      f'games={row["games"]:<8}  best={score:<6}  {target}{json.dumps(row["config"], default=str)}')
+            print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a hyperparameter sweep of the micro-genetic algorithm.')
+    parser.add_argument('spec', help='A JSON file mapping keyword arguments of run_micro_genetic_alg to the values to '
+                                     'try: lists, or ranges with "low", "high" and optional "log" for random search.')
+    parser.add_argument('--random', type=int, help='Sample this many configurations instead of the full grid.')
+    parser.add_argument('--seed', type=int, default=0, help='The seed of random search.')
+    parser.add_argument('--generations', type=int, default=100, help='The most generations per configuration.')
+    parser.add_argument('--output', default='sweep', help='The sweep directory.')
+    parser.add_argument('--workers', type=int, help='The number of worker processes. One per CPU by default.')
+    parser.add_argument('--stop-ratio', type=float, default=STOP_RATIO,
+                        help='Stop configurations scoring below this fraction of the leader. 0 never stops them.')
+    parser.add_argument('--min-generations', type=int, default=MIN_GENERATIONS,
+                        help='The generations run before a configuration can be stopped.')
+    parser.add_argument('--target', type=float, help='Stop configurations once their best score reaches this, and '
+                                                     'report the games each took.')
+    args = parser.parse_args()
+    with open(args.spec) as f:
+        space = json.load(f)
+    configs = grid_search(space) if args.random is None else random_search(space, args.random, args.seed)
+    Sweep(configs, args.output, args.generations, args.stop_ratio, args.min_generations,
+          target_score=args.target).run(args.workers)
@@ -0,0 +1,185 @@
+import argparse
+from game.vectorized import legal_moves_mask, move_boards
+from genetics.arena import SharedMemoryEvaluator
+from genetics.genome import Genome
+import json
+from multiprocessing.pool import ThreadPool
+import numpy as np
+from players import NetworkPlayer
+import time
+
+
+GAMES_PER_JOB = 50  # Enough games in lockstep for each NumPy call to outweigh the interpreter work around it.
+THREAD_COUNTS = (1, 2, 4)
+
+
+class ThreadEvaluator:
+    """Plays the games of `Population.play_games` on a pool of threads in this process.
+
+    Each job plays a network's games in lockstep as a GameBatch, choosing every running game's move with one batched
+    forward pass, so nearly all of the work is in NumPy calls on whole batches, which release the GIL. Unlike a process
+    pool, the interpreter, the engine's row tables, and the genomes' compiled weights exist once and are shared
+    read-only by every thread: the 4x4 tables are built when the evaluator is created, and the tables of any other
+    board shape and each genome's compiled weights are built before its jobs start.
+
+    Games are played with the batched rules, seeded per job, so the results depend only on the seed and not on the
+    number of threads, but they differ from the games the process backends play with the same seeds.
+
+    Attributes
+    ----------
+    threads : Optional[int]
+        The number of threads. One per CPU if None.
+    games_per_job : int
+        The maximum number of games in a single job.
+    seed : int
+        The seed of the next job.
+    total_moves : int
+        The number of moves made in all games played so far.
+    """
+
+    def __init__(self, threads=None, games_per_job=GAMES_PER_JOB, seed=0):
+        """Builds the shared engine tables and starts the threads.
+
+        Parameters
+        ----------
+        threads : Optional[int]
+            The number of threads. One per CPU if None.
+        games_per_job : int
+            The maximum number of games in a single job.
+        seed : int
+            The seed of the first job.
+        """
+        self.threads = threads
+        self.games_per_job = games_per_job
+        self.seed = seed
+        self.total_moves = 0
+        board = np.zeros((1, 4, 4), dtype=int)
+        move_boards(board, 0)  # Build the row tables once, rather than racing to build them in every thread.
+        legal_moves_mask(board)
+        self._pool = ThreadPool(threads)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Stop the threads."""
+        self._pool.close()
+        self._pool.join()
+
+    @staticmethod
+    def _play_job(job):
+        """Play the games of a single job.
+
+        Parameters
+        ----------
+        job : Tuple[Genome, int, int]
+            The genome, the number of games, and the seed.
+
+        Returns
+        -------
+        scores : List[int]
+            The score of each game.
+        highest_tiles : List[int]
+            The highest tile of each game.
+        num_moves : int
+            The number of moves made in all the games.
+        """
+        genome, num_games, seed = job
+        player = NetworkPlayer(genome=genome)
+        num_moves = player.play_batched_games(num_games, rng=np.random.default_rng(seed))
+        return player.scores, player.highest_tiles, num_moves
+
+    def play_games(self, networks, games):
+        """Have the threads play games for each network and add the results to the networks' stats.
+
+        Parameters
+        ----------
+        networks : List[NetworkPlayer]
+            The networks that should play.
+        games : Union[int, Sequence[int]]
+            The number of games each network should play, either for all of them or for each one.
+        """
+        if not np.iterable(games):
+            games = [games] * len(networks)
+        owners, jobs = [], []
+        for n, net_games in zip(networks, games):
+            if net_games:
+                board = np.zeros((1,) + n.board_shape, dtype=int)
+                legal_moves_mask(board)  # Build the tables of other board shapes rather than racing to in every thread.
+                n.genome.calculate_move_orders(board)  # Compile before sharing the genome.
+            for first in range(0, net_games, self.games_per_job):
+                num_games = min(self.games_per_job, net_games - first)
+                owners.append(n)
+                jobs.append((n.genome, num_games, self.seed))
+                self.seed += num_games
+        for n, (scores, highest_tiles, num_moves) in zip(owners, self._pool.map(self._play_job, jobs, chunksize=1)):
+            n.scores.extend(scores)
+            n.highest_tiles.extend(highest_tiles)
+            self.total_moves += num_moves
+
+
+def measure_scaling(thread_counts=THREAD_COUNTS, num_networks=8, games=GAMES_PER_JOB, processes=True, seed=0):
+    """Measure how the throughput of the thread backend, and optionally the process backend, grows with workers.
+
+    Every run plays the same games for the same random genomes. The efficiency of a run is its throughput divided by
+    the throughput of the first count times the ratio of their counts, so perfect scaling has an efficiency of 1.
+
+    Parameters
+    ----------
+    thread_counts : Sequence[int]
+        The numbers of threads, and of processes, to measure, starting with the baseline.
+    num_networks : int
+        The number of networks.
+    games : int
+        The number of games each network plays in a run.
+    processes : bool
+        Whether or not to also measure SharedMemoryEvaluator with the same numbers of worker processes.
+    seed : int
+        The seed of the genomes.
+
+    Returns
+    -------
+    List[dict]
+        For each backend and count, the games and moves per second and the scaling efficiency.
+    """
+    np.random.seed(seed)
+    genomes = [Genome() for _ in range(num_networks)]
+    backends = [('threads', lambda k: ThreadEvaluator(threads=k))]
+    if processes:
+        backends.append(('processes', lambda k: SharedMemoryEvaluator(workers=k, num_networks=num_networks,
+                                                                      max_games=games)))
+    results = []
+    for backend, make_evaluator in backends:
+        baseline = None
+        for k in thread_counts:
+            networks = [NetworkPlayer(genome=g) for g in genomes]
+            with make_evaluator(k) as evaluator:
+                start = time.perf_counter()
+                evaluator.play_games(networks, games)
+                seconds = time.perf_counter() - start
+                moves = evaluator.total_moves
+            games_per_second = num_networks * games / seconds
+            baseline = (k, games_per_second) if baseline is None else baseline
+            results.append({
+                'backend': backend,
+                'workers': k,
+                'games_per_second': games_per_second,
+                'moves_per_second': moves / seconds,
+                'efficiency': games_per_second / baseline[1] * baseline[0] / k,
+            })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the scaling of the thread and process evaluation backends.')
+    parser.add_argument('--counts', type=int, nargs='+', default=list(THREAD_COUNTS),
+                        help='The numbers of threads and processes to measure, starting with the baseline.')
+    parser.add_argument('--networks', type=int, default=8, help='The number of networks.')
+    parser.add_argument('--games', type=int, default=GAMES_PER_JOB, help='The games played by each network.')
+    parser.add_argument('--threads-only', action='store_true', help='Skip the process backend.')
+    args = parser.parse_args()
+    for row in measure_scaling(args.counts, args.networks, args.games, not args.threads_only):
+        print(json.dumps(row))
@@ -1,5 +1,6 @@
 from players.greedy import GreedyPlayer
 from players.manual import ManualPlayer
 from players.network import NetworkPlayer
+from players.ntuple import NTuplePlayer
 from players.ordered import OrderedPlayer
 from players.random import RandomPlayer
@@ -1,10 +1,14 @@
 from abc import ABC, abstractmethod
-from game import Action, Game
+from game import Action, BOARD_SHAPE, Game
+from game.vectorized import GameBatch
 import matplotlib.pyplot as plt
 import numpy as np
 from tqdm import trange
 
 
+BATCH_SIZE = 10000
+
+
 class Player(ABC):
     """Abstract player class for 2048. Subclasses will implement `choose_move` for specific behaviour.
 
@@ -14,7 +18,10 @@ class Player(ABC):
         The scores for all the games the player has played.
     highest_tiles : List[int]
         The highest tiles for all the games the player has played.
+    board_shape : Tuple[int, int]
+        The number of rows and columns of the boards the player's games are played on.
     """
+    board_shape = BOARD_SHAPE
 
     def __init__(self):
         """Initializes the player with empty scores and highest tiles"""
@@ -68,26 +75,42 @@ class Player(ABC):
         print(f'Average Score = {np.rint(self.get_avg_score()).astype(int)}')
         print(f'Games Played  = {self.get_num_games_played()}')
 
-    def play_game(self, display):
+    def play_game(self, display, recorder=None, renderer=None):
         """Play a game with optional graphics and add the results to the player's stats.
 
         Parameters
         ----------
         display : bool
             Whether or not to display graphics
+        recorder : Optional[TrajectoryWriter]
+            If given, every position of the game is recorded.
+        renderer : Optional[TerminalRenderer]
+            If given, the game is drawn in the terminal at the renderer's frame rate instead of after every move.
         """
-        game = Game()
+        game = Game(self.board_shape)
         if display:
             ax = game.display_board()
         else:
             ax = None
+        if recorder is not None:
+            recorder.start_game(game)
+        if renderer is not None:
+            renderer.start(game)
         while not game.game_over:
             action = self._choose_action(game)
             if action == Action.QUIT:
                 break
             game.move(action)
+            if recorder is not None:
+                recorder.record_move(game, action)
             if ax is not None:
                 game.display_board(ax)
+            if renderer is not None:
+                renderer.update(game)
+        if recorder is not None:
+            recorder.end_game()
+        if renderer is not None:
+            renderer.finish(game)
         if display:
             plt.close()
             print(f'Game Over. Final score was {game.score}. Highest tile was {game.highest_tile}.')
@@ -95,7 +118,7 @@ class Player(ABC):
         self.highest_tiles.append(game.highest_tile)
         return game
 
-    def play_multiple_games(self, num_games, progress_bar=True):
+    def play_multiple_games(self, num_games, progress_bar=True, recorder=None, renderer=None):
         """Play multiple games without graphics, with an optional tqdm progress bar.
 
         Parameters
@@ -104,13 +127,74 @@ class Player(ABC):
             The number of games to play.
         progress_bar : bool
             Whether or not to display a progress bar.
+        recorder : Optional[TrajectoryWriter]
+            If given, every position of every game is recorded.
+        renderer : Optional[TerminalRenderer]
+            If given, every game is drawn in the terminal at the renderer's frame rate.
         """
         if progress_bar:
             iterator = trange(num_games)
         else:
             iterator = range(num_games)
         for _ in iterator:
-            self.play_game(False)
+            self.play_game(False, recorder, renderer)
+
+    def play_batched_games(self, num_games, batch_size=BATCH_SIZE, rng=None):
+        """Play many games in lockstep with array operations and add the results to the player's stats.
+
+        Only players that implement `_choose_actions` can play batched games. The games follow the same rules as
+        `play_game`, but the random numbers are drawn in a different order, so the results differ for the same seed.
+
+        Parameters
+        ----------
+        num_games : int
+            The number of games to play.
+        batch_size : int
+            The largest number of games played at once.
+        rng : Optional[Generator]
+            The source of randomness for new tiles and any random moves. A freshly seeded generator if None.
+
+        Returns
+        -------
+        int
+            The number of moves made in all the games.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        num_moves = 0
+        for start in range(0, num_games, batch_size):
+            batch = GameBatch(min(batch_size, num_games - start), rng, shape=self.board_shape)
+            self._start_batch(batch)
+            while not batch.game_over.all():
+                batch.move(self._choose_actions(batch))
+            self.scores.extend(batch.scores.tolist())
+            self.highest_tiles.extend(batch.highest_tiles.tolist())
+            num_moves += int(batch.num_moves.sum())
+        return num_moves
+
+    def _start_batch(self, batch):
+        """Reset any per-game state before a batch of games starts.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The games about to be played.
+        """
+        pass
+
+    def _choose_actions(self, batch):
+        """Determine the next action in every game of a batch.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The current game states.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each game's action. Actions for finished games are ignored.
+        """
+        raise NotImplementedError(f'{type(self).__name__} cannot play batched games.')
 
     @abstractmethod
     def _choose_action(self, game):
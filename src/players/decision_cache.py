@@ -0,0 +1,125 @@
+from collections import OrderedDict
+from game import DIRECTIONS
+from game.vectorized import pack_boards, unpack_boards
+import numpy as np
+
+
+MAX_ENTRIES = 100000
+
+
+class DecisionCache:
+    """A bounded cache of a network's move orders keyed by the board packed into a 64-bit integer.
+
+    The cache remembers the weight arrays of the genome it was filled by and empties itself as soon as it is asked about
+    a genome with different ones, including the same genome after one of its weight arrays was replaced.
+    Boards with tiles too large to pack, or with too many cells to fit in one integer, bypass the cache. Entries are
+    evicted in least-recently-used order.
+
+    Attributes
+    ----------
+    max_entries : int
+        The largest number of boards kept.
+    hits : int
+        The number of boards answered without a forward pass.
+    misses : int
+        The number of boards that needed a forward pass.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        """Starts with an empty cache.
+
+        Parameters
+        ----------
+        max_entries : int
+            The largest number of boards kept.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._weights = ()  # The weight arrays the entries were calculated with.
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        """Pickle the settings and counters but not the entries, which are cheap to rebuild."""
+        state = self.__dict__.copy()
+        state['_entries'] = OrderedDict()
+        state['_weights'] = ()
+        return state
+
+    def clear(self):
+        """Discard all entries."""
+        self._entries.clear()
+        self._weights = ()
+
+    def get_hit_rate(self):
+        """Calculate the fraction of boards answered without a forward pass.
+
+        Returns
+        -------
+        float
+            The hit rate from 0 to 1.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else np.nan
+
+    def get_move_order(self, genome, board):
+        """Get the network's priority for each move direction on a single board.
+
+        Parameters
+        ----------
+        genome : Genome
+            The network's genome.
+        board : ndarray
+            The board state.
+
+        Returns
+        -------
+        ndarray
+            The four direction actions sorted in the order of the network's evaluation.
+        """
+        return np.asarray(DIRECTIONS)[self.get_move_orders(genome, board[None])[0]]
+
+    def get_move_orders(self, genome, boards):
+        """Get the network's priority for each move direction on many boards, evaluating each distinct board once.
+
+        Parameters
+        ----------
+        genome : Genome
+            The network's genome.
+        boards : ndarray
+            The board states with shape (n, rows, columns).
+
+        Returns
+        -------
+        ndarray
+            An integer array with shape (n, 4) of indices into DIRECTIONS, sorted in the order of the network's
+            evaluation.
+        """
+        if boards.max() > 15 or boards[0].size > 16:
+            return genome.calculate_move_orders(boards)
+        weights = (genome.input_weights, genome.hidden_weights, genome.output_weights)
+        if len(self._weights) != 3 or any(w is not c for w, c in zip(weights, self._weights)):
+            self.clear()
+            self._weights = weights
+        keys, inverse = np.unique(pack_boards(boards), return_inverse=True)
+        orders = np.empty((len(keys), 4), dtype=int)
+        missing = []
+        for i, key in enumerate(keys.tolist()):
+            order = self._entries.get(key)
+            if order is None:
+                missing.append(i)
+            else:
+                self._entries.move_to_end(key)
+                orders[i] = order
+        if missing:
+            orders[missing] = genome.calculate_move_orders(unpack_boards(keys[missing], boards.shape[1:]))
+            for i in missing:
+                self._entries[int(keys[i])] = orders[i].copy()
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self.hits += len(boards) - len(missing)
+        self.misses += len(missing)
+        return orders[inverse.reshape(-1)]
@@ -1,5 +1,7 @@
-from genetics.genome import Genome
+from genetics.genome import CROSSOVER_RATE, DEFAULT_ARCHITECTURE, Genome, MUTATION_RATE
+import numpy as np
 from players.base import Player
+from players.decision_cache import DecisionCache
 
 
 class NetworkPlayer(Player):
@@ -11,9 +13,12 @@ class NetworkPlayer(Player):
         Which generation the network belongs to.
     genome : Genome
         The genome containing the weights for the network, along with rules for reproduction.
+    decision_cache : Optional[DecisionCache]
+        A cache of the move orders the network has already calculated, if enabled.
     """
 
-    def __init__(self, gen=1, mom=None, dad=None, genome=None):
+    def __init__(self, gen=1, mom=None, dad=None, genome=None, decision_cache_size=None,
+                 architecture=DEFAULT_ARCHITECTURE, mutation_rate=MUTATION_RATE, crossover_rate=CROSSOVER_RATE):
         """Builds the network from a genome if given, or two parents, falling back to random generation if neither.
 
         Parameters
@@ -26,15 +31,36 @@ class NetworkPlayer(Player):
             The other net from which the chromosome will be sampled.
         genome : Optional[ndarray]
             The genome containing the network weights.
+        decision_cache_size : Optional[int]
+            If given, move orders for up to this many boards are cached.
+        architecture : Architecture
+            The layer sizes and board shape of a randomly generated network.
+        mutation_rate : float
+            The probability of mutating each weight of a network spawned from parents, which a randomly generated
+            network records to pass on.
+        crossover_rate : float
+            The probability of taking each weight matrix row of a network spawned from parents from the mom, which a
+            randomly generated network records to pass on.
         """
         super().__init__()
         self.generation = gen
         if genome is not None:
             self.genome = genome
         elif None not in [mom, dad]:
-            self.genome = Genome(mom.genome, dad.genome)
+            self.genome = Genome(mom.genome, dad.genome, mutation_rate=mutation_rate, crossover_rate=crossover_rate)
         else:
-            self.genome = Genome()
+            self.genome = Genome(architecture=architecture, mutation_rate=mutation_rate, crossover_rate=crossover_rate)
+        self.decision_cache = None if decision_cache_size is None else DecisionCache(decision_cache_size)
+
+    def __setstate__(self, state):
+        """Restore a pickled network, including ones saved before the decision cache existed."""
+        state.setdefault('decision_cache', None)
+        self.__dict__.update(state)
+
+    @property
+    def board_shape(self):
+        """Tuple[int, int]: The board shape of the genome, which the network's games are played on."""
+        return self.genome.board_shape
 
     def calculate_similarity(self, net):
         """Calculate the similarity between this network's genome and another.
@@ -51,6 +77,24 @@ class NetworkPlayer(Player):
         """
         return self.genome.calculate_similarity(net.genome)
 
+    def calculate_move_orders(self, boards):
+        """Evaluate many boards at once, using the decision cache if enabled.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The board states with shape (n, rows, columns).
+
+        Returns
+        -------
+        ndarray
+            An integer array with shape (n, 4) of indices into DIRECTIONS, sorted in the order of the network's
+            evaluation.
+        """
+        if self.decision_cache is not None:
+            return self.decision_cache.get_move_orders(self.genome, boards)
+        return self.genome.calculate_move_orders(boards)
+
     def _choose_action(self, game):
         """Evaluate the position using the network and choose the best legal move it determines.
 
@@ -65,7 +109,30 @@ class NetworkPlayer(Player):
             The action to take.
         """
         legal_moves = game.get_legal_moves()
-        sorted_moves = self.genome.calculate_move_order(game.board)
+        if self.decision_cache is not None:
+            sorted_moves = self.decision_cache.get_move_order(self.genome, game.board)
+        else:
+            sorted_moves = self.genome.calculate_move_order(game.board)
         for move in sorted_moves:
             if move in legal_moves:
                 return move
+
+    def _choose_actions(self, batch):
+        """Evaluate the running games of a batch with one forward pass and choose each one's best legal move.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The current game states.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each game's action.
+        """
+        actions = np.zeros(len(batch), dtype=int)
+        running = np.flatnonzero(~batch.game_over)
+        orders = self.calculate_move_orders(batch.boards[running])
+        legal = np.take_along_axis(batch.get_legal_moves_mask()[running], orders, axis=1)
+        actions[running] = orders[np.arange(len(running)), legal.argmax(axis=1)]
+        return actions
@@ -0,0 +1,292 @@
+from game import DIRECTIONS, Game
+from game.vectorized import move_boards
+import numpy as np
+from players.base import Player
+from tqdm import trange
+
+
+FOUR_TUPLES = [(0, 1, 2, 3), (4, 5, 6, 7), (0, 1, 4, 5), (1, 2, 5, 6), (5, 6, 9, 10)]  # Lines and squares.
+SIX_TUPLES = [(0, 1, 2, 3, 4, 5), (4, 5, 6, 7, 8, 9), (0, 1, 2, 4, 5, 6), (4, 5, 6, 8, 9, 10)]
+LEARNING_RATE = 0.1
+MAX_CELL = 15  # Cells are indexed by their log2 tile value, so higher tiles share the table entries of 32768.
+
+
+def _symmetries():
+    """List the eight rotations and reflections of the board as permutations of the flat positions.
+
+    Returns
+    -------
+    ndarray
+        An array with shape (8, 16) where row s gives the flat position each position is read from under symmetry s.
+    """
+    grid = np.arange(16).reshape(4, 4)
+    rotations = [np.rot90(grid, k) for k in range(4)]
+    return np.array([g.flatten() for g in rotations + [np.fliplr(r) for r in rotations]])
+
+
+class NTupleNetwork:
+    """A value function of boards that is a sum of table lookups indexed by the tiles at fixed tuples of positions.
+
+    Every tuple is looked up at all eight rotations and reflections of the board, which share the tuple's table, so a
+    pattern learned in one corner is known in every corner. An n-tuple's table has 16 ** n entries.
+
+    Attributes
+    ----------
+    tuples : List[Tuple[int, ...]]
+        The flat board positions of each tuple.
+    weights : ndarray
+        The float32 tables of every tuple, one after another.
+    """
+
+    def __init__(self, tuples=FOUR_TUPLES):
+        """Builds the network with all table entries at zero.
+
+        Parameters
+        ----------
+        tuples : List[Tuple[int, ...]]
+            The flat board positions of each tuple.
+        """
+        self.tuples = [tuple(t) for t in tuples]
+        self.weights = np.zeros(sum(16 ** len(t) for t in self.tuples), dtype=np.float32)
+        self._build_lookups()
+
+    def __getstate__(self):
+        """Pickle the tuples and weights without the lookup positions, which are rebuilt on load."""
+        return {'tuples': self.tuples, 'weights': self.weights}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._build_lookups()
+
+    @property
+    def num_lookups(self):
+        """int: The number of table entries summed for each board."""
+        return len(self._offsets)
+
+    def _build_lookups(self):
+        """Expand every tuple into its eight symmetric copies, padded to the longest tuple.
+
+        Each lookup's index is the dot product of its cells with `_multipliers`, which are powers of 16 for real cells
+        and zero for padding, plus the offset of its tuple's table in `weights`.
+        """
+        length = max(len(t) for t in self.tuples)
+        positions, multipliers, offsets = [], [], []
+        offset = 0
+        for t in self.tuples:
+            powers = 16 ** np.arange(len(t) - 1, -1, -1)
+            for symmetry in _symmetries():
+                positions.append(np.pad(symmetry[list(t)], (0, length - len(t))))
+                multipliers.append(np.pad(powers, (0, length - len(t))))
+                offsets.append(offset)
+            offset += 16 ** len(t)
+        self._positions = np.array(positions)
+        self._multipliers = np.array(multipliers, dtype=np.int64)
+        self._offsets = np.array(offsets, dtype=np.int64)
+
+    def get_indices(self, boards):
+        """Find the table entries of many boards.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The log2 tile values with shape (n, 4, 4).
+
+        Returns
+        -------
+        ndarray
+            The indices into `weights` with shape (n, num_lookups).
+        """
+        cells = np.minimum(np.reshape(boards, (-1, 16)), MAX_CELL).astype(np.int64)
+        return (cells[:, self._positions] * self._multipliers).sum(axis=2) + self._offsets
+
+    def evaluate(self, boards):
+        """Estimate the future points of many boards.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The log2 tile values with shape (n, 4, 4).
+
+        Returns
+        -------
+        ndarray
+            The values with shape (n,).
+        """
+        return self.weights[self.get_indices(boards)].sum(axis=1, dtype=np.float64)
+
+    def evaluate_moves(self, boards):
+        """Value every move from many boards as its points plus the value of the board it leaves before a tile spawns.
+
+        The moves are simulated with `move_boards`, so the boards are not changed and no random numbers are drawn.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The log2 tile values with shape (n, 4, 4).
+
+        Returns
+        -------
+        values : ndarray
+            An array with shape (n, 4) of the value of each direction in DIRECTIONS, or -inf where it is illegal.
+        afterstates : ndarray
+            The boards after each move with shape (n, 4, 4, 4).
+        """
+        boards = np.reshape(boards, (-1, 4, 4))
+        afterstates = np.empty((len(boards), 4, 4, 4), dtype=int)
+        points = np.empty((len(boards), 4))
+        legal = np.empty((len(boards), 4), dtype=bool)
+        for d in range(4):
+            afterstates[:, d], points[:, d], legal[:, d] = move_boards(boards, d)
+        values = points + self.evaluate(afterstates.reshape(-1, 4, 4)).reshape(-1, 4)
+        values[~legal] = -np.inf
+        return values, afterstates
+
+    def update(self, boards, targets, learning_rate=LEARNING_RATE):
+        """Move the values of some boards towards targets.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The log2 tile values with shape (n, 4, 4).
+        targets : ndarray
+            The target value of each board.
+        learning_rate : float
+            The fraction of each error corrected, which is split evenly between a board's table entries.
+
+        Returns
+        -------
+        ndarray
+            The error of each board before the update.
+        """
+        indices = self.get_indices(boards)
+        errors = np.asarray(targets, dtype=np.float64) - self.weights[indices].sum(axis=1, dtype=np.float64)
+        steps = np.repeat(learning_rate * errors / self.num_lookups, self.num_lookups)
+        np.add.at(self.weights, indices.ravel(), steps.astype(np.float32))
+        return errors
+
+
+class NTuplePlayer(Player):
+    """Play 2048 by choosing the move with the most points plus the highest value of the board it leaves.
+
+    Attributes
+    ----------
+    network : NTupleNetwork
+        The value function.
+    """
+
+    def __init__(self, network=None):
+        """Builds the player around a value function.
+
+        Parameters
+        ----------
+        network : Optional[NTupleNetwork]
+            The value function. An untrained network with FOUR_TUPLES if None.
+        """
+        super().__init__()
+        self.network = NTupleNetwork() if network is None else network
+
+    def _choose_action(self, game):
+        """Choose the legal move with the highest value.
+
+        Parameters
+        ----------
+        game : Game
+            The current game state.
+
+        Returns
+        -------
+        Action
+            The action to take.
+        """
+        values, _ = self.network.evaluate_moves(game.board)
+        return DIRECTIONS[int(values[0].argmax())]
+
+    def _choose_actions(self, batch):
+        """Choose the legal move with the highest value in every game of a batch.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The current game states.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each game's action.
+        """
+        actions = np.zeros(len(batch), dtype=int)
+        running = np.flatnonzero(~batch.game_over)
+        values, _ = self.network.evaluate_moves(batch.boards[running])
+        actions[running] = values.argmax(axis=1)
+        return actions
+
+
+class TDTrainer:
+    """Learns the tables of an n-tuple network from self-play with temporal-difference learning of afterstate values.
+
+    After every move, the value of the previous afterstate is moved towards the points and value of the best move from
+    the next position, and the last afterstate of a game is moved towards zero.
+
+    Attributes
+    ----------
+    network : NTupleNetwork
+        The network being trained.
+    learning_rate : float
+        The fraction of each error corrected.
+    scores : List[int]
+        The score of every training game.
+    highest_tiles : List[int]
+        The highest tile of every training game.
+    """
+
+    def __init__(self, network, learning_rate=LEARNING_RATE):
+        """Wraps a network.
+
+        Parameters
+        ----------
+        network : NTupleNetwork
+            The network to train.
+        learning_rate : float
+            The fraction of each error corrected.
+        """
+        self.network = network
+        self.learning_rate = learning_rate
+        self.scores = []
+        self.highest_tiles = []
+
+    def play_game(self):
+        """Play and learn from one game on the Game engine.
+
+        Returns
+        -------
+        Game
+            The finished game.
+        """
+        game = Game()
+        previous = None
+        while not game.game_over:
+            values, afterstates = self.network.evaluate_moves(game.board)
+            d = int(values[0].argmax())
+            if previous is not None:
+                self.network.update(previous, values[0, d:d + 1], self.learning_rate)
+            previous = afterstates[0, d]
+            game.move(DIRECTIONS[d])
+        if previous is not None:
+            self.network.update(previous, [0.], self.learning_rate)
+        self.scores.append(game.score)
+        self.highest_tiles.append(game.highest_tile)
+        return game
+
+    def train(self, num_games, progress_bar=True):
+        """Play and learn from several games.
+
+        Parameters
+        ----------
+        num_games : int
+            The number of games to play.
+        progress_bar : bool
+            Whether or not to display a progress bar.
+        """
+        iterator = trange(num_games) if progress_bar else range(num_games)
+        for _ in iterator:
+            self.play_game()
@@ -1,7 +1,11 @@
-from game import Action
+from game import Action, DIRECTIONS
+import numpy as np
 from players.base import Player
 
 
+DOWN, RIGHT = DIRECTIONS.index(Action.DOWN), DIRECTIONS.index(Action.RIGHT)
+
+
 class OrderedPlayer(Player):
     """Play 2048 by using a simple heuristic to push everything to the bottom-right.
 
@@ -9,12 +13,15 @@ class OrderedPlayer(Player):
     ----------
     previous_action : Action
         The action taken in the previous game position.
+    previous_actions : Optional[ndarray]
+        The index in DIRECTIONS of the action taken in the previous position of each game in the current batch.
     """
 
     def __init__(self):
         """Initialize the player and set the previous action to None."""
         super().__init__()
         self.previous_action = None
+        self.previous_actions = None
 
     def _choose_action(self, game):
         """Alternate moving down and to the right, choosing the first legal move if neither is an option.
@@ -37,3 +44,31 @@ class OrderedPlayer(Player):
         else:
             self.previous_action = legal_moves[0]
         return self.previous_action
+
+    def _start_batch(self, batch):
+        """Forget the previous actions of the last batch.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The games about to be played.
+        """
+        self.previous_actions = np.full(len(batch), -1)
+
+    def _choose_actions(self, batch):
+        """Apply the same heuristic as `_choose_action` to every game of a batch.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The current game states.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each game's action.
+        """
+        legal = batch.get_legal_moves_mask()
+        down = (self.previous_actions != DOWN) & legal[:, DOWN]
+        self.previous_actions = np.where(down, DOWN, np.where(legal[:, RIGHT], RIGHT, legal.argmax(axis=1)))
+        return self.previous_actions
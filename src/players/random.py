@@ -22,3 +22,19 @@ class RandomPlayer(Player):
             The action to take.
         """
         return np.random.choice(game.get_legal_moves())
+
+    def _choose_actions(self, batch):
+        """Choose a random legal move in every game of a batch.
+
+        Parameters
+        ----------
+        batch : GameBatch
+            The current game states.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each game's action.
+        """
+        keys = batch.rng.random((len(batch), 4)) * batch.get_legal_moves_mask()
+        return keys.argmax(axis=1)
@@ -0,0 +1,424 @@
+import argparse
+import asyncio
+from collections import Counter, deque
+from game.vectorized import legal_moves_mask
+import numpy as np
+import pickle
+import time
+
+
+BOARD_BYTES = 16  # One unsigned byte per cell of a 4x4 board holding the log2 tile value, in row-major order.
+NO_MOVE = 255  # Sent back for boards without a legal move.
+REJECTED = 254  # Sent back for boards that cannot be evaluated, such as ones with a log2 tile value above 15.
+MAX_BATCH_SIZE = 256
+MAX_WAIT = 0.002
+
+
+class ServerMetrics:
+    """Running statistics on the batches evaluated by a MoveServer.
+
+    Attributes
+    ----------
+    batch_sizes : Counter
+        The number of batches evaluated for each batch size.
+    queue_latencies : deque
+        The seconds the most recent requests spent waiting between arrival and evaluation.
+    num_requests : int
+        The total number of requests answered.
+    start_time : float
+        The `time.perf_counter` value when the metrics were created.
+    """
+
+    def __init__(self, max_latency_samples=10000):
+        """Starts with no recorded batches.
+
+        Parameters
+        ----------
+        max_latency_samples : int
+            The number of most recent queue latencies kept for percentiles.
+        """
+        self.batch_sizes = Counter()
+        self.queue_latencies = deque(maxlen=max_latency_samples)
+        self.num_requests = 0
+        self.start_time = time.perf_counter()
+
+    def record_batch(self, latencies):
+        """Record an evaluated batch.
+
+        Parameters
+        ----------
+        latencies : List[float]
+            The queue latency of each request in the batch.
+        """
+        self.batch_sizes[len(latencies)] += 1
+        self.queue_latencies.extend(latencies)
+        self.num_requests += len(latencies)
+
+    def summary(self):
+        """Summarize the batch size distribution, queue latency percentiles, and throughput.
+
+        Returns
+        -------
+        dict
+            The summary statistics, with latencies in seconds and throughput in requests per second.
+        """
+        num_batches = sum(self.batch_sizes.values())
+        if self.queue_latencies:
+            p50, p90, p99 = np.percentile(self.queue_latencies, [50, 90, 99])
+        else:
+            p50 = p90 = p99 = np.nan
+        return {
+            'num_requests': self.num_requests,
+            'num_batches': num_batches,
+            'mean_batch_size': self.num_requests / num_batches if num_batches else np.nan,
+            'batch_size_distribution': dict(sorted(self.batch_sizes.items())),
+            'queue_latency_p50': p50,
+            'queue_latency_p90': p90,
+            'queue_latency_p99': p99,
+            'throughput': self.num_requests / (time.perf_counter() - self.start_time),
+        }
+
+
+class MoveServer:
+    """Serves a network's moves to many concurrent clients over a socket.
+
+    Each request is a single board of one byte per cell of the genome's board shape, BOARD_BYTES for a 4x4 board, and
+    each response is a single byte holding the index in DIRECTIONS of the best legal move, NO_MOVE, or REJECTED for a
+    board that cannot be evaluated. Such boards are rejected on arrival, so they never fail the batch of other clients'
+    boards they would have joined. Requests waiting at the same time are evaluated together in a micro-batch of at
+    most `max_batch_size` boards, and no request waits for more than `max_wait` seconds for others to join its batch.
+    Clients may pipeline requests, and responses come back in the same order.
+
+    Attributes
+    ----------
+    genome : Genome
+        The network weights.
+    max_batch_size : int
+        The largest number of boards evaluated together.
+    max_wait : float
+        The longest time in seconds a request waits for a batch to fill.
+    metrics : ServerMetrics
+        Statistics on the evaluated batches.
+    decision_cache : Optional[DecisionCache]
+        If given, repeated boards are answered from the cache and each distinct board in a batch is evaluated once.
+    """
+
+    def __init__(self, genome, max_batch_size=MAX_BATCH_SIZE, max_wait=MAX_WAIT, decision_cache=None):
+        """Sets up the server without opening a socket.
+
+        Parameters
+        ----------
+        genome : Genome
+            The network weights.
+        max_batch_size : int
+            The largest number of boards evaluated together.
+        max_wait : float
+            The longest time in seconds a request waits for a batch to fill.
+        decision_cache : Optional[DecisionCache]
+            If given, repeated boards are answered from the cache and each distinct board in a batch is evaluated once.
+        """
+        self.genome = genome
+        self.decision_cache = decision_cache
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.metrics = ServerMetrics()
+        self._queue = None
+        self._batcher = None
+        self._server = None
+
+    async def start(self, host='localhost', port=0, path=None):
+        """Start the batcher and listen for clients on TCP or, if a path is given, a Unix socket.
+
+        Parameters
+        ----------
+        host : str
+            The TCP host.
+        port : int
+            The TCP port. Port 0 picks a free port.
+        path : Optional[str]
+            The Unix socket path.
+
+        Returns
+        -------
+        Union[Tuple[str, int], str]
+            The address clients should connect to.
+        """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_client, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server.sockets[0].getsockname()
+
+    async def close(self):
+        """Stop listening and stop the batcher."""
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+
+    async def best_move(self, board):
+        """Queue a single board for evaluation and wait for its move.
+
+        Parameters
+        ----------
+        board : ndarray
+            The log2 tile values with one element per cell of the genome's board shape.
+
+        Returns
+        -------
+        int
+            The index in DIRECTIONS of the best legal move, or NO_MOVE.
+        """
+        return await self._submit(board)
+
+    def _submit(self, board):
+        """Queue a single board for evaluation.
+
+        Parameters
+        ----------
+        board : ndarray
+            The log2 tile values with one element per cell of the genome's board shape.
+
+        Returns
+        -------
+        Future
+            Resolves to the index in DIRECTIONS of the best legal move, or NO_MOVE.
+
+        Raises
+        ------
+        ValueError
+            If the board does not match the genome's board shape or has a log2 tile value outside 0 to 15.
+        """
+        board = np.asarray(board)
+        if board.size != np.prod(self.genome.board_shape):
+            raise ValueError(f'A network for {self.genome.board_shape} boards cannot choose a move for a board of '
+                             f'{board.size} cells.')
+        if board.min() < 0 or board.max() > 15:
+            raise ValueError(f'Log2 tile values must be from 0 to 15, not {board.min()} to {board.max()}.')
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((board.reshape(self.genome.board_shape), future, time.perf_counter()))
+        return future
+
+    async def _batch_loop(self):
+        """Collect queued requests into micro-batches and evaluate them until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._evaluate(batch)
+
+    def _evaluate(self, batch):
+        """Evaluate a batch with one forward pass and resolve its futures.
+
+        Parameters
+        ----------
+        batch : List[Tuple[ndarray, Future, float]]
+            The queued boards, their futures, and their arrival times.
+        """
+        now = time.perf_counter()
+        boards = np.stack([board for board, _, _ in batch]).astype(int)
+        self.metrics.record_batch([now - arrival for _, _, arrival in batch])
+        try:
+            moves = self.best_moves(boards)
+        except Exception as e:  # Fail the batch's requests rather than the batcher.
+            [future.set_exception(e) for _, future, _ in batch if not future.done()]
+            return
+        for move, (_, future, _) in zip(moves, batch):
+            if not future.done():
+                future.set_result(int(move))
+
+    def best_moves(self, boards):
+        """Choose the best legal move for many boards with one forward pass.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The board states with shape (n, rows, cols).
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each board's best legal move, or NO_MOVE.
+        """
+        if self.decision_cache is not None:
+            orders = self.decision_cache.get_move_orders(self.genome, boards)
+        else:
+            orders = self.genome.calculate_move_orders(boards)
+        legal = np.take_along_axis(legal_moves_mask(boards), orders, axis=1)
+        moves = orders[np.arange(len(orders)), legal.argmax(axis=1)]
+        moves[~legal.any(axis=1)] = NO_MOVE
+        return moves
+
+    async def _handle_client(self, reader, writer):
+        """Read a client's boards, queue them, and write back the moves in order.
+
+        Parameters
+        ----------
+        reader : StreamReader
+            The client's input stream.
+        writer : StreamWriter
+            The client's output stream.
+        """
+        responses = asyncio.Queue()
+
+        async def respond():
+            """Write each move as soon as it and all earlier moves are ready."""
+            while True:
+                future = await responses.get()
+                if future is None:
+                    break
+                try:
+                    move = await future
+                except Exception:  # The batch failed, which should only fail this client's request.
+                    move = REJECTED
+                writer.write(bytes([move]))
+                if responses.empty():
+                    await writer.drain()
+
+        responder = asyncio.ensure_future(respond())
+        board_bytes = int(np.prod(self.genome.board_shape))
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                data = await reader.readexactly(board_bytes)
+                try:
+                    future = self._submit(np.frombuffer(data, dtype=np.uint8))
+                except ValueError:  # Rejected before joining a batch, so the other boards in it are unaffected.
+                    future = loop.create_future()
+                    future.set_result(REJECTED)
+                responses.put_nowait(future)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            responses.put_nowait(None)
+            try:
+                await responder
+                await writer.drain()
+            except Exception:  # The writer is closed whatever went wrong with this client.
+                pass
+            writer.close()
+
+
+class MoveClient:
+    """A client for a MoveServer that pipelines its requests.
+
+    Attributes
+    ----------
+    reader : StreamReader
+        The server's output stream.
+    writer : StreamWriter
+        The server's input stream.
+    """
+
+    def __init__(self, reader, writer):
+        """Wraps an open connection. Use `connect` to open one.
+
+        Parameters
+        ----------
+        reader : StreamReader
+            The server's output stream.
+        writer : StreamWriter
+            The server's input stream.
+        """
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host='localhost', port=None, path=None):
+        """Connect to a server over TCP or, if a path is given, a Unix socket.
+
+        Parameters
+        ----------
+        host : str
+            The TCP host.
+        port : Optional[int]
+            The TCP port.
+        path : Optional[str]
+            The Unix socket path.
+
+        Returns
+        -------
+        MoveClient
+            The connected client.
+        """
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def best_moves(self, boards):
+        """Send boards and wait for their moves.
+
+        Parameters
+        ----------
+        boards : ndarray
+            The board states with shape (n, rows, cols), matching the board shape of the server's network.
+
+        Returns
+        -------
+        ndarray
+            The index in DIRECTIONS of each board's best legal move, NO_MOVE, or REJECTED.
+        """
+        boards = np.asarray(boards, dtype=np.uint8)
+        self.writer.write(boards.tobytes())
+        await self.writer.drain()
+        return np.frombuffer(await self.reader.readexactly(len(boards)), dtype=np.uint8)
+
+    async def close(self):
+        """Close the connection."""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+async def serve(genome, host, port, path, max_batch_size, max_wait, report_interval):
+    """Run a MoveServer forever, printing its metrics periodically.
+
+    Parameters
+    ----------
+    genome : Genome
+        The network weights.
+    host : str
+        The TCP host.
+    port : int
+        The TCP port.
+    path : Optional[str]
+        The Unix socket path, used instead of host and port.
+    max_batch_size : int
+        The largest number of boards evaluated together.
+    max_wait : float
+        The longest time in seconds a request waits for a batch to fill.
+    report_interval : float
+        The number of seconds between metrics reports.
+    """
+    server = MoveServer(genome, max_batch_size, max_wait)
+    print('Serving moves on', await server.start(host, port, path))
+    while True:
+        await asyncio.sleep(report_interval)
+        print(server.metrics.summary())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a trained network\'s moves over a socket.')
+    parser.add_argument('model', help='A pickled NetworkPlayer, such as Best_Net_Gen_2000.pkl.')
+    parser.add_argument('--host', default='localhost', help='The TCP host.')
+    parser.add_argument('--port', type=int, default=2048, help='The TCP port.')
+    parser.add_argument('--unix', help='A Unix socket path, used instead of host and port.')
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE, help='The largest batch size.')
+    parser.add_argument('--max-wait', type=float, default=MAX_WAIT, help='The longest wait for a batch in seconds.')
+    parser.add_argument('--report-interval', type=float, default=10, help='Seconds between metrics reports.')
+    args = parser.parse_args()
+    with open(args.model, 'rb') as f:
+        network = pickle.load(f)
+    asyncio.run(serve(network.genome, args.host, args.port, args.unix, args.max_batch_size, args.max_wait,
+                      args.report_interval))
@@ -0,0 +1,90 @@
+from contextlib import redirect_stdout
+from game.conformance import adversarial_boards, check_spawns, compare_games, compare_moves, ENGINES, main, \
+    random_boards, ReferenceEngine, shrink, VectorizedEngine
+from game import Game
+from game.sessions import SessionStore
+from game.vectorized import move_boards
+import io
+import numpy as np
+import unittest
+from unittest.mock import patch
+
+
+class NoMergeEngine(ReferenceEngine):
+    """Slides tiles without ever merging them."""
+
+    def move(self, boards, direction):
+        with patch.object(Game, '_merge_left', return_value=0):
+            return super().move(boards, direction)
+
+
+class HalfPointsEngine(VectorizedEngine):
+    """Scores half of the points of each merge."""
+
+    def move(self, boards, direction):
+        new_boards, points, legal = move_boards(boards, direction)
+        return new_boards, points // 2, legal
+
+
+class BiasedSpawnEngine(VectorizedEngine):
+    """Spawns a 4 half of the time."""
+
+    def add_tiles(self, boards, rng):
+        new_boards = super().add_tiles(boards, rng)
+        added = new_boards != boards
+        new_boards[added] = rng.choice([1, 2], np.sum(added))
+        return new_boards
+
+
+class TestConformance(unittest.TestCase):
+    def setUp(self):
+        self.rng = np.random.default_rng(2048)
+        self.boards = np.concatenate([random_boards(500, self.rng), adversarial_boards(self.rng)])
+
+    def test_reference_matches_itself(self):
+        self.assertListEqual(compare_moves(ReferenceEngine(), self.boards[:200]), [])
+
+    def test_registered_engines_conform(self):
+        self.assertIn('vectorized', ENGINES)
+        for engine in ENGINES.values():
+            self.assertListEqual(compare_moves(engine, self.boards), [])
+            moves, mismatches = compare_games(engine, 2)
+            self.assertGreater(moves, 0)
+            self.assertListEqual(mismatches, [])
+            self.assertTrue(check_spawns(engine, 2000)['passed'])
+
+    def test_detects_and_shrinks_missing_merge(self):
+        mismatches = compare_moves(NoMergeEngine(), self.boards)
+        self.assertTrue(mismatches)
+        m = mismatches[0]
+        shrunk = shrink(NoMergeEngine(), m['board'], m['direction'])
+        self.assertEqual(np.count_nonzero(shrunk), 2)
+        self.assertListEqual(sorted(shrunk[shrunk > 0].tolist()), [1, 1])
+
+    def test_detects_scoring_in_games(self):
+        _, mismatches = compare_games(HalfPointsEngine(), 2)
+        self.assertEqual(len(mismatches), 2)
+        self.assertEqual(mismatches[0]['field'], 'points')
+
+    def test_sessions_engine(self):
+        engine = ENGINES['sessions']
+        self.assertFalse(engine.is_game_over(np.ones((1, 4, 4), dtype=int))[0])
+        with patch.object(SessionStore, '_flag_game_over'):
+            mismatches = compare_moves(engine, self.boards)
+        self.assertTrue(mismatches)
+        self.assertTrue(all(m['field'] == 'game_over' for m in mismatches))
+
+    def test_detects_biased_spawns(self):
+        result = check_spawns(BiasedSpawnEngine(), 2000)
+        self.assertTrue(result['valid'])
+        self.assertFalse(result['passed'])
+
+    def test_main(self):
+        with redirect_stdout(io.StringIO()) as output:
+            failures = main(['vectorized', '--boards', '200', '--games', '1'])
+        self.assertEqual(failures, 0)
+        self.assertIn('"passed": true', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -122,6 +122,17 @@ class TestGame(unittest.TestCase):
         g.move(direction)
         return g
 
+    def test_last_spawn(self):
+        g = self._set_up_for_move_test(Action.LEFT)
+        self.assertTupleEqual(tuple(g.last_spawn), (11, 1))
+
+    def test_num_moves(self):
+        g = self._set_up_for_move_test(Action.LEFT)
+        self.assertEqual(g.num_moves, 1)
+        g.board = np.arange(16).reshape(4, 4) + 1
+        g.move(Action.LEFT)
+        self.assertEqual(g.num_moves, 1)
+
     def test_move_illegal(self):
         g = Game()
         board = np.arange(16).reshape(4, 4) + 1  # Filled board has no legal moves.
@@ -152,6 +163,23 @@ class TestGame(unittest.TestCase):
         self.assertEqual(g.score, 0)
         self.assertTrue(g.game_over)
 
+    def test_board_shapes(self):
+        g = Game((3, 5))
+        self.assertTupleEqual(g.board.shape, (3, 5))
+        self.assertEqual(np.sum(g.board > 0), 2)
+        g.board = np.array([[1, 1, 0, 2, 2],
+                            [0, 0, 0, 0, 0],
+                            [0, 0, 0, 0, 3]])
+        g.move(Action.LEFT)
+        self.assertListEqual(g.board[0, :2].tolist(), [2, 3])
+        self.assertEqual(g.score, 12)
+        while not g.game_over:
+            g.move(g.get_legal_moves()[0])
+        self.assertTrue(g.board.all())
+        for shape in [(2, 4), (4, 7), (4,)]:
+            with self.assertRaises(ValueError):
+                Game(shape)
+
     @patch('matplotlib.pyplot.show')
     @patch('matplotlib.pyplot.pause')
     def test_display(self, pause_mock, show_mock):
@@ -0,0 +1,110 @@
+from game import Game
+from game.render import ReplayExporter, render_game, TerminalRenderer
+from game.trajectory import TrajectoryReader, TrajectoryWriter
+import io
+import numpy as np
+import os
+from PIL import Image
+from players import RandomPlayer
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class FakeClock:
+    def __init__(self):
+        self.time = 0.
+
+    def __call__(self):
+        return self.time
+
+
+class TestTerminalRenderer(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2048)
+        self.stream = io.StringIO()
+        self.clock = FakeClock()
+        self.renderer = TerminalRenderer(self.stream, max_fps=10, clock=self.clock)
+        self.game = Game()
+
+    def test_redraws_only_changed_cells(self):
+        self.renderer.start(self.game)
+        self.assertEqual(self.renderer.cells_drawn, 16)
+        self.game.board[0, 0] = 5
+        self.clock.time = 1
+        self.assertTrue(self.renderer.update(self.game))
+        self.assertEqual(self.renderer.cells_drawn, 17)
+        self.assertTrue(self.stream.getvalue().endswith('\x1b[2;1H    32'))
+
+    def test_frame_rate_cap(self):
+        self.renderer.start(self.game)
+        self.clock.time = 0.05
+        self.assertFalse(self.renderer.update(self.game))
+        self.assertTrue(self.renderer.update(self.game, force=True))
+        self.clock.time = 0.2
+        self.assertTrue(self.renderer.update(self.game))
+        self.assertEqual((self.renderer.frames, self.renderer.skipped), (3, 1))
+
+    def test_play_game(self):
+        player = RandomPlayer()
+        renderer = TerminalRenderer(self.stream)
+        game = player.play_game(False, renderer=renderer)
+        self.assertLess(renderer.frames, game.num_moves + 2)
+        self.assertIn(f'Final score was {game.score}', self.stream.getvalue())
+
+    def test_board_shapes(self):
+        for shape in [(3, 3), (5, 5)]:
+            stream = io.StringIO()
+            renderer = TerminalRenderer(stream, max_fps=None)
+            game = Game(shape)
+            renderer.start(game)
+            self.assertEqual(renderer.cells_drawn, shape[0] * shape[1])
+            renderer.finish(game)
+            self.assertIn(f'\x1b[{shape[0] + 1};{(shape[1] - 1) * 6 + 1}H', stream.getvalue())
+            self.assertIn(f'\x1b[{shape[0] + 2};1HGame Over.', stream.getvalue())
+
+
+class TestReplayExport(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'games.bin')
+        with TrajectoryWriter(self.path) as recorder:
+            RandomPlayer().play_multiple_games(2, progress_bar=False, recorder=recorder)
+        self.reader = TrajectoryReader(self.path)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_render_frames(self):
+        directory = os.path.join(self.dir.name, 'frames')
+        render_game(self.reader[0][:5], directory)
+        self.assertListEqual(sorted(os.listdir(directory)), [f'{k:05d}.png' for k in range(5)])
+
+    def test_render_board_shape(self):
+        path = os.path.join(self.dir.name, 'wide.bin')
+        player = RandomPlayer()
+        player.board_shape = (5, 6)
+        with TrajectoryWriter(path, player.board_shape) as recorder:
+            player.play_game(False, recorder)
+        reader = TrajectoryReader(path)
+        directory = os.path.join(self.dir.name, 'wide')
+        render_game(reader[0][-3:], directory, shape=reader.shape)
+        self.assertEqual(len(os.listdir(directory)), 3)
+
+    def test_background_export(self):
+        short_path = os.path.join(self.dir.name, 'short.bin')
+        with TrajectoryWriter(short_path) as writer:
+            for game in self.reader:
+                writer.write_game(np.array(game[-4:]))
+        with ReplayExporter(workers=1) as exporter:
+            result = exporter.export_game(self.reader[1][-8:], os.path.join(self.dir.name, 'replay.gif'))
+            self.assertEqual(len(exporter.export_log(short_path, os.path.join(self.dir.name, 'replays'), extension='')),
+                             2)
+            paths = exporter.wait()
+        self.assertEqual(paths[0], result.get())
+        with Image.open(paths[0]) as image:
+            self.assertEqual(image.n_frames, 8)
+        self.assertEqual(len(os.listdir(paths[2])), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
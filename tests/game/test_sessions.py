@@ -0,0 +1,122 @@
+from copy import deepcopy
+from game import Action, DIRECTIONS, Game
+from game.sessions import BYTES_PER_SESSION, GAME_OVER, SessionStore
+from game.vectorized import move_boards
+import numpy as np
+from players import GreedyPlayer
+import unittest
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.store = SessionStore(capacity=4, seed=2048)
+
+    def test_compact(self):
+        self.assertLess(BYTES_PER_SESSION, 40)
+
+    def test_start(self):
+        slots = self.store.open(100)
+        boards = self.store.get_boards(slots)
+        self.assertTrue(np.all((boards > 0).sum(axis=(1, 2)) == 2))
+        self.assertTrue(np.all(np.isin(boards, [0, 1, 2])))
+        self.assertEqual(len(self.store), 100)
+        self.assertGreaterEqual(self.store.capacity, 100)
+
+    def test_move_matches_rules(self):
+        slots = self.store.open(300)
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            before = self.store.get_boards(slots)
+            scores = self.store.scores[slots].astype(int)
+            over = (self.store.flags[slots] & GAME_OVER) != 0
+            actions = rng.integers(0, 4, len(slots))
+            self.store.move(slots, actions)
+            after = self.store.get_boards(slots)
+            for i, d in enumerate(actions):
+                new_board, points, legal = move_boards(before[i:i + 1], d)
+                if over[i] or not legal[0]:
+                    np.testing.assert_array_equal(after[i], before[i])
+                    continue
+                added = after[i] != new_board[0]
+                self.assertEqual(added.sum(), 1)
+                self.assertEqual(new_board[0][added], 0)
+                self.assertEqual(self.store.scores[slots[i]], scores[i] + points[0])
+
+    def test_games_are_reproducible(self):
+        first = self.store.open(3, seeds=[1, 2, 3])
+        other = SessionStore(seed=0)
+        other.open(5)
+        second = other.open(1, seeds=[2])
+        for _ in range(50):
+            self.store.move(first, [0, 2, 1])
+            other.move(second, 2)
+        np.testing.assert_array_equal(self.store.get_boards(first[1]), other.get_boards(second[0]))
+
+    def test_spawn_split(self):
+        slots = self.store.open(5000)
+        fours = (self.store.get_boards(slots) == 2).sum()
+        self.assertAlmostEqual(fours / 10000, 0.1, delta=0.015)
+
+    def test_release_and_reuse(self):
+        session = self.store.new_game()
+        slot = session.slot
+        session.close()
+        self.assertEqual(len(self.store), 0)
+        with self.assertRaises(ValueError):
+            session.score
+        self.store.release(slot)
+        reused = self.store.new_game()
+        self.assertEqual(reused.slot, slot)
+        with self.assertRaises(ValueError):
+            session.board
+        self.assertEqual(len(self.store), 1)
+
+    def test_release_finished(self):
+        slots = self.store.open(20)
+        rng = np.random.default_rng(0)
+        while not np.all(self.store.flags[slots] & GAME_OVER):
+            self.store.move(slots, rng.integers(0, 4, len(slots)))
+        scores = self.store.scores[slots].copy()
+        np.testing.assert_array_equal(np.sort(self.store.release_finished()), np.sort(slots))
+        self.assertEqual(len(self.store), 0)
+        np.testing.assert_array_equal(self.store.scores[slots], scores)
+
+
+class TestGameSession(unittest.TestCase):
+    def setUp(self):
+        self.store = SessionStore(seed=2048)
+        self.session = self.store.new_game()
+
+    def test_game_interface(self):
+        board = np.array([[0, 0, 0, 0],
+                          [0, 0, 1, 2],
+                          [0, 0, 0, 1],
+                          [0, 0, 0, 1]])
+        self.session.board = board
+        self.assertSetEqual(set(self.session.get_legal_moves()), {Action.LEFT, Action.UP, Action.DOWN})
+        self.session.move(Action.DOWN)
+        self.assertEqual(self.session.score, 4)
+        self.assertEqual(self.session.num_moves, 1)
+        self.assertEqual(self.session.highest_tile, 4)
+        position, value = self.session.last_spawn
+        self.assertEqual(self.session.board.flat[position], value)
+
+    def test_copy_is_independent_game(self):
+        game = deepcopy(self.session)
+        self.assertIsInstance(game, Game)
+        np.testing.assert_array_equal(game.board, self.session.board)
+        game.move(game.get_legal_moves()[0])
+        self.assertEqual(self.session.num_moves, 0)
+
+    def test_player_plays_session(self):
+        player = GreedyPlayer()
+        while not self.session.game_over:
+            action = player._choose_action(self.session)
+            self.assertIn(action, DIRECTIONS)
+            self.session.move(action)
+        self.assertGreater(self.session.score, 0)
+        self.assertListEqual(self.session.get_legal_moves(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
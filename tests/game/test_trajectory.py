@@ -0,0 +1,89 @@
+from game import Game
+from game.trajectory import decode_spawns, NO_ACTION, TrajectoryReader, TrajectoryWriter
+from game.vectorized import move_boards
+import numpy as np
+import os
+from players import RandomPlayer
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestTrajectory(unittest.TestCase):
+    def setUp(self):
+        self.dir = TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'games.bin')
+        self.player = RandomPlayer()
+        with TrajectoryWriter(self.path) as recorder:
+            self.player.play_multiple_games(3, progress_bar=False, recorder=recorder)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_games_and_scores(self):
+        reader = TrajectoryReader(self.path)
+        self.assertEqual(len(reader), 3)
+        np.testing.assert_array_equal(reader.get_scores(), self.player.scores)
+        for game, highest_tile in zip(reader, self.player.highest_tiles):
+            self.assertEqual(game['action'][-1], NO_ACTION)
+            self.assertEqual(2 ** reader.unpack(game[-1:]).max(), highest_tile)
+
+    def test_positions_replay(self):
+        game = TrajectoryReader(self.path)[0]
+        boards = TrajectoryReader.unpack(game)
+        positions, values = decode_spawns(game['spawn'][:-1])
+        for i, (action, points) in enumerate(zip(game['action'][:-1], game['points'][:-1])):
+            new_board, earned, legal = move_boards(boards[i:i + 1], action)
+            self.assertTrue(legal[0])
+            self.assertEqual(earned[0], points)
+            new_board = new_board.reshape(16)
+            self.assertEqual(new_board[positions[i]], 0)
+            new_board[positions[i]] = values[i]
+            np.testing.assert_array_equal(new_board.reshape(4, 4), boards[i + 1])
+
+    def test_batches_are_views(self):
+        reader = TrajectoryReader(self.path)
+        batches = list(reader.iter_batches(50))
+        self.assertEqual(sum(len(b) for b in batches), len(reader.positions))
+        self.assertFalse(batches[0].flags.owndata)
+
+    def test_append_and_truncate_partial_game(self):
+        with open(self.path, 'ab') as f:
+            f.write(b'partial')  # An interrupted game without an index entry.
+        with TrajectoryWriter(self.path) as recorder:
+            g = Game()
+            recorder.start_game(g)
+            move = g.get_legal_moves()[0]
+            g.move(move)
+            recorder.record_move(g, move)
+            recorder.end_game()
+        reader = TrajectoryReader(self.path)
+        self.assertEqual(len(reader), 4)
+        self.assertEqual(os.path.getsize(self.path), len(reader.positions) * reader.positions.itemsize)
+
+    def test_board_shapes(self):
+        for shape in [(3, 3), (5, 5), (4, 6)]:
+            path = os.path.join(self.dir.name, f'{shape}.bin')
+            player = RandomPlayer()
+            player.board_shape = shape
+            with TrajectoryWriter(path, shape) as recorder:
+                games = [player.play_game(False, recorder) for _ in range(2)]
+            reader = TrajectoryReader(path)
+            self.assertEqual(reader.shape, shape)
+            np.testing.assert_array_equal(reader.get_scores(), player.scores)
+            for positions, game in zip(reader, games):
+                boards = reader.unpack(positions, reader.shape)
+                np.testing.assert_array_equal(boards[-1], game.board)
+                spawns, values = decode_spawns(positions['spawn'][:-1])
+                cells = boards[1:].reshape(len(spawns), -1)
+                np.testing.assert_array_equal(cells[np.arange(len(spawns)), spawns], values)
+                self.assertEqual((spawns[-1], values[-1]), game.last_spawn)
+            with TrajectoryWriter(path) as recorder:
+                self.assertEqual(recorder.shape, shape)
+                with self.assertRaises(ValueError):
+                    recorder.start_game(Game())
+            with self.assertRaises(ValueError):
+                TrajectoryWriter(path, (4, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+from game import Action, DIRECTIONS, Game
+from game.vectorized import GameBatch, legal_moves_mask, move_boards, pack_boards, score_moves, unpack_boards
+import numpy as np
+import unittest
+
+
+class TestVectorized(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2048)
+        self.boards = rng.integers(0, 6, (500, 4, 4)) * (rng.random((500, 4, 4)) < 0.7)
+
+    def test_move_boards_matches_game(self):
+        g = Game()
+        for d, direction in enumerate(DIRECTIONS):
+            new_boards, points, legal = move_boards(self.boards, d)
+            for board, new_board, p, l in zip(self.boards, new_boards, points, legal):
+                g.board = board
+                move_was_legal, correct_board, points_earned = g._move(direction)
+                self.assertEqual(l, move_was_legal)
+                self.assertEqual(p, points_earned)
+                np.testing.assert_array_equal(new_board, correct_board)
+
+    def test_legal_moves_mask(self):
+        g = Game()
+        mask = legal_moves_mask(self.boards)
+        for board, legal in zip(self.boards, mask):
+            g.board = board
+            self.assertListEqual([d for d, l in zip(DIRECTIONS, legal) if l], g.get_legal_moves())
+
+    def test_score_moves(self):
+        points, legal = score_moves(self.boards)
+        for d in range(4):
+            _, expected_points, expected_legal = move_boards(self.boards, d)
+            np.testing.assert_array_equal(points[:, d], expected_points)
+            np.testing.assert_array_equal(legal[:, d], expected_legal)
+
+    def test_pack_round_trip(self):
+        packed = pack_boards(self.boards)
+        self.assertEqual(packed.dtype, np.uint64)
+        np.testing.assert_array_equal(unpack_boards(packed), self.boards)
+        np.testing.assert_array_equal(unpack_boards(pack_boards(self.boards[0])), self.boards[0])
+
+    def test_board_shapes(self):
+        rng = np.random.default_rng(0)
+        for shape in [(3, 3), (3, 5), (5, 4)]:
+            boards = rng.integers(0, 5, (100,) + shape) * (rng.random((100,) + shape) < 0.7)
+            g = Game(shape)
+            for d, direction in enumerate(DIRECTIONS):
+                new_boards, points, legal = move_boards(boards, d)
+                for board, new_board, p, l in zip(boards, new_boards, points, legal):
+                    g.board = board
+                    move_was_legal, correct_board, points_earned = g._move(direction)
+                    self.assertEqual(l, move_was_legal)
+                    self.assertEqual(p, points_earned)
+                    np.testing.assert_array_equal(new_board, correct_board)
+            batch = GameBatch(20, rng, shape=shape)
+            while not batch.game_over.all():
+                legal = batch.get_legal_moves_mask()
+                batch.move((rng.random(legal.shape) * legal).argmax(axis=1))
+            self.assertTupleEqual(batch.boards.shape, (20,) + shape)
+            self.assertTrue(np.all(batch.boards > 0))
+
+    def test_pack_large_boards(self):
+        boards = np.random.default_rng(0).integers(0, 16, (10, 5, 5))
+        packed = pack_boards(boards)
+        self.assertTupleEqual(packed.shape, (10, 2))
+        np.testing.assert_array_equal(unpack_boards(packed, (5, 5)), boards)
+        np.testing.assert_array_equal(unpack_boards(pack_boards(boards[:, :3, :3]), (3, 3)), boards[:, :3, :3])
+
+    def test_tiles_too_large(self):
+        boards = np.zeros((2, 4, 4), dtype=int)
+        boards[1, 0, :2] = 15
+        merged, points, _ = move_boards(boards, 0)
+        self.assertEqual(merged[1, 0, 0], 16)
+        self.assertEqual(points[1], 2 ** 16)
+        for function in (lambda b: move_boards(b, 0), score_moves, legal_moves_mask, pack_boards):
+            with self.assertRaises(ValueError):
+                function(merged)
+
+    def test_game_batch(self):
+        batch = GameBatch(200, np.random.default_rng(0))
+        self.assertTrue(np.all(np.sum(batch.boards > 0, axis=(1, 2)) == 2))
+        while not batch.game_over.all():
+            legal = batch.get_legal_moves_mask()
+            self.assertTrue(np.all(legal.any(axis=1) == ~batch.game_over))
+            previous = batch.boards.copy()
+            batch.move((np.random.random(legal.shape) * legal).argmax(axis=1))
+            changed = np.any(batch.boards != previous, axis=(1, 2))
+            self.assertTrue(np.all(changed | batch.game_over))
+        self.assertTrue(np.all(batch.boards > 0))
+        self.assertTrue(np.all(batch.scores > 0))
+        self.assertTrue(np.all(batch.highest_tiles >= 16))
+
+    def test_game_batch_ignores_illegal_moves(self):
+        batch = GameBatch(1, np.random.default_rng(0))
+        batch.boards[0] = [[1, 2, 3, 4], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0]]
+        batch.move([DIRECTIONS.index(Action.UP)])
+        self.assertListEqual(batch.boards[0, 0].tolist(), [1, 2, 3, 4])
+        self.assertEqual(np.count_nonzero(batch.boards), 4)
+        self.assertEqual(batch.num_moves[0], 0)
+        batch.move([DIRECTIONS.index(Action.DOWN)])
+        self.assertListEqual(batch.boards[0, 3].tolist(), [1, 2, 3, 4])
+        self.assertEqual(np.count_nonzero(batch.boards), 5)
+        self.assertEqual(batch.num_moves[0], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+from genetics.arena import GENOME_BYTES, SharedArena, SharedMemoryEvaluator
+from genetics.coordinator import play_job
+from genetics.genome import Architecture, Genome
+import numpy as np
+from players import NetworkPlayer
+import unittest
+
+
+class TestSharedArena(unittest.TestCase):
+    def test_genome_round_trip(self):
+        arena = SharedArena(2, 3)
+        try:
+            genome = Genome()
+            self.assertEqual(len(genome.to_buffer()), GENOME_BYTES)
+            arena.write_genome(1, genome)
+            self.assertEqual(arena.versions[1], 1)
+            attached = SharedArena(2, 3, arena.name)
+            copy = attached.read_genome(1)
+            attached.close()
+            np.testing.assert_array_equal(copy.hidden_weights, genome.hidden_weights)
+        finally:
+            arena.close()
+
+
+class TestSharedMemoryEvaluator(unittest.TestCase):
+    def setUp(self):
+        self.evaluator = SharedMemoryEvaluator(workers=2, num_networks=2, max_games=3, games_per_job=2)
+
+    def tearDown(self):
+        self.evaluator.close()
+
+    def test_play_games(self):
+        networks = [NetworkPlayer() for _ in range(2)]
+        self.evaluator.play_games(networks, [3, 1])
+        self.assertEqual(networks[0].get_num_games_played(), 3)
+        self.assertEqual(networks[1].get_num_games_played(), 1)
+        scores, highest_tiles = play_job(networks[0].genome.to_buffer(), 2, 0)
+        self.assertListEqual(networks[0].scores[:2], np.frombuffer(scores, dtype=np.uint32).tolist())
+        self.assertGreater(self.evaluator.total_moves, 0)
+
+    def test_grows(self):
+        networks = [NetworkPlayer() for _ in range(3)]
+        self.evaluator.play_games(networks, 4)
+        self.assertEqual(self.evaluator.arena.num_networks, 3)
+        self.assertEqual(self.evaluator.arena.max_games, 4)
+        self.assertTrue(all(n.get_num_games_played() == 4 for n in networks))
+
+    def test_genome_written_once(self):
+        network = NetworkPlayer()
+        self.evaluator.play_games([network], 1)
+        self.evaluator.play_games([network], 1)
+        self.assertEqual(self.evaluator.arena.versions[0], 1)
+        self.evaluator.play_games([NetworkPlayer()], 1)
+        self.assertEqual(self.evaluator.arena.versions[0], 2)
+
+    def test_replaced_weights_rewritten(self):
+        network = NetworkPlayer()
+        self.evaluator.play_games([network], 1)
+        network.genome.output_weights = -network.genome.output_weights
+        self.evaluator.play_games([network], 1)
+        self.assertEqual(self.evaluator.arena.versions[0], 2)
+        self.assertEqual(self.evaluator.arena.read_genome(0).to_buffer(), network.genome.to_buffer())
+
+    def test_architectures(self):
+        architecture = Architecture(256, 2)
+        networks = [NetworkPlayer(architecture=architecture), NetworkPlayer()]
+        self.evaluator.play_games(networks, 1)
+        self.assertEqual(self.evaluator.arena.genome_bytes, architecture.num_weights)
+        self.assertEqual(self.evaluator.arena.read_genome(0).to_buffer(), networks[0].genome.to_buffer())
+        self.assertEqual(self.evaluator.arena.read_genome(1).to_buffer(), networks[1].genome.to_buffer())
+        scores, _ = play_job(networks[0].genome.to_buffer(), 1, self.evaluator.seed - 2, architecture)
+        self.assertListEqual(networks[0].scores, np.frombuffer(scores, dtype=np.uint32).tolist())
+
+    def test_board_shape(self):
+        architecture = Architecture(8, 1, (3, 4))
+        network = NetworkPlayer(architecture=architecture)
+        self.evaluator.play_games([network], 2)
+        self.assertEqual(self.evaluator.arena.read_genome(0).architecture, architecture)
+        self.assertEqual(len(network.scores), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+from genetics.budget import BudgetScheduler, ocba_allocation
+from genetics.genome import Architecture
+from genetics.population import Population
+from genetics.threads import ThreadEvaluator
+import numpy as np
+import unittest
+
+
+class TestOCBA(unittest.TestCase):
+    def test_allocation(self):
+        means = np.array([10., 9., 8.1, 7.9, 5.])
+        shares = ocba_allocation(means, np.ones(5), 3)
+        self.assertAlmostEqual(shares.sum(), 1)
+        self.assertEqual(set(np.argsort(shares)[-2:]), {2, 3})  # Closest to the boundary between third and fourth.
+        self.assertLess(shares[4], shares[1])
+        noisy = ocba_allocation(means, np.array([1., 1., 1., 1., 20.]), 3)
+        self.assertGreater(noisy[4], shares[4])
+
+
+class TestBudgetScheduler(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(0)
+        self.pop = Population(num_nets=8, num_elite=1, architectures=Architecture(8, 1))
+
+    def test_requires_one_budget(self):
+        with self.assertRaises(ValueError):
+            BudgetScheduler()
+        with self.assertRaises(ValueError):
+            BudgetScheduler(seconds=1, moves=1)
+
+    def test_seconds_budget(self):
+        scheduler = BudgetScheduler(seconds=3, round_games=10)
+        games, seconds = scheduler.run(self.pop, 2)
+        self.assertEqual(sum(n.get_num_games_played() for n in self.pop.networks), games)
+        self.assertTrue(all(n.get_num_games_played() >= scheduler.initial_games for n in self.pop.networks))
+        self.assertGreater(scheduler.rounds, 0)
+        self.assertLess(seconds, 4)
+        self.assertEqual(scheduler.summary()['games'], games)
+
+    def test_moves_budget(self):
+        scheduler = BudgetScheduler(moves=20000, round_games=8)
+        with ThreadEvaluator(threads=2) as evaluator:
+            games, _ = scheduler.run(self.pop, 2, evaluator)
+            self.assertEqual(scheduler.spent_moves, evaluator.total_moves)
+        self.assertLessEqual(scheduler.spent_moves, 20000 * 1.1)
+        self.assertGreater(games, len(self.pop.networks) * scheduler.initial_games)
+
+    def test_move_budget_needs_move_counts(self):
+        class Uncounted:
+            def play_games(self, networks, games):
+                pass
+
+        with self.assertRaises(ValueError):
+            BudgetScheduler(moves=100).run(self.pop, 2, Uncounted())
+
+    def test_focuses_on_boundary(self):
+        means = {n: {3: 7.1, 4: 6.9}.get(i, 5.) for i, n in enumerate(self.pop.networks)}
+
+        class Synthetic:
+            total_moves = 0
+
+            def play_games(self, networks, games):
+                for n, k in zip(networks, games):
+                    n.scores.extend(np.exp(np.random.normal(means[n], 0.5, k)).tolist())
+                    n.highest_tiles.extend([128] * k)
+                    self.total_moves += 10 * k
+
+        scheduler = BudgetScheduler(moves=2000, round_games=20)
+        games, _ = scheduler.run(self.pop, 1, Synthetic())
+        self.assertEqual(games, 200)
+        played = [n.get_num_games_played() for n in self.pop.networks]
+        self.assertGreater(min(played[3], played[4]), 3 * max(played[:3] + played[5:]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+from genetics.checkpoint import checkpoint_paths, CheckpointWriter, write_atomically
+from genetics.fitness_cache import FitnessCache
+from genetics.genome import Architecture
+from genetics.microgenetic import run_micro_genetic_alg
+from genetics.population import Population
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+
+class Unpicklable:
+    def __reduce__(self):
+        raise ValueError('Interrupted.')
+
+
+class TestCheckpointWriter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.pop = Population(num_nets=3, num_elite=1)
+        self.pop.networks[0].play_multiple_games(2, progress_bar=False)
+        self.cache = FitnessCache()
+        self.cache.update(self.pop.networks[0])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_write_atomically(self):
+        path = os.path.join(self.dir.name, 'value.pkl')
+        write_atomically([1, 2], path)
+        write_atomically([3], path)
+        with open(path, 'rb') as f:
+            self.assertListEqual(pickle.load(f), [3])
+        with self.assertRaises(ValueError):
+            write_atomically(Unpicklable(), path)
+        self.assertListEqual(os.listdir(self.dir.name), ['value.pkl'])
+
+    def test_snapshot(self):
+        network = self.pop.networks[0]
+        snapshot = self.pop.snapshot()
+        network.play_multiple_games(1, progress_bar=False)
+        self.pop.parent_fitness[0] = 1.
+        self.assertEqual(snapshot.networks[0].get_num_games_played(), 2)
+        self.assertIs(snapshot.networks[0].genome, network.genome)
+        self.assertNotIn(0, snapshot.parent_fitness)
+        cache = self.cache.snapshot()
+        self.cache.update(network)
+        self.assertEqual(len(cache.get(network.genome)), 2)
+        self.assertEqual(len(self.cache.get(network.genome)), 3)
+
+    def test_submit(self):
+        with CheckpointWriter(self.dir.name) as writer:
+            writer.submit(self.pop, self.cache)
+        pop_path, cache_path = checkpoint_paths(self.dir.name, self.pop.generation)
+        self.assertEqual(Population(pop=pop_path).generation, self.pop.generation + 1)
+        self.assertEqual(len(FitnessCache.load(cache_path)), 1)
+        self.assertEqual(writer.written, 1)
+
+    def test_keep(self):
+        writer = CheckpointWriter(self.dir.name, keep=2, max_pending=2)
+        for generation in range(1, 6):
+            self.pop.generation = generation
+            writer.submit(self.pop, self.cache)
+        writer.flush()
+        self.assertEqual(writer.written + writer.skipped, 5)
+        names = sorted(os.listdir(self.dir.name))
+        self.assertIn('Generation5.pkl', names)
+        self.assertIn('Generation5.cache.pkl', names)
+        self.assertEqual(len(names), 4)
+
+    def test_error(self):
+        writer = CheckpointWriter(os.path.join(self.dir.name, 'missing'))
+        writer.submit(self.pop)
+        with self.assertRaises(FileNotFoundError):
+            writer.flush()
+        writer.flush()
+
+    def test_run_submits_each_generation_once(self):
+        patch = mock.patch.object(CheckpointWriter, 'submit', autospec=True, side_effect=CheckpointWriter.submit)
+        with patch as submit:
+            run_micro_genetic_alg(10, architectures=Architecture(8, 1), nets_per_pop=4, stage_games=(2, 2, 2),
+                                  output_dir=self.dir.name, verbose=False, keep_checkpoints=1)
+        self.assertListEqual([call.args[1].generation for call in submit.call_args_list], [10])
+        self.assertIn('Generation10.pkl', os.listdir(self.dir.name))
+
+
+if __name__ == '__main__':
+    unittest.main()
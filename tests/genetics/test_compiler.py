@@ -0,0 +1,69 @@
+from game.trajectory import TrajectoryWriter
+from genetics.compiler import benchmark, CompiledNetwork, load_corpus, verify
+from genetics.genome import Genome
+import numpy as np
+import os
+from players import NetworkPlayer
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestCompiler(unittest.TestCase):
+    def setUp(self):
+        self.genome = Genome()
+        input_weights, output_weights = self.genome.input_weights.copy(), self.genome.output_weights.copy()
+        input_weights[:, :32] = 0  # Constant zero units in the first layer.
+        output_weights[64:] = 0  # Dead units in the last hidden layer.
+        self.genome.input_weights, self.genome.output_weights = input_weights, output_weights
+        self.boards = np.random.randint(0, 14, (500, 4, 4))
+
+    def test_report(self):
+        report = CompiledNetwork(self.genome).report
+        self.assertListEqual(report['units_constant'], [32, 0])
+        self.assertEqual(report['units_dead'][1], 64)
+        self.assertListEqual(report['units_kept'], [96, 64])
+        self.assertLess(report['weights_kept'], report['weights'])
+
+    def test_move_orders_unchanged(self):
+        compiled = CompiledNetwork(self.genome)
+        self.assertEqual(verify(self.genome, compiled, self.boards), 0)
+        for board in self.boards[:20]:
+            np.testing.assert_array_equal(compiled.calculate_move_order(board),
+                                          self.genome.calculate_move_order(board))
+
+    def test_constant_hidden_units_folded(self):
+        hidden_weights = self.genome.hidden_weights.copy()
+        hidden_weights[0][:, 0] = 0  # Always zero.
+        hidden_weights[0][:, 1] = 0
+        hidden_weights[0][:5, 1] = -1  # Only fed by constant zero units of the first layer.
+        hidden_weights[0][32:, 2] = 0
+        hidden_weights[0][:32, 2] = 1  # Always zero, since its inputs are always zero.
+        self.genome.hidden_weights = hidden_weights
+        compiled = CompiledNetwork(self.genome)
+        self.assertEqual(compiled.report['units_constant'][1], 3)
+        self.assertEqual(verify(self.genome, compiled, self.boards), 0)
+
+    def test_unpruned_network(self):
+        genome = Genome()
+        compiled = CompiledNetwork(genome)
+        self.assertEqual(compiled.report['weights_kept'], compiled.report['weights'])
+        self.assertEqual(verify(genome, compiled, self.boards), 0)
+
+    def test_corpus_and_benchmark(self):
+        with TemporaryDirectory() as d:
+            path = os.path.join(d, 'games.bin')
+            with TrajectoryWriter(path) as recorder:
+                NetworkPlayer(genome=self.genome).play_multiple_games(2, progress_bar=False, recorder=recorder)
+            boards = load_corpus(path)
+        compiled = CompiledNetwork(self.genome)
+        self.assertEqual(verify(self.genome, compiled, boards), 0)
+        self.assertSetEqual(set(benchmark(self.genome, compiled, boards, 10)), {'batched_speedup', 'single_speedup'})
+
+    def test_network_player(self):
+        player = NetworkPlayer(genome=CompiledNetwork(self.genome))
+        player.play_multiple_games(1, progress_bar=False)
+        self.assertEqual(player.get_num_games_played(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
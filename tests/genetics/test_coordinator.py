@@ -0,0 +1,91 @@
+from genetics.coordinator import Coordinator, play_job, run_worker
+from genetics.genome import Genome
+from genetics.population import Population
+from multiprocessing import Process
+from multiprocessing.connection import Client
+import numpy as np
+import os
+from players import NetworkPlayer
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestCoordinator(unittest.TestCase):
+    def setUp(self):
+        self.coordinator = Coordinator(games_per_job=2, heartbeat_timeout=2)
+        self.workers = []
+
+    def tearDown(self):
+        self.coordinator.close()
+        for w in self.workers:
+            w.join(10)
+            if w.is_alive():
+                w.terminate()
+
+    def _start_workers(self, num_workers, address=None):
+        """Helper function to launch worker processes on localhost."""
+        for _ in range(num_workers):
+            w = Process(target=run_worker, args=(address or self.coordinator.address,))
+            w.start()
+            self.workers.append(w)
+
+    def test_genome_buffer_round_trip(self):
+        genome = Genome()
+        copy = Genome.from_buffer(genome.to_buffer())
+        self.assertEqual(genome.calculate_similarity(copy), 1)
+
+    def test_play_games(self):
+        self._start_workers(3)
+        networks = [NetworkPlayer() for _ in range(3)]
+        self.coordinator.play_games(networks, 5)
+        [self.assertEqual(n.get_num_games_played(), 5) for n in networks]
+        [self.assertEqual(len(n.highest_tiles), 5) for n in networks]
+
+    def test_population_play_games(self):
+        self._start_workers(2)
+        p = Population(num_nets=3, num_elite=1)
+        p.play_games(3, include_elites=False, progress_bar=False, coordinator=self.coordinator)
+        [self.assertEqual(n.get_num_games_played(), 3) for n in p.networks]
+
+    def test_results_match_seeds(self):
+        self._start_workers(1)
+        network = NetworkPlayer()
+        self.coordinator.play_games([network], 2)
+        scores, _ = play_job(network.genome.to_buffer(), 2, 0)
+        self.assertListEqual(network.scores, np.frombuffer(scores, dtype=np.uint32).tolist())
+
+    def test_redispatch_after_worker_dies(self):
+        network = NetworkPlayer()
+        with self.coordinator._condition:
+            self.coordinator._jobs[-1] = (-1, network.genome.to_buffer(), 2, 0)
+            self.coordinator._pending.append(-1)
+        conn = Client(self.coordinator.address, authkey=b'2048')
+        conn.send(('request',))
+        self.assertEqual(conn.recv()[1], -1)
+        conn.close()  # The worker dies while holding the job.
+        self._start_workers(1)
+        with self.coordinator._condition:
+            self.assertTrue(self.coordinator._condition.wait_for(lambda: -1 in self.coordinator._results, 30))
+
+    def test_duplicate_results_ignored(self):
+        with self.coordinator._condition:
+            self.coordinator._jobs[-1] = (-1, b'', 1, 0)
+        scores = np.array([100], dtype=np.uint32).tobytes()
+        highest_tiles = np.array([5], dtype=np.uint8).tobytes()
+        self.assertTrue(self.coordinator._record_result(-1, scores, highest_tiles))
+        self.assertFalse(self.coordinator._record_result(-1, scores, highest_tiles))
+        self.assertEqual(self.coordinator._results[-1], ([100], [32]))
+
+    def test_unix_socket(self):
+        self.coordinator.close()
+        with TemporaryDirectory() as d:
+            self.coordinator = Coordinator(os.path.join(d, 'socket'), games_per_job=2)
+            self._start_workers(2)
+            network = NetworkPlayer()
+            self.coordinator.play_games([network], 3)
+            self.assertEqual(network.get_num_games_played(), 3)
+            self.coordinator.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from genetics.fitness_cache import FitnessCache
+from genetics.population import Population
+import numpy as np
+from players import NetworkPlayer
+from tempfile import NamedTemporaryFile
+import unittest
+
+
+class TestFitnessCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = FitnessCache(max_entries=2)
+        self.network = NetworkPlayer()
+        self.network.play_multiple_games(3, progress_bar=False)
+        self.cache.update(self.network)
+
+    def test_hit(self):
+        twin = NetworkPlayer(genome=self.network.genome)
+        self.assertEqual(self.cache.lookup(twin, 2), 0)
+        self.assertListEqual(twin.scores, self.network.scores[:2])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.games_saved, 2)
+
+    def test_top_up(self):
+        twin = NetworkPlayer(genome=self.network.genome)
+        self.assertEqual(self.cache.lookup(twin, 5), 2)
+        self.assertEqual(twin.get_num_games_played(), 3)
+        twin.play_multiple_games(2, progress_bar=False)
+        self.cache.update(twin)
+        self.assertEqual(len(self.cache.get(twin.genome)), 5)
+        self.assertEqual(self.cache.top_ups, 1)
+
+    def test_miss(self):
+        self.assertEqual(self.cache.lookup(NetworkPlayer(), 4), 4)
+        self.assertEqual(self.cache.lookup(self.network, 4), 4)  # Nothing beyond its own games.
+        self.assertEqual(self.cache.misses, 2)
+        self.assertAlmostEqual(self.cache.get_hit_rate(), 0)
+
+    def test_streaming_stats(self):
+        entry = self.cache.get(self.network.genome)
+        self.assertAlmostEqual(entry.get_avg_score(), self.network.get_avg_score())
+        self.assertAlmostEqual(entry.get_log_score_std(), np.std(np.log(self.network.scores)))
+
+    def test_lru_eviction(self):
+        others = [NetworkPlayer(), NetworkPlayer()]
+        for n in others:
+            n.play_multiple_games(1, progress_bar=False)
+            self.cache.update(n)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNone(self.cache.get(self.network.genome))
+
+    def test_population_play_games(self):
+        p = Population(num_nets=3, num_elite=1)
+        p.networks.append(NetworkPlayer(genome=p.networks[0].genome))
+        cache = FitnessCache()
+        p.play_games(2, include_elites=False, progress_bar=False, fitness_cache=cache)
+        [self.assertEqual(n.get_num_games_played(), 2) for n in p.networks]
+        self.assertListEqual(p.networks[0].scores, p.networks[-1].scores)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 3)
+
+    def test_save_and_load(self):
+        with NamedTemporaryFile() as f:
+            self.cache.save(f.name)
+            cache = FitnessCache.load(f.name)
+        self.assertEqual(len(cache.get(self.network.genome)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,8 @@
-from genetics.genome import Genome
+from game import DIRECTIONS
+from genetics.genome import Architecture, DEFAULT_ARCHITECTURE, Genome, input_layer, measure_inference_cost, \
+    MUTATION_RATE
+import numpy as np
+import pickle
 import unittest
 
 
@@ -14,6 +18,143 @@ class TestGenome(unittest.TestCase):
         self.assertGreater(child.calculate_similarity(genome1), 0.2)
         self.assertGreater(child.calculate_similarity(genome2), 0.2)
 
+    def test_calculate_move_orders(self):
+        genome = Genome()
+        boards = np.random.randint(0, 12, (50, 4, 4))
+        orders = genome.calculate_move_orders(boards)
+        for board, order in zip(boards, orders):
+            self.assertListEqual([DIRECTIONS[i] for i in order], list(genome.calculate_move_order(board)))
+
+    def test_lookup_table_matches_matmul(self):
+        genome = Genome()
+        for board in np.random.randint(0, 16, (200, 16)):
+            h = np.sign((3 * (board / 7 - 1)) @ genome.input_weights)
+            for w in genome.hidden_weights:
+                h = np.sign(h @ w)
+            order = [DIRECTIONS[i] for i in (h @ genome.output_weights).argsort()[::-1]]
+            self.assertListEqual(order, list(genome.calculate_move_order(board)))
+
+    def test_lookup_table_rebuilt_on_change(self):
+        genome = Genome()
+        board = np.random.randint(0, 8, 16)
+        genome.calculate_move_order(board)
+        other = Genome()
+        genome.input_weights = other.input_weights
+        genome.hidden_weights = other.hidden_weights
+        genome.output_weights = other.output_weights
+        np.testing.assert_array_equal(genome.calculate_move_order(board), other.calculate_move_order(board))
+
+    def test_weights_read_only(self):
+        genome = Genome()
+        boards = np.random.randint(0, 8, (50, 4, 4))
+        orders = genome.calculate_move_orders(boards)
+        with self.assertRaises(ValueError):
+            genome.output_weights[:, 0] = -genome.output_weights[:, 0]
+        np.testing.assert_array_equal(genome.calculate_move_orders(boards), orders)
+        output_weights = genome.output_weights.copy()
+        output_weights[:, 0] = -output_weights[:, 0]
+        genome.output_weights = output_weights
+        expected = Genome.from_buffer(genome.to_buffer()).calculate_move_orders(boards)
+        np.testing.assert_array_equal(genome.calculate_move_orders(boards), expected)
+        self.assertTrue(np.any(expected != orders))
+        copies = (pickle.loads(pickle.dumps(genome)), Genome.from_buffer(genome.to_buffer()), Genome(genome, genome))
+        for other in copies:
+            weights = (other.input_weights, other.hidden_weights, other.output_weights)
+            self.assertFalse(any(w.flags.writeable for w in weights))
+
+    def test_pickle_excludes_lookup_table(self):
+        genome = Genome()
+        genome.calculate_move_order(np.zeros(16, dtype=int))
+        self.assertNotIn('_compiled', pickle.loads(pickle.dumps(genome)).__dict__)
+
+    def test_child_records_lineage(self):
+        mom, dad = Genome(), Genome()
+        child = Genome(mom=mom, dad=dad)
+        self.assertTupleEqual(child.parent_ids, (mom.genome_id, dad.genome_id))
+        flat = [np.frombuffer(g.to_buffer(), dtype=np.int8) for g in (child, mom, dad)]
+        expected = np.where(np.repeat(child.crossover, DEFAULT_ARCHITECTURE.row_lengths), flat[1], flat[2])
+        indices, values = child.mutations
+        expected[indices] = values
+        np.testing.assert_array_equal(expected, flat[0])
+
+    def test_old_pickle_defaults(self):
+        state = Genome().__dict__.copy()
+        for name in ('genome_id', 'parent_ids', 'crossover', 'mutations', 'mutation_rate', 'crossover_rate'):
+            del state[name]
+        genome = Genome.__new__(Genome)
+        genome.__setstate__(state)
+        self.assertEqual(genome.mutation_rate, MUTATION_RATE)
+        self.assertIsNone(genome.parent_ids)
+        self.assertIsInstance(genome.genome_id, int)
+
+    def test_architecture(self):
+        architecture = Architecture(hidden_layer_size=8, num_hidden_layers=1)
+        genome = Genome(architecture=architecture)
+        self.assertEqual(genome.architecture, architecture)
+        self.assertEqual(Genome().architecture, DEFAULT_ARCHITECTURE)
+        child = Genome(mom=genome, dad=Genome(architecture=architecture))
+        self.assertEqual(child.architecture, architecture)
+        self.assertEqual(len(child.crossover), len(architecture.row_lengths))
+        self.assertEqual(child.calculate_move_orders(np.random.randint(0, 12, (5, 4, 4))).shape, (5, 4))
+        copy = Genome.from_buffer(child.to_buffer(), architecture)
+        self.assertEqual(copy.to_buffer(), child.to_buffer())
+        self.assertEqual(len(copy.to_buffer()), architecture.num_weights)
+        with self.assertRaises(ValueError):
+            Genome.from_buffer(child.to_buffer())
+
+    def test_board_shape(self):
+        architecture = Architecture(8, 1, (3, 5))
+        genome = Genome(architecture=architecture)
+        self.assertTupleEqual(genome.input_weights.shape, (15, 8))
+        self.assertEqual(genome.architecture, architecture)
+        self.assertEqual(Architecture(8, 1, [3, 5]), architecture)
+        self.assertEqual(Architecture(8, 1).board_shape, (4, 4))
+        boards = np.random.randint(0, 12, (20, 3, 5))
+        orders = genome.calculate_move_orders(boards)
+        for board, order in zip(boards, orders):
+            self.assertListEqual([DIRECTIONS[i] for i in order], list(genome.calculate_move_order(board)))
+        boards = np.random.default_rng(3).integers(0, 12, (200, 3, 5))
+        pre_activation = 3 * (boards.reshape(200, -1) / 7 - 1) @ genome.input_weights
+        np.testing.assert_allclose(input_layer(boards.reshape(200, -1), genome._compile()[0], genome.input_weights),
+                                   pre_activation, rtol=0, atol=1e-9)
+        # Rounding can only flip the sign of pre-activations that should be zero, so orders are compared without them.
+        clear = np.all(np.abs(pre_activation) > 1e-9, axis=1)
+        self.assertGreater(clear.sum(), 0)
+        expected = (np.sign(pre_activation[clear]) @ genome.output_weights).argsort(axis=1)[:, ::-1]
+        np.testing.assert_array_equal(genome.calculate_move_orders(boards[clear]), expected)
+        child = Genome(mom=genome, dad=Genome(architecture=architecture))
+        self.assertEqual(child.architecture, architecture)
+        self.assertEqual(Genome.from_buffer(child.to_buffer(), architecture).architecture, architecture)
+        with self.assertRaises(ValueError):
+            Genome(mom=genome, dad=Genome(architecture=Architecture(8, 1, (5, 3))))
+        with self.assertRaises(ValueError):
+            Architecture(8, 1, (2, 2))
+
+    def test_mutation_rate(self):
+        mom, dad = Genome(), Genome()
+        self.assertEqual(len(Genome(mom=mom, dad=dad, mutation_rate=0).mutations[0]), 0)
+        self.assertGreater(len(Genome(mom=mom, dad=dad, mutation_rate=0.5).mutations[0]), 5000)
+
+    def test_crossover_rate(self):
+        mom, dad = Genome(architecture=Architecture(8, 1)), Genome(architecture=Architecture(8, 1))
+        child = Genome(mom=mom, dad=dad, architecture=Architecture(8, 1), mutation_rate=0, crossover_rate=1)
+        self.assertEqual(child.to_buffer(), mom.to_buffer())
+        self.assertTrue(child.crossover.all())
+        self.assertEqual((child.mutation_rate, child.crossover_rate), (0, 1))
+
+    def test_mismatched_architectures(self):
+        small, default = Genome(architecture=Architecture(8, 2)), Genome()
+        with self.assertRaises(ValueError):
+            Genome(mom=small, dad=default)
+        self.assertEqual(small.calculate_similarity(default), 0)
+
+    def test_measure_inference_cost(self):
+        boards = np.random.randint(0, 12, (20, 4, 4))
+        small = measure_inference_cost(Genome(architecture=Architecture(8, 1)), boards)
+        large = measure_inference_cost(Genome(architecture=Architecture(512, 3)), boards)
+        self.assertGreater(small, 0)
+        self.assertLess(small, large)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,67 @@
+from genetics.history import RunHistory
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+class TestRunHistory(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'history.jsonl')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def fill(self, history, generations):
+        for gen in generations:
+            history.append(generation=gen, best_score=np.float64(100 * gen), similarity=0.5,
+                           games={'first': 620, 'second': 480}, seconds={'first': 1.5, 'second': 0.5})
+
+    def test_append_and_summary(self):
+        with RunHistory(self.path) as history:
+            self.fill(history, range(1, 11))
+            self.assertEqual(len(history), 10)
+            summary = history.summary()
+            self.assertEqual(summary['best_score'], 1000)
+            self.assertEqual(summary['best_generation'], 10)
+            self.assertEqual(summary['total_games'], 11000)
+            self.assertAlmostEqual(summary['total_hours'], 20 / 3600)
+            self.assertListEqual([r['generation'] for r in history], list(range(1, 11)))
+
+    def test_reopen_drops_incomplete_line(self):
+        with RunHistory(self.path) as history:
+            self.fill(history, range(1, 6))
+        with open(self.path, 'a') as f:
+            f.write('{"generation": 6, "best_')
+        with RunHistory(self.path) as history:
+            self.assertEqual(len(history), 5)
+            self.fill(history, [6])
+            self.assertEqual(history.last['generation'], 6)
+        with RunHistory(self.path) as history:
+            self.assertEqual(history.summary()['best_score'], 600)
+
+    def test_rewind(self):
+        with RunHistory(self.path) as history:
+            self.fill(history, range(1, 16))
+            history.rewind(11)
+            self.assertEqual(len(history), 10)
+            self.fill(history, [11])
+            self.assertListEqual([r['generation'] for r in history], list(range(1, 12)))
+
+    def test_incremental_plot(self):
+        with RunHistory(self.path) as history:
+            self.fill(history, range(1, 2001))
+            figure = os.path.join(self.dir.name, 'scores.png')
+            history.plot(figure)
+            self.assertTrue(os.path.exists(figure))
+            self.assertLess(len(history._plot_points), 700)
+            self.assertEqual(max(history._plot_points.values()), (2000, 200000))
+            self.fill(history, [2001])
+            history.plot(figure)
+            self.assertEqual(max(history._plot_points.values()), (2001, 200100))
+            self.assertEqual(history._plot_offset, os.path.getsize(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
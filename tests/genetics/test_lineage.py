@@ -0,0 +1,97 @@
+from genetics.genome import Architecture
+from genetics.lineage import LineageArchive
+from genetics.population import Population
+import numpy as np
+import os
+import pickle
+import tempfile
+import unittest
+
+
+class TestLineageArchive(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2048)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'lineage.pkl')
+        self.networks = []
+        pop = Population(6, 1)
+        for gen in range(5):
+            for n in pop.networks:
+                n.scores, n.highest_tiles = [100 + gen, 200], [8, 16]
+            self.networks.extend(pop.networks)
+            pop = Population(pop=pop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def add_generations(self, archive):
+        for i in range(0, len(self.networks), 5):
+            archive.add_all(self.networks[i:i + 5])
+
+    def assert_reconstructs(self, archive, networks):
+        for n in networks:
+            genome = archive.get_genome(n.genome.genome_id)
+            self.assertEqual(genome.to_buffer(), n.genome.to_buffer())
+            self.assertEqual(genome.parent_ids, n.genome.parent_ids)
+
+    def test_reconstructs_deltas(self):
+        with LineageArchive(self.path) as archive:
+            self.add_generations(archive)
+            self.assertEqual(len(archive), len(self.networks))
+            self.assertEqual(max(archive._depths.values()), 4)
+            self.assert_reconstructs(archive, self.networks)
+        self.assertLess(os.path.getsize(self.path), len(pickle.dumps([n.genome for n in self.networks])) / 3)
+
+    def test_keyframe_interval(self):
+        with LineageArchive(self.path, keyframe_interval=2, cache_size=0) as archive:
+            self.add_generations(archive)
+            self.assertEqual(max(archive._depths.values()), 2)
+            self.assert_reconstructs(archive, self.networks)
+
+    def test_updates_stats(self):
+        with LineageArchive(self.path) as archive:
+            n = self.networks[0]
+            archive.add(n)
+            n.scores.append(300)
+            archive.add(n)
+            self.assertEqual(len(archive), 1)
+            self.assertEqual(archive.get_stats(n.genome.genome_id)['games'], 3)
+
+    def test_reopen_drops_incomplete_record(self):
+        with LineageArchive(self.path) as archive:
+            self.add_generations(archive)
+        with open(self.path, 'ab') as f:
+            f.write(pickle.dumps({'kind': 'keyframe'})[:-3])
+        with LineageArchive(self.path) as archive:
+            self.assertEqual(len(archive), len(self.networks))
+            self.assert_reconstructs(archive, self.networks[-5:])
+            archive.add(self.networks[0])
+        with LineageArchive(self.path) as archive:
+            self.assertEqual(len(archive), len(self.networks))
+
+    def test_ancestors(self):
+        with LineageArchive(self.path) as archive:
+            self.add_generations(archive)
+            child = self.networks[-1].genome
+            self.assertSetEqual(archive.get_ancestors(child.genome_id, 1), set(child.parent_ids))
+            self.assertIsNone(archive.get_parents(self.networks[0].genome.genome_id))
+
+    def test_architectures(self):
+        pop = Population(4, 1, architectures=[Architecture(8, 1), Architecture(300, 2)])  # Over 2 ** 16 weights.
+        networks = []
+        for gen in range(3):
+            for n in pop.networks:
+                n.scores, n.highest_tiles = [100 + gen, 200], [8, 16]
+            networks.extend(pop.networks)
+            pop = Population(pop=pop)
+        with LineageArchive(self.path) as archive:
+            archive.add_all(networks)
+        with LineageArchive(self.path) as archive:
+            self.assertGreater(max(archive._depths.values()), 0)
+            self.assert_reconstructs(archive, networks)
+            for n in networks:
+                self.assertEqual(archive.get_genome(n.genome.genome_id).architecture, n.genome.architecture)
+
+
+if __name__ == '__main__':
+    unittest.main()
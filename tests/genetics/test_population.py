@@ -1,5 +1,8 @@
 from copy import copy
-from genetics.population import Population
+from genetics.genome import Architecture, DEFAULT_ARCHITECTURE
+from genetics.population import MAX_SIMILARITY, MUTATION_RATE_BOUNDS, Population, RATE_STEP
+import numpy as np
+import pickle
 from tempfile import NamedTemporaryFile
 import unittest
 
@@ -59,6 +62,81 @@ class TestPopulation(unittest.TestCase):
         with NamedTemporaryFile() as f:
             p.save(f.name)
 
+    def test_architectures(self):
+        small, tiny = Architecture(16, 1), Architecture(8, 2)
+        p = Population(num_nets=6, num_elite=1, architectures=[small, tiny])
+        self.assertListEqual([n.genome.architecture for n in p.networks], [small, tiny] * 3)
+        for i, n in enumerate(p.networks):
+            n.scores = [100 + i]
+        parents = {n.genome.genome_id: n for n in p.networks}
+        p = Population(pop=p)
+        self.assertListEqual(p.architectures, [small, tiny])
+        for n in p.networks:
+            self.assertIn(n.genome.architecture, (small, tiny))
+            if n.genome.parent_ids is not None:
+                self.assertGreater(n.calculate_similarity(parents[n.genome.parent_ids[0]]), 0)
+        p.randomize()
+        self.assertListEqual([n.genome.architecture for n in p.networks], [small, tiny] * 2 + [small])
+
+    def test_cost_weight(self):
+        small, large = Architecture(8, 1), Architecture(512, 3)
+        p = Population(num_nets=2, num_elite=1, architectures=[large, small], cost_weight=1.)
+        p.networks[0].scores = [200]
+        p.networks[1].scores = [100]
+        self.assertIs(p.get_sorted_networks(False)[0], p.networks[1])
+        self.assertSetEqual(set(p.inference_costs), {small, large})
+        p.cost_weight = 0.
+        self.assertIs(p.get_sorted_networks(False)[0], p.networks[0])
+
+    def test_adaptive_rates(self):
+        p = Population(num_nets=8, num_elite=1, architectures=Architecture(8, 1), mutation_rate=0.02, adaptive=True)
+        self.assertTrue(all(n.genome.mutation_rate == 0.02 for n in p.networks))
+        for i, n in enumerate(p.networks):
+            n.scores = [100 * (i + 1)]
+        p.similarity = MAX_SIMILARITY + 0.1
+        p.success_rate = 0.5
+        child_pop = Population(pop=p)
+        self.assertTrue(child_pop.adaptive)
+        self.assertAlmostEqual(child_pop.rate_factor, RATE_STEP)
+        children = [n for n in child_pop.networks if n.genome.parent_ids is not None]
+        self.assertTrue(children)
+        rates = [n.genome.mutation_rate for n in children]
+        self.assertEqual(len(set(rates)), len(rates))  # Every child's rates are perturbed.
+        self.assertTrue(all(MUTATION_RATE_BOUNDS[0] <= r <= MUTATION_RATE_BOUNDS[1] for r in rates))
+        self.assertGreater(np.exp(np.mean(np.log(rates))), 0.02)
+        fitness = {n.genome.genome_id: p.get_fitness(n) for n in p.networks + p.elites}
+        for n in children:
+            mom, dad = (fitness[i] for i in n.genome.parent_ids)
+            self.assertGreaterEqual(mom, dad)  # The fitter parent is the mom.
+            self.assertEqual(child_pop.parent_fitness[n.genome.genome_id], mom)
+        for n in children:
+            n.scores = [1e6 if n is children[0] else 1]
+        self.assertAlmostEqual(child_pop.record_success(child_pop.networks), 1 / len(children))
+        p.success_rate = 0
+        p.similarity = 0
+        self.assertAlmostEqual(Population(pop=p).rate_factor, 1 / RATE_STEP)
+
+    def test_fixed_rates(self):
+        p = Population(num_nets=4, num_elite=1, architectures=Architecture(8, 1), mutation_rate=0.03)
+        for i, n in enumerate(p.networks):
+            n.scores = [100 * (i + 1)]
+        p = Population(pop=p)
+        self.assertEqual(p.rate_factor, 1)
+        self.assertTrue(all(n.genome.mutation_rate == 0.03 and n.genome.crossover_rate == 0.5 for n in p.networks))
+
+    def test_old_pickle_defaults(self):
+        p = Population(num_nets=2, num_elite=1)
+        state = p.__dict__.copy()
+        for name in ('architectures', 'cost_weight', 'inference_costs', 'adaptive', 'success_rate', 'parent_fitness'):
+            del state[name]
+        p = Population.__new__(Population)
+        p.__setstate__(state)
+        self.assertListEqual(p.architectures, [DEFAULT_ARCHITECTURE])
+        self.assertEqual(p.cost_weight, 0)
+        self.assertFalse(p.adaptive)
+        self.assertIsNone(p.success_rate)
+        self.assertIsInstance(pickle.loads(pickle.dumps(p)), Population)
+
 
 if __name__ == '__main__':
     unittest.main()
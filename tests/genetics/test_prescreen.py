@@ -0,0 +1,49 @@
+from genetics.prescreen import Prescreener
+import numpy as np
+from players import NetworkPlayer
+import unittest
+
+
+class TestPrescreener(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2048)
+        self.prescreener = Prescreener(max_moves=50, games=2, min_calibration=4, audit_fraction=0)
+        self.networks = [NetworkPlayer() for _ in range(6)]
+
+    def test_truncated_games(self):
+        truncated = self.prescreener.play_truncated_games(self.networks)
+        self.assertEqual(truncated.shape, (6,))
+        self.assertTrue(np.all(truncated > 0))
+
+    def test_keeps_everything_until_calibrated(self):
+        kept = self.prescreener.screen(self.networks, 2, 20)
+        self.assertListEqual(kept, self.networks)
+        self.assertIsNone(self.prescreener.get_fit())
+        for n in kept:
+            n.scores = [100]
+        self.prescreener.calibrate(kept, kept[:2])
+        self.assertEqual(len(self.prescreener.calibration), 6)
+        self.assertEqual(self.prescreener.summary()['dropped'], 0)
+
+    def test_drops_confidently_weak(self):
+        self.prescreener.calibration.extend([(1., 1.), (2., 2.), (3., 3.01), (4., 3.99)])
+        self.prescreener.play_truncated_games = lambda networks: np.array([5., 4., 3., 1., 1., 4.9])
+        kept = self.prescreener.screen(self.networks, 3, 20)
+        self.assertListEqual(kept, [self.networks[i] for i in [0, 1, 5]])
+        summary = self.prescreener.summary()
+        self.assertEqual(summary['dropped'], 3)
+        self.assertEqual(summary['games_saved'], 60)
+
+    def test_calibration_error(self):
+        self.prescreener.calibration.extend([(1., 1.), (2., 2.), (3., 3.), (4., 4.)])
+        self.prescreener.z = 0
+        self.prescreener.play_truncated_games = lambda networks: np.arange(len(networks), dtype=float)
+        kept = self.prescreener.screen(self.networks, 6, 20)
+        for n in kept:
+            n.scores = [np.e ** 2]
+        self.prescreener.calibrate(kept, kept)
+        self.assertAlmostEqual(self.prescreener.summary()['calibration_rmse'], np.sqrt(np.mean((np.arange(6) - 2.) ** 2)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from game.trajectory import TrajectoryWriter
+from genetics.genome import Architecture, Genome
+from genetics.proxy import PositionCorpus, ProxyFilter
+import numpy as np
+import os
+from players import NetworkPlayer
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestProxy(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2048)
+        self.teacher = NetworkPlayer()
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'games.log')
+        with TrajectoryWriter(self.path) as writer:
+            self.teacher.play_multiple_games(2, progress_bar=False, recorder=writer)
+        self.corpus = PositionCorpus.from_trajectories(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_teacher_agrees_with_itself(self):
+        self.assertEqual(self.corpus.score(self.teacher.genome)['agreement'], 1)
+        self.assertLess(self.corpus.score(NetworkPlayer().genome)['agreement'], 1)
+
+    def test_rollout_values(self):
+        corpus = PositionCorpus(self.corpus.boards[:20], self.corpus.moves[:20])
+        corpus.add_rollout_values(rollouts=2, rng=np.random.default_rng(0))
+        self.assertEqual(corpus.values.shape, (20, 4))
+        self.assertTrue(np.all(np.isnan(corpus.values) == ~corpus._legal))
+        result = corpus.score(self.teacher.genome)
+        self.assertGreaterEqual(result['regret'], 0)
+        self.assertGreater(result['expected_value'], 0)
+
+    def test_save_load(self):
+        self.corpus.values = np.random.random((len(self.corpus), 4))
+        path = os.path.join(self.directory.name, 'corpus.npz')
+        self.corpus.save(path)
+        loaded = PositionCorpus.load(path)
+        np.testing.assert_array_equal(loaded.boards, self.corpus.boards)
+        np.testing.assert_array_equal(loaded.moves, self.corpus.moves)
+        np.testing.assert_array_equal(loaded.values, self.corpus.values)
+
+    def test_filter(self):
+        networks = [NetworkPlayer() for _ in range(5)] + [self.teacher]
+        proxy = ProxyFilter(self.corpus, keep_fraction=0.3)
+        kept = proxy.filter(networks)
+        self.assertEqual(len(kept), 2)
+        self.assertIs(kept[-1], self.teacher)
+        self.assertEqual(len(proxy.filter(networks, min_keep=4)), 4)
+        self.assertEqual(proxy.summary()['best'], 1)
+
+    def test_board_shape(self):
+        boards = np.random.randint(0, 8, (20, 5, 5))
+        corpus = PositionCorpus(boards, np.zeros(20))
+        self.assertEqual(corpus.board_shape, (5, 5))
+        self.assertLessEqual(corpus.score(Genome(architecture=Architecture(16, 1, (5, 5))))['agreement'], 1)
+        corpus.add_rollout_values(rollouts=1, rng=np.random.default_rng(0))
+        self.assertEqual(corpus.values.shape, (20, 4))
+        with self.assertRaises(ValueError):
+            self.corpus.score(Genome(architecture=Architecture(16, 1, (5, 5))))
+        with self.assertRaises(ValueError):
+            PositionCorpus(np.zeros((2, 2, 8)), np.zeros(2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from collections import deque
+from genetics.coordinator import play_job
+from genetics.genome import Architecture
+from genetics.sweep import FairPool, grid_search, random_search, Sweep
+import json
+import numpy as np
+import os
+from players import NetworkPlayer
+import tempfile
+import unittest
+
+
+TINY = {'architectures': [Architecture(8, 1)], 'nets_per_pop': 8, 'stage_games': (2, 2, 4)}
+
+
+class TestSearch(unittest.TestCase):
+    def test_grid_search(self):
+        configs = grid_search({'nets_per_pop': [16, 32], 'mutation_rate': [0.01, 0.02, 0.05]})
+        self.assertEqual(len(configs), 6)
+        self.assertDictEqual(configs[1], {'nets_per_pop': 16, 'mutation_rate': 0.02})
+
+    def test_random_search(self):
+        space = {'nets_per_pop': {'low': 8, 'high': 16}, 'mutation_rate': {'low': 0.001, 'high': 0.1, 'log': True},
+                 'num_elite': [1, 2]}
+        configs = random_search(space, 50, seed=1)
+        self.assertListEqual(configs, random_search(space, 50, seed=1))
+        for config in configs:
+            self.assertIsInstance(config['nets_per_pop'], int)
+            self.assertTrue(8 <= config['nets_per_pop'] <= 16)
+            self.assertTrue(0.001 <= config['mutation_rate'] <= 0.1)
+            self.assertIn(config['num_elite'], (1, 2))
+
+
+class TestFairPool(unittest.TestCase):
+    def test_clients_match_play_job(self):
+        with FairPool(workers=1, games_per_job=2) as pool:
+            clients = [pool.client(), pool.client(seed=100)]
+            networks = [NetworkPlayer(architecture=Architecture(8, 1)) for _ in range(2)]
+            for client, n in zip(clients, networks):
+                client.play_games([n], 3)
+                self.assertEqual(client.games_played, 3)
+        for seed, n in zip((0, 100), networks):
+            scores, _ = play_job(n.genome.to_buffer(), 3, seed, n.genome.architecture)
+            self.assertListEqual(n.scores, np.frombuffer(scores, dtype=np.uint32).tolist())
+
+    def test_round_robin(self):
+        with FairPool(workers=1) as pool:
+            with pool._condition:
+                pool._queues.extend([deque([('a', 0, ()), ('a', 1, ())]), deque([('b', 0, ())])])
+                order = [pool._next_job()[0] for _ in range(3)]
+                pool._queues.clear()
+        self.assertListEqual(order, ['a', 'b', 'a'])
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_run(self):
+        configs = grid_search({'mutation_rate': [0.01, 0.05], **{k: [v] for k, v in TINY.items()}})
+        sweep = Sweep(configs, self.dir.name, num_generations=2, stop_ratio=0, verbose=False)
+        summary = sweep.run(workers=1)
+        self.assertListEqual([row['status'] for row in summary], ['finished', 'finished'])
+        for row in summary:
+            directory = os.path.join(self.dir.name, row['name'])
+            self.assertTrue(os.path.exists(os.path.join(directory, 'Generation2.pkl')))
+            with open(os.path.join(directory, 'config.json')) as f:
+                self.assertEqual(json.load(f)['mutation_rate'], row['config']['mutation_rate'])
+            self.assertEqual(row['generations'], 2)
+        self.assertTrue(os.path.exists(os.path.join(self.dir.name, 'sweep.png')))
+        with open(os.path.join(self.dir.name, 'sweep_summary.json')) as f:
+            self.assertEqual(len(json.load(f)), 2)
+
+    def test_stops_losers(self):
+        sweep = Sweep([{}, {}], self.dir.name, min_generations=2, verbose=False)
+
+        class History:
+            def __init__(self, total_games, best_score):
+                self.total_games = total_games
+                self.last = {'best_score': best_score}
+
+        self.assertFalse(sweep._should_stop(0, History(100, 1000)))
+        self.assertFalse(sweep._should_stop(0, History(200, 1000)))
+        self.assertFalse(sweep._should_stop(1, History(150, 2000)))  # Too few generations to stop.
+        self.assertFalse(sweep._should_stop(0, History(300, 1000)))  # No other run has played 300 games yet.
+        self.assertFalse(sweep._should_stop(1, History(400, 2000)))
+        self.assertTrue(sweep._should_stop(0, History(350, 1000)))
+        self.assertEqual(sweep.statuses[0], 'stopped')
+
+    def test_target_score(self):
+        sweep = Sweep([{}], self.dir.name, stop_ratio=0, verbose=False, target_score=1500)
+        history = type('History', (), {'total_games': 100, 'last': {'best_score': 1000}})
+        self.assertFalse(sweep._should_stop(0, history))
+        history.total_games, history.last = 250, {'best_score': 1600}
+        self.assertTrue(sweep._should_stop(0, history))
+        self.assertEqual(sweep.statuses[0], 'reached')
+        self.assertEqual(sweep.summary()[0]['games_to_target'], 250)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+from genetics.genome import Genome
+from genetics.population import Population
+from genetics.threads import measure_scaling, ThreadEvaluator
+import numpy as np
+from players import NetworkPlayer
+import unittest
+
+
+class TestThreadEvaluator(unittest.TestCase):
+    def test_results_independent_of_threads(self):
+        genomes = [Genome() for _ in range(3)]
+        results = []
+        for threads in (1, 3):
+            networks = [NetworkPlayer(genome=g) for g in genomes]
+            with ThreadEvaluator(threads=threads, games_per_job=2) as evaluator:
+                evaluator.play_games(networks, [3, 1, 0])
+                self.assertGreater(evaluator.total_moves, 0)
+                self.assertEqual(evaluator.seed, 4)
+            results.append([n.scores for n in networks])
+        self.assertListEqual(results[0], results[1])
+        self.assertListEqual([len(s) for s in results[0]], [3, 1, 0])
+
+    def test_matches_batched_games(self):
+        network = NetworkPlayer()
+        with ThreadEvaluator(threads=2, seed=7) as evaluator:
+            evaluator.play_games([network], 4)
+        expected = NetworkPlayer(genome=network.genome)
+        expected.play_batched_games(4, rng=np.random.default_rng(7))
+        self.assertListEqual(network.scores, expected.scores)
+        self.assertListEqual(network.highest_tiles, expected.highest_tiles)
+
+    def test_population(self):
+        p = Population(num_nets=3, num_elite=1)
+        with ThreadEvaluator(threads=2) as evaluator:
+            p.play_games(2, include_elites=False, coordinator=evaluator)
+        self.assertTrue(all(n.get_num_games_played() == 2 for n in p.networks))
+
+    def test_measure_scaling(self):
+        results = measure_scaling((1, 2), num_networks=2, games=2, processes=False)
+        self.assertListEqual([r['workers'] for r in results], [1, 2])
+        self.assertEqual(results[0]['efficiency'], 1)
+        self.assertTrue(all(r['games_per_second'] > 0 and r['moves_per_second'] > 0 for r in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
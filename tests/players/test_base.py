@@ -40,5 +40,10 @@ class TestPlayer(unittest.TestCase):
         p.print_summary()
 
 
+    def test_play_batched_games_unsupported(self):
+        with self.assertRaises(NotImplementedError):
+            self.player.play_batched_games(1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,75 @@
+from game import DIRECTIONS, Game
+from genetics.genome import Genome
+import numpy as np
+from players import NetworkPlayer
+from players.decision_cache import DecisionCache
+import pickle
+import unittest
+
+
+class TestDecisionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = DecisionCache(max_entries=3)
+        self.genome = Genome()
+        self.boards = np.random.randint(0, 8, (5, 4, 4))
+
+    def test_single_board(self):
+        for _ in range(2):
+            np.testing.assert_array_equal(self.cache.get_move_order(self.genome, self.boards[0]),
+                                          self.genome.calculate_move_order(self.boards[0]))
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_batch_deduplication(self):
+        boards = self.boards[[0, 1, 0, 0, 1]]
+        orders = self.cache.get_move_orders(self.genome, boards)
+        np.testing.assert_array_equal(orders, self.genome.calculate_move_orders(boards))
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_eviction(self):
+        self.cache.get_move_orders(self.genome, self.boards)
+        self.assertEqual(len(self.cache), 3)
+        self.cache.get_move_orders(self.genome, self.boards)
+        self.assertEqual(self.cache.hits, 3)
+
+    def test_genome_change_discards_entries(self):
+        self.cache.get_move_order(self.genome, self.boards[0])
+        other = Genome()
+        np.testing.assert_array_equal(self.cache.get_move_order(other, self.boards[0]),
+                                      other.calculate_move_order(self.boards[0]))
+        self.assertEqual(self.cache.misses, 2)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_weight_change_discards_entries(self):
+        self.cache.get_move_orders(self.genome, self.boards)
+        self.genome.output_weights = -self.genome.output_weights
+        np.testing.assert_array_equal(self.cache.get_move_orders(self.genome, self.boards),
+                                      self.genome.calculate_move_orders(self.boards))
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_large_tiles_bypass_cache(self):
+        board = np.arange(16).reshape(4, 4) + 1
+        self.cache.get_move_order(self.genome, board)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_network_player(self):
+        player = NetworkPlayer(genome=self.genome, decision_cache_size=1000)
+        reference = NetworkPlayer(genome=self.genome)
+        g = Game()
+        for board in self.boards:
+            g.board = board
+            self.assertEqual(player._choose_action(g), reference._choose_action(g))
+        np.testing.assert_array_equal(player.calculate_move_orders(self.boards),
+                                      reference.calculate_move_orders(self.boards))
+        self.assertIn(player._choose_action(g), DIRECTIONS)
+
+    def test_pickle_drops_entries(self):
+        player = NetworkPlayer(genome=self.genome, decision_cache_size=1000)
+        player.calculate_move_orders(self.boards)
+        player = pickle.loads(pickle.dumps(player))
+        self.assertEqual(len(player.decision_cache), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
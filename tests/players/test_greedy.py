@@ -1,4 +1,5 @@
-from game import Action, Game
+from game import Action, DIRECTIONS, Game
+from game.vectorized import GameBatch
 import numpy as np
 from players import GreedyPlayer
 import unittest
@@ -35,5 +36,21 @@ class TestGreedyPlayer(unittest.TestCase):
         self.assertEqual(self.player.get_num_games_played(), 3)
 
 
+    def test_choose_actions_matches_choose_action(self):
+        rng = np.random.default_rng(2048)
+        boards = rng.integers(0, 4, (200, 4, 4)) * (rng.random((200, 4, 4)) < 0.6)
+        batch = GameBatch(len(boards), rng, boards)
+        actions = self.player._choose_actions(batch)
+        for board, action, over in zip(boards, actions, batch.game_over):
+            if over:
+                continue
+            self.game.board = board
+            self.assertEqual(self.player._choose_action(self.game), DIRECTIONS[action])
+
+    def test_play_batched_games(self):
+        self.player.play_batched_games(20, rng=np.random.default_rng(0))
+        self.assertEqual(self.player.get_num_games_played(), 20)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,6 @@
+from game import DIRECTIONS, Game
+from game.vectorized import GameBatch
+import numpy as np
 from players import NetworkPlayer
 import unittest
 
@@ -20,5 +23,23 @@ class TestNetworkPlayer(unittest.TestCase):
         self.assertEqual(player.get_num_games_played(), 3)
 
 
+    def test_choose_actions_matches_choose_action(self):
+        player = NetworkPlayer()
+        rng = np.random.default_rng(2048)
+        boards = rng.integers(0, 6, (200, 4, 4)) * (rng.random((200, 4, 4)) < 0.6)
+        batch = GameBatch(len(boards), rng, boards)
+        actions = player._choose_actions(batch)
+        g = Game()
+        for board, action, over in zip(boards, actions, batch.game_over):
+            if not over:
+                g.board = board
+                self.assertEqual(player._choose_action(g), DIRECTIONS[action])
+
+    def test_play_batched_games(self):
+        player = NetworkPlayer()
+        player.play_batched_games(10, rng=np.random.default_rng(0))
+        self.assertEqual(player.get_num_games_played(), 10)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,85 @@
+from game import DIRECTIONS, Game
+from game.vectorized import GameBatch, move_boards
+import numpy as np
+import pickle
+from players import NTuplePlayer
+from players.ntuple import NTupleNetwork, TDTrainer
+import unittest
+
+
+class TestNTupleNetwork(unittest.TestCase):
+    def setUp(self):
+        self.network = NTupleNetwork([(0, 1, 2), (0, 1, 4, 5)])
+        rng = np.random.default_rng(2048)
+        self.boards = rng.integers(0, 8, (50, 4, 4)) * (rng.random((50, 4, 4)) < 0.7)
+
+    def test_table_sizes(self):
+        self.assertEqual(len(self.network.weights), 16 ** 3 + 16 ** 4)
+        self.assertEqual(self.network.num_lookups, 16)
+
+    def test_symmetric(self):
+        self.network.weights[:] = np.random.default_rng(0).random(len(self.network.weights))
+        values = self.network.evaluate(self.boards)
+        for k in range(4):
+            rotated = np.rot90(self.boards, k, axes=(1, 2))
+            np.testing.assert_allclose(self.network.evaluate(rotated), values, rtol=1e-6)
+            np.testing.assert_allclose(self.network.evaluate(rotated[:, :, ::-1]), values, rtol=1e-6)
+
+    def test_update_moves_towards_target(self):
+        board = self.boards[:1]
+        errors = self.network.update(board, [10.], learning_rate=0.5)
+        self.assertEqual(errors[0], 10.)
+        self.assertGreaterEqual(self.network.evaluate(board)[0], 5 - 1e-5)  # Symmetric lookups can share entries.
+        self.assertLess(self.network.update(board, [10.])[0], 10.)
+
+    def test_evaluate_moves(self):
+        self.network.weights[:] = np.random.default_rng(0).random(len(self.network.weights))
+        values, afterstates = self.network.evaluate_moves(self.boards)
+        for d in range(4):
+            new_boards, points, legal = move_boards(self.boards, d)
+            np.testing.assert_array_equal(afterstates[:, d], new_boards)
+            expected = np.where(legal, points + self.network.evaluate(new_boards), -np.inf)
+            np.testing.assert_allclose(values[:, d], expected)
+
+    def test_pickle(self):
+        self.network.weights[:] = 1
+        network = pickle.loads(pickle.dumps(self.network))
+        self.assertNotIn('_positions', self.network.__getstate__())
+        np.testing.assert_array_equal(network.evaluate(self.boards), self.network.evaluate(self.boards))
+
+
+class TestNTuplePlayer(unittest.TestCase):
+    def setUp(self):
+        np.random.seed(2048)
+        self.network = NTupleNetwork()
+        TDTrainer(self.network).train(5, progress_bar=False)
+        self.player = NTuplePlayer(self.network)
+
+    def test_training_learns_values(self):
+        self.assertTrue(np.any(self.network.weights != 0))
+        trainer = TDTrainer(self.network)
+        trainer.train(2, progress_bar=False)
+        self.assertEqual(len(trainer.scores), 2)
+        self.assertEqual(len(trainer.highest_tiles), 2)
+
+    def test_choose_actions_matches_choose_action(self):
+        rng = np.random.default_rng(2048)
+        boards = rng.integers(0, 6, (100, 4, 4)) * (rng.random((100, 4, 4)) < 0.6)
+        batch = GameBatch(len(boards), rng, boards)
+        actions = self.player._choose_actions(batch)
+        game = Game()
+        for board, action, over in zip(boards, actions, batch.game_over):
+            if over:
+                continue
+            game.board = board
+            self.assertIn(DIRECTIONS[action], game.get_legal_moves())
+            self.assertEqual(self.player._choose_action(game), DIRECTIONS[action])
+
+    def test_play_games(self):
+        self.player.play_multiple_games(2, progress_bar=False)
+        self.player.play_batched_games(10, rng=np.random.default_rng(0))
+        self.assertEqual(self.player.get_num_games_played(), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
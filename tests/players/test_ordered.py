@@ -1,4 +1,5 @@
-from game import Action, Game
+from game import Action, DIRECTIONS, Game
+from game.vectorized import GameBatch
 import numpy as np
 from players import OrderedPlayer
 import unittest
@@ -40,5 +41,28 @@ class TestOrderedPlayer(unittest.TestCase):
         self.assertEqual(player.get_num_games_played(), 3)
 
 
+    def test_choose_actions_matches_choose_action(self):
+        rng = np.random.default_rng(2048)
+        boards = rng.integers(0, 4, (200, 4, 4)) * (rng.random((200, 4, 4)) < 0.6)
+        batch = GameBatch(len(boards), rng, boards)
+        player = OrderedPlayer()
+        player._start_batch(batch)
+        player.previous_actions[::2] = DIRECTIONS.index(Action.DOWN)
+        previous = player.previous_actions.copy()
+        actions = player._choose_actions(batch)
+        g = Game()
+        for board, p, action, over in zip(boards, previous, actions, batch.game_over):
+            if over:
+                continue
+            g.board = board
+            player.previous_action = DIRECTIONS[p] if p >= 0 else None
+            self.assertEqual(player._choose_action(g), DIRECTIONS[action])
+
+    def test_play_batched_games(self):
+        player = OrderedPlayer()
+        player.play_batched_games(20, rng=np.random.default_rng(0))
+        self.assertEqual(player.get_num_games_played(), 20)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,3 +1,5 @@
+from game.vectorized import GameBatch
+import numpy as np
 from players import RandomPlayer
 import unittest
 
@@ -9,5 +11,17 @@ class TestRandomPlayer(unittest.TestCase):
         self.assertEqual(player.get_num_games_played(), 3)
 
 
+    def test_play_batched_games(self):
+        player = RandomPlayer()
+        player.play_batched_games(50, batch_size=20, rng=np.random.default_rng(0))
+        self.assertEqual(player.get_num_games_played(), 50)
+        self.assertTrue(all(s > 0 for s in player.scores))
+
+    def test_choose_actions_legal(self):
+        batch = GameBatch(100, np.random.default_rng(0))
+        actions = RandomPlayer()._choose_actions(batch)
+        self.assertTrue(np.all(batch.get_legal_moves_mask()[np.arange(100), actions]))
+
+
 if __name__ == '__main__':
     unittest.main()
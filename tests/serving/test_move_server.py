@@ -0,0 +1,100 @@
+import asyncio
+from game import DIRECTIONS, Game
+from genetics.genome import Architecture, Genome
+import numpy as np
+import os
+from players import NetworkPlayer
+from serving.move_server import MoveClient, MoveServer, NO_MOVE, REJECTED
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestMoveServer(unittest.TestCase):
+    def setUp(self):
+        self.genome = Genome()
+        rng = np.random.default_rng(2048)
+        self.boards = rng.integers(0, 8, (64, 4, 4)) * (rng.random((64, 4, 4)) < 0.6)
+
+    def test_best_moves_match_network_player(self):
+        server = MoveServer(self.genome)
+        player = NetworkPlayer(genome=self.genome)
+        g = Game()
+        for board, move in zip(self.boards, server.best_moves(self.boards)):
+            g.board = board
+            self.assertEqual(DIRECTIONS[move], player._choose_action(g))
+
+    def test_no_legal_move(self):
+        board = np.arange(16).reshape(1, 4, 4) % 15 + 1
+        self.assertEqual(MoveServer(self.genome).best_moves(board)[0], NO_MOVE)
+
+    def test_concurrent_clients(self):
+        async def run():
+            server = MoveServer(self.genome, max_batch_size=32, max_wait=0.01)
+            host, port = await server.start()
+            clients = [await MoveClient.connect(host, port) for _ in range(4)]
+            results = await asyncio.gather(*[c.best_moves(self.boards[i::4]) for i, c in enumerate(clients)])
+            [await c.close() for c in clients]
+            await server.close()
+            return server, results
+
+        server, results = asyncio.run(run())
+        expected = server.best_moves(self.boards)
+        for i, moves in enumerate(results):
+            np.testing.assert_array_equal(moves, expected[i::4])
+        summary = server.metrics.summary()
+        self.assertEqual(summary['num_requests'], len(self.boards))
+        self.assertLess(summary['num_batches'], len(self.boards))
+        self.assertLessEqual(max(summary['batch_size_distribution']), 32)
+
+    def test_bad_board_only_rejects_its_sender(self):
+        bad_boards = self.boards[:3].copy()
+        bad_boards[1, 0, 0] = 16
+
+        async def run():
+            server = MoveServer(self.genome, max_wait=0.05)
+            host, port = await server.start()
+            good, bad = await MoveClient.connect(host, port), await MoveClient.connect(host, port)
+            results = await asyncio.wait_for(asyncio.gather(good.best_moves(self.boards[:8]),
+                                                            bad.best_moves(bad_boards)), 5)
+            [await c.close() for c in (good, bad)]
+            await server.close()
+            return server, results
+
+        server, (good_moves, bad_moves) = asyncio.run(run())
+        expected = server.best_moves(self.boards[:8])
+        np.testing.assert_array_equal(good_moves, expected)
+        np.testing.assert_array_equal(bad_moves, [expected[0], REJECTED, expected[2]])
+        self.assertEqual(max(server.metrics.batch_sizes), 10)
+
+    def test_unix_socket(self):
+        async def run(path):
+            server = MoveServer(self.genome)
+            await server.start(path=path)
+            client = await MoveClient.connect(path=path)
+            moves = await client.best_moves(self.boards[:3])
+            await client.close()
+            await server.close()
+            return moves
+
+        with TemporaryDirectory() as d:
+            moves = asyncio.run(run(os.path.join(d, 'socket')))
+        np.testing.assert_array_equal(moves, MoveServer(self.genome).best_moves(self.boards[:3]))
+
+    def test_board_shape(self):
+        async def run(server, boards):
+            host, port = await server.start()
+            client = await MoveClient.connect(host, port)
+            moves = await client.best_moves(boards)
+            await client.close()
+            with self.assertRaises(ValueError):
+                await server.best_move(self.boards[0])
+            await server.close()
+            return moves
+
+        server = MoveServer(Genome(architecture=Architecture(16, 1, (5, 5))))
+        boards = np.random.default_rng(0).integers(0, 8, (6, 5, 5))
+        np.testing.assert_array_equal(asyncio.run(run(server, boards)), server.best_moves(boards))
+
+
+if __name__ == '__main__':
+    unittest.main()
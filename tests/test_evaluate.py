@@ -0,0 +1,76 @@
+from evaluate import compare, evaluate, load_player, main, play_chunk, _percentiles, LATENCY_BINS
+import json
+import numpy as np
+import os
+from players import NetworkPlayer, NTuplePlayer
+import pickle
+from tempfile import TemporaryDirectory
+import unittest
+
+
+class TestEvaluate(unittest.TestCase):
+    def test_load_player(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'network.pkl')
+            network = NetworkPlayer()
+            network.scores = [100]
+            with open(path, 'wb') as f:
+                pickle.dump(network, f)
+            player = load_player(path)
+        self.assertEqual(player.genome.input_weights.dtype, network.genome.input_weights.dtype)
+        np.testing.assert_array_equal(player.genome.input_weights, network.genome.input_weights)
+        self.assertListEqual(player.scores, [])
+
+    def test_load_ntuple_player(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ntuple.pkl')
+            ntuple = NTuplePlayer()
+            ntuple.network.weights[:] = 1
+            ntuple.scores = [100]
+            with open(path, 'wb') as f:
+                pickle.dump(ntuple, f)
+            player = load_player(path)
+        np.testing.assert_array_equal(player.network.weights, ntuple.network.weights)
+        self.assertListEqual(player.scores, [])
+
+    def test_play_chunk_is_seeded(self):
+        first = play_chunk('ordered', [1, 2, 3])
+        second = play_chunk('ordered', [3, 2, 1])
+        self.assertListEqual(first['scores'], second['scores'][::-1])
+        self.assertEqual(first['game_latencies'].sum(), 3)
+        self.assertGreater(first['move_latencies'].sum(), 3)
+
+    def test_evaluate_shared_seeds(self):
+        evaluations = evaluate(['random', 'ordered'], games=6, games_per_chunk=4)
+        for e in evaluations:
+            self.assertListEqual(e.seeds, list(range(6)))
+        comparison = compare(evaluations[0], evaluations[1])
+        self.assertEqual(comparison['shared_games'], 6)
+        reverse = compare(evaluations[1], evaluations[0])
+        self.assertAlmostEqual(comparison['score_ratio'], 1 / reverse['score_ratio'])
+
+    def test_parallel_matches_serial(self):
+        serial = evaluate(['ordered'], games=4, games_per_chunk=2)[0]
+        parallel = evaluate(['ordered'], games=4, workers=2, games_per_chunk=2)[0]
+        self.assertDictEqual(serial.get_scores_by_seed(), parallel.get_scores_by_seed())
+
+    def test_percentiles(self):
+        histogram = np.histogram(np.full(100, 0.001), LATENCY_BINS)[0]
+        for p in _percentiles(histogram, [50, 99]):
+            self.assertAlmostEqual(p, 0.001, delta=0.0001)
+        self.assertTrue(np.isnan(_percentiles(histogram * 0, [50])[0]))
+
+    def test_main_writes_json(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            main(['random', 'greedy', '--games', '3', '--batched', '--output', path])
+            with open(path) as f:
+                results = json.load(f)
+        self.assertEqual(len(results['players']), 2)
+        self.assertEqual(results['players'][0]['games'], 3)
+        self.assertAlmostEqual(sum(results['players'][1]['highest_tiles'].values()), 100, delta=0.2)
+        self.assertEqual(len(results['comparisons']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()